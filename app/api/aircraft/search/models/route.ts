@@ -16,16 +16,31 @@ export async function GET(request: Request) {
   }
 
   try {
-    // Get distinct models for this manufacturer - exact match
-    const results = await prisma.aircraftMaster.findMany({
-      select: { model: true },
-      distinct: ['model'],
-      where: { 
-        mfr: manufacturer,
-        model: { not: null }
-      },
-      orderBy: { model: 'asc' }
+    // Models of the latest release from the pre-aggregated MODEL rows (groupValue = manufacturer)
+    let results: { model: string | null }[] = [];
+    const latest = await prisma.fleetAggregate.findFirst({
+      select: { releaseDate: true },
+      orderBy: { releaseDate: 'desc' }
     });
+    if (latest) {
+      const rows = await prisma.fleetAggregate.findMany({
+        select: { groupDetail: true },
+        where: { releaseDate: latest.releaseDate, dimension: 'MODEL', groupValue: manufacturer },
+        orderBy: { groupDetail: 'asc' }
+      });
+      results = rows.map(r => ({ model: r.groupDetail }));
+    } else {
+      // No aggregates loaded yet: distinct models for this manufacturer - exact match
+      results = await prisma.aircraftMaster.findMany({
+        select: { model: true },
+        distinct: ['model'],
+        where: { 
+          mfr: manufacturer,
+          model: { not: null }
+        },
+        orderBy: { model: 'asc' }
+      });
+    }
 
     // Filter out bad data (records with commas in model field)
     const models = results
@@ -58,17 +58,34 @@ const AIRCRAFT_MANUFACTURERS = [
 // Returns list of manufacturers and models for dropdowns
 export async function GET() {
   try {
-    // Get manufacturers from database with count, filter to real aircraft mfrs
-    const manufacturers = await prisma.$queryRawUnsafe(`
-      SELECT MFR, COUNT(*) as cnt 
-      FROM AircraftMaster 
-      WHERE MFR IS NOT NULL 
-        AND LEN(MFR) > 0
-        AND LEN(MFR) < 50
-      GROUP BY MFR 
-      HAVING COUNT(*) >= 10
-      ORDER BY COUNT(*) DESC
-    `) as { MFR: string; cnt: number }[];
+    // Manufacturer counts of the latest release, pre-aggregated by the registry load
+    let manufacturers: { MFR: string; cnt: number }[] = [];
+    const latest = await prisma.fleetAggregate.findFirst({
+      select: { releaseDate: true },
+      orderBy: { releaseDate: 'desc' }
+    });
+    if (latest) {
+      const rows = await prisma.fleetAggregate.findMany({
+        select: { groupValue: true, aircraftCount: true },
+        where: { releaseDate: latest.releaseDate, dimension: 'MFR', aircraftCount: { gte: 10 } },
+        orderBy: { aircraftCount: 'desc' }
+      });
+      manufacturers = rows
+        .filter(r => r.groupValue.length > 0 && r.groupValue.length < 50)
+        .map(r => ({ MFR: r.groupValue, cnt: r.aircraftCount }));
+    } else {
+      // No aggregates loaded yet: count from AircraftMaster
+      manufacturers = await prisma.$queryRawUnsafe(`
+        SELECT MFR, COUNT(*) as cnt 
+        FROM AircraftMaster 
+        WHERE MFR IS NOT NULL 
+          AND LEN(MFR) > 0
+          AND LEN(MFR) < 50
+        GROUP BY MFR 
+        HAVING COUNT(*) >= 10
+        ORDER BY COUNT(*) DESC
+      `) as { MFR: string; cnt: number }[];
+    }
 
     // Filter to common aircraft manufacturers
     const filteredMfrs = manufacturers
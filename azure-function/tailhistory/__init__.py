@@ -61,6 +61,12 @@ def _get_connection():
         return None
 
 
+def _n_number_key(n_number: str) -> str:
+    """Canonical N-number as stored in N_NUMBER_KEY: trimmed, uppercase, 'N'-prefixed."""
+    n_key = n_number.strip().upper()
+    return n_key if n_key.startswith('N') else 'N' + n_key
+
+
 def _query_aircraft(n_number: str) -> dict | None:
     """Query the FAA AircraftMaster table for a specific N-number."""
     if not PYMSSQL_AVAILABLE:
@@ -71,8 +77,7 @@ def _query_aircraft(n_number: str) -> dict | None:
         logging.warning("DATABASE_URL not set, cannot query database")
         return None
     
-    # Normalize N-number: strip and uppercase
-    n_clean = n_number.strip().upper()
+    n_clean = _n_number_key(n_number)
     logging.info(f"Searching for N-number: {n_clean}")
     
     conn = _get_connection()
@@ -83,9 +88,9 @@ def _query_aircraft(n_number: str) -> dict | None:
     try:
         cursor = conn.cursor()
         
-        # Use TRIM and UPPER for flexible matching
+        # Equality on the indexed canonical key: an index seek, not a scan
         cursor.execute(
-            "SELECT N_NUMBER, NAME, TYPE_REGISTRANT, LAST_ACTION_DATE, AIR_WORTH_DATE, MFR, MODEL, SERIAL_NUMBER, ENG_MFR, ENGINE_MODEL, ENG_COUNT, STATUS_CODE FROM AircraftMaster WHERE TRIM(UPPER(N_NUMBER)) = %s",
+            "SELECT N_NUMBER, NAME, TYPE_REGISTRANT, LAST_ACTION_DATE, AIR_WORTH_DATE, MFR, MODEL, SERIAL_NUMBER, ENG_MFR, ENGINE_MODEL, ENG_COUNT, STATUS_CODE FROM AircraftMaster WHERE N_NUMBER_KEY = %s",
             (n_clean,)
         )
         row = cursor.fetchone()
@@ -128,6 +133,52 @@ def _query_aircraft(n_number: str) -> dict | None:
         return None
 
 
+def _query_history(n_number: str) -> list:
+    """Ownership/status timeline for an N-number from AircraftHistory, oldest first.
+
+    AircraftHistory is clustered on (N_NUMBER, ACTION_DATE, RECORD_HASH), so
+    this is a single index range scan returned already in order.
+    """
+    if not PYMSSQL_AVAILABLE or not DATABASE_URL:
+        return []
+    
+    n_key = _n_number_key(n_number)
+    
+    conn = _get_connection()
+    if not conn:
+        return []
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT ACTION_DATE, EVENT, SOURCE, NAME, TYPE_REGISTRANT, STATUS_CODE, MFR, MODEL, SERIAL_NUMBER FROM AircraftHistory WHERE N_NUMBER = %s ORDER BY ACTION_DATE, RECORD_HASH",
+            (n_key,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                "date": row[0],
+                "event": row[1],
+                "source": row[2],
+                "ownerName": row[3],
+                "typeRegistrant": row[4],
+                "status": row[5],
+                "manufacturer": row[6],
+                "model": row[7],
+                "serialNumber": row[8],
+            }
+            for row in rows
+        ]
+        
+    except Exception as e:
+        logging.error(f"History query error: {e}")
+        if conn:
+            conn.close()
+        return []
+
+
 def _get_performance_data(mfr: str, model: str) -> dict | None:
     """Query the AircraftPerformance table for performance specs."""
     if not PYMSSQL_AVAILABLE or not DATABASE_URL:
@@ -266,6 +317,22 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     
     # Query the database
     aircraft_data = _query_aircraft(n_number)
+    history = _query_history(n_number)
+    
+    if aircraft_data:
+        aircraft_data["history"] = history
+    elif history:
+        # Deregistered tails are gone from AircraftMaster but keep their timeline
+        latest = history[-1]
+        aircraft_data = {
+            "nNumber": _n_number_key(n_number),
+            "ownerName": latest["ownerName"],
+            "manufacturer": latest["manufacturer"],
+            "model": latest["model"],
+            "serialNumber": latest["serialNumber"],
+            "status": "Deregistered" if latest["event"] in ("DEREGISTERED", "REMOVED") else latest["status"],
+            "history": history,
+        }
     
     if aircraft_data:
         return func.HttpResponse(
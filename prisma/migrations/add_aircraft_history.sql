@@ -0,0 +1,29 @@
+-- Migration: Add AircraftHistory table (FAA ownership/status timeline)
+-- Run this SQL on your Azure SQL (SQL Server) database.
+--
+-- Append-only: filled from the FAA DEREG file (python scripts/ingest_faa.py --dereg data/DEREG.txt)
+-- and from snapshot-to-snapshot changes during registry loads (--history).
+-- The clustered key (N_NUMBER, ACTION_DATE, RECORD_HASH) makes one tail's timeline a single
+-- range scan; IGNORE_DUP_KEY drops events that were already loaded, so reloads are idempotent.
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'AircraftHistory')
+BEGIN
+  CREATE TABLE [AircraftHistory] (
+    [N_NUMBER] NVARCHAR(10) NOT NULL,
+    [ACTION_DATE] NVARCHAR(8) NOT NULL,
+    [RECORD_HASH] BIGINT NOT NULL,
+    [EVENT] NVARCHAR(20) NOT NULL,
+    [SOURCE] NVARCHAR(10) NOT NULL,
+    [NAME] NVARCHAR(255) NULL,
+    [TYPE_REGISTRANT] NVARCHAR(50) NULL,
+    [STATUS_CODE] NVARCHAR(50) NULL,
+    [MFR] NVARCHAR(255) NULL,
+    [MODEL] NVARCHAR(255) NULL,
+    [SERIAL_NUMBER] NVARCHAR(255) NULL,
+    [LOADED_AT] DATETIME2 NOT NULL CONSTRAINT [AircraftHistory_LOADED_AT_df] DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT [PK_AircraftHistory] PRIMARY KEY CLUSTERED ([N_NUMBER], [ACTION_DATE], [RECORD_HASH])
+      WITH (IGNORE_DUP_KEY = ON)
+  );
+END
+
+PRINT 'AircraftHistory migration completed successfully!';
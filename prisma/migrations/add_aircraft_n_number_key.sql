@@ -0,0 +1,34 @@
+-- Migration: Add N_NUMBER_KEY lookup column to AircraftMaster
+-- Run this SQL on your Azure SQL (SQL Server) database.
+--
+-- N_NUMBER_KEY is the canonical form of N_NUMBER (trimmed, uppercase, always 'N'-prefixed).
+-- Older import scripts disagreed on the prefix, so lookups used
+-- WHERE TRIM(UPPER(N_NUMBER)) = ..., which cannot use an index and scans the table.
+-- Lookups now seek IX_AircraftMaster_N_NUMBER_KEY with a plain equality instead.
+--
+-- The column is a PERSISTED computed column (same rule as faa_ingest.parse.n_number_key),
+-- so every writer - scripts/ingest_faa.py, bcp, the legacy import scripts - gets it filled
+-- in by the server and none of them may write it.
+
+-- An earlier version of this migration added a plain column: replace it
+IF COL_LENGTH('[AircraftMaster]', 'N_NUMBER_KEY') IS NOT NULL
+  AND NOT EXISTS (SELECT * FROM sys.computed_columns
+                  WHERE object_id = OBJECT_ID('[AircraftMaster]') AND name = 'N_NUMBER_KEY')
+BEGIN
+  IF EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_AircraftMaster_N_NUMBER_KEY')
+    DROP INDEX [IX_AircraftMaster_N_NUMBER_KEY] ON [AircraftMaster];
+  ALTER TABLE [AircraftMaster] DROP COLUMN [N_NUMBER_KEY];
+END;
+
+-- PERSISTED computes and stores the key for every existing row now (one pass over the table)
+IF COL_LENGTH('[AircraftMaster]', 'N_NUMBER_KEY') IS NULL
+  ALTER TABLE [AircraftMaster] ADD [N_NUMBER_KEY] AS CAST(CASE
+      WHEN UPPER(LTRIM(RTRIM([N_NUMBER]))) LIKE N'N%' THEN UPPER(LTRIM(RTRIM([N_NUMBER])))
+      ELSE N'N' + UPPER(LTRIM(RTRIM([N_NUMBER])))
+    END AS NVARCHAR(12)) PERSISTED;
+
+-- Dynamic SQL because the column did not exist when this batch was compiled
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_AircraftMaster_N_NUMBER_KEY')
+  EXEC(N'CREATE NONCLUSTERED INDEX [IX_AircraftMaster_N_NUMBER_KEY] ON [AircraftMaster] ([N_NUMBER_KEY]);');
+
+PRINT 'AircraftMaster N_NUMBER_KEY migration completed successfully!';
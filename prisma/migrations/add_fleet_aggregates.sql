@@ -0,0 +1,21 @@
+-- Migration: Add FleetAggregate table (per-release fleet counts)
+-- Run this SQL on your Azure SQL (SQL Server) database.
+--
+-- Filled by every full registry load (python scripts/ingest_faa.py): aircraft counts per
+-- manufacturer, model, state, registrant type and status, computed in the same streaming pass.
+-- A load replaces the rows of its RELEASE_DATE; dashboards read the latest release here
+-- instead of running COUNT(*) ... GROUP BY over AircraftMaster.
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'FleetAggregate')
+BEGIN
+  CREATE TABLE [FleetAggregate] (
+    [RELEASE_DATE] NVARCHAR(8) NOT NULL,
+    [DIMENSION] NVARCHAR(20) NOT NULL,
+    [GROUP_VALUE] NVARCHAR(100) NOT NULL,
+    [GROUP_DETAIL] NVARCHAR(100) NOT NULL CONSTRAINT [FleetAggregate_GROUP_DETAIL_df] DEFAULT '',
+    [AIRCRAFT_COUNT] INT NOT NULL,
+    CONSTRAINT [PK_FleetAggregate] PRIMARY KEY CLUSTERED ([RELEASE_DATE], [DIMENSION], [GROUP_VALUE], [GROUP_DETAIL])
+  );
+END
+
+PRINT 'FleetAggregate migration completed successfully!';
@@ -0,0 +1,15 @@
+"""
+Benchmark the FAA ingestion pipeline on synthetic registry files.
+
+Run: python scripts/bench_faa_ingest.py --rows 1000000
+     python scripts/bench_faa_ingest.py --rows 5000000 --json bench.json
+     python scripts/bench_faa_ingest.py --rows 5000000 --baseline bench.json
+     python scripts/bench_faa_ingest.py --source data/master_files --acftref data/ACFTREF.txt --engine data/ENGINE.txt
+"""
+
+import sys
+
+from faa_ingest.bench import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,69 +1,115 @@
 """
 Script to download full FAA database and import to Azure SQL.
-Downloads from GitHub mirror of FAA data.
+Streams the FAA releasable aircraft zip, only when it changed since the
+last download (ETag / Last-Modified). --mirror instead fetches MASTER-1..9
+and the reference files from the GitHub mirror, several at a time.
 
-Run: python scripts/download_faa_full.py
+Run: python scripts/download_faa_full.py [--mirror] [--workers N] [--checksums SHA256SUMS]
 """
 
+import argparse
 import os
-import urllib.request
-import zipfile
-import csv
-import time
+
+from faa_ingest import master_paths, iter_aircraft, load_reference_data
+from faa_ingest.download import RELEASE_URL, ReleaseState, StreamedRelease, last_modified_time, open_release
+from faa_ingest.fetch import DEFAULT_FETCH_WORKERS, FetchJob, fetch_all, file_sha256, read_checksums
 
 # GitHub raw URLs for FAA data (mirror from simonw/scrape-faa-releasable-aircraft)
 GITHUB_RAW_BASE = "https://raw.githubusercontent.com/simonw/scrape-faa-releasable-aircraft/main"
-
-# Files to download
-MASTER_FILES = [
-    f"{GITHUB_RAW_BASE}/MASTER-{i}.txt" for i in range(1, 10)
-]
-
-ACFTREF_URL = f"{GITHUB_RAW_BASE}/ACFTREF.txt"
+MASTER_SHARDS = [f"MASTER-{i}.txt" for i in range(1, 10)]
+REFERENCE_FILES = ["ACFTREF.txt", "ENGINE.txt", "DEREG.txt"]
+# ENGINE and DEREG are optional: a load without them leaves engine names / history out
+REQUIRED_FILES = set(MASTER_SHARDS) | {"ACFTREF.txt"}
 
 # Local paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "data")
 MASTER_FILES_DIR = os.path.join(DATA_DIR, "master_files")
+# Shared with ingest_faa.py: the parse cache filled here makes its first load skip parsing
+INDEX_DIR = os.path.join(DATA_DIR, "index")
+# Validators of the last release downloaded
+RELEASE_STATE = os.path.join(DATA_DIR, "faa_release_download.json")
 
 def ensure_dirs():
     """Create necessary directories."""
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(MASTER_FILES_DIR, exist_ok=True)
 
-def download_file(url, filepath):
-    """Download a file from URL."""
-    print(f"Downloading {url}...")
+def download_release(force=False, url=RELEASE_URL):
+    """Stream the release zip into DATA_DIR; False if it is unchanged since the last download or unusable."""
+    state = ReleaseState(RELEASE_STATE)
+    print(f"Checking {url}...")
+    response = open_release(url, None if force else state)
+    if response is None:
+        print("  Release unchanged since the last download")
+        return False
+
     try:
-        urllib.request.urlretrieve(url, filepath)
-        print(f"  Saved to {filepath}")
-        return True
-    except Exception as e:
-        print(f"  Error: {e}")
+        with response:
+            release = StreamedRelease(response, save_dir=DATA_DIR)
+            acftref, engines = release.references()
+            print(f"  {len(acftref)} aircraft models, {len(engines)} engine models")
+            total = 0
+            for _ in release.master_records('columnar'):
+                total += 1
+                if total % 50000 == 0:
+                    print(f"  Downloaded {total} aircraft so far ({release.mb} MB)...")
+    except ValueError as e:
+        # Not a usable release (no MASTER.txt / ACFTREF.txt, corrupt zip); try again next run
+        print(f"\nERROR: {e}")
         return False
+    print(f"  Saved {len(release.saved)} files, {release.mb} MB")
 
-def download_master_files():
-    """Download all MASTER files."""
-    print("\n=== Downloading MASTER files ===")
-    for i, url in enumerate(MASTER_FILES, 1):
-        filepath = os.path.join(MASTER_FILES_DIR, f"MASTER-{i}.txt")
-        if os.path.exists(filepath):
-            print(f"MASTER-{i}.txt already exists, skipping...")
-            continue
-        download_file(url, filepath)
-        time.sleep(0.5)  # Be nice to the server
-
-def download_acftref():
-    """Download ACFTREF file."""
-    filepath = os.path.join(DATA_DIR, "ACFTREF.txt")
-    if os.path.exists(filepath):
-        print("\nACFTREF.txt already exists, skipping...")
-        return filepath
-    
-    print("\n=== Downloading ACFTREF file ===")
-    if download_file(ACFTREF_URL, filepath):
-        return filepath
-    return None
+    master_path = os.path.join(DATA_DIR, "MASTER.txt")
+    if not os.path.exists(master_path):
+        print("\nERROR: the release zip had no MASTER.txt")
+        return False
+    # The files carry the release's date, which ingest_faa.py stores fleet aggregates under
+    modified = last_modified_time(response.headers)
+    if modified is not None:
+        for path in release.saved:
+            os.utime(path, (modified, modified))
+    # MASTER.txt replaces older MASTER-N shards, which master_paths() would prefer
+    for path in master_paths(MASTER_FILES_DIR):
+        os.remove(path)
+    os.replace(master_path, os.path.join(MASTER_FILES_DIR, "MASTER.txt"))
+    state.save(url, response.headers)
+    return True
+
+def mirror_jobs(base_url, checksums, force=False):
+    """FetchJobs for the mirror files that are missing (or fail their checksum)."""
+    targets = [(name, MASTER_FILES_DIR) for name in MASTER_SHARDS]
+    targets += [(name, DATA_DIR) for name in REFERENCE_FILES]
+    jobs = []
+    for name, directory in targets:
+        path = os.path.join(directory, name)
+        expected = checksums.get(name)
+        if os.path.exists(path) and not force:
+            if not expected:
+                print(f"{name} already exists, skipping...")
+                continue
+            if file_sha256(path) == expected:
+                print(f"{name} already exists and matches its checksum, skipping...")
+                continue
+            print(f"{name} does not match its checksum, downloading again...")
+        jobs.append(FetchJob(f"{base_url}/{name}", path, expected))
+    return jobs
+
+def download_mirror(base_url, workers=DEFAULT_FETCH_WORKERS, checksums_source=None, force=False):
+    """Fetch the mirror's MASTER shards and reference files concurrently; False if a required one failed."""
+    checksums = read_checksums(checksums_source) if checksums_source else {}
+    jobs = mirror_jobs(base_url, checksums, force)
+    if not jobs:
+        return True
+
+    print(f"\n=== Downloading {len(jobs)} files from {base_url} ({workers} at a time) ===")
+    results, failures = fetch_all(jobs, workers)
+    for result in results:
+        resumed = " (resumed)" if result['resumed'] else ""
+        print(f"  {os.path.basename(result['path'])}: sha256 {result['sha256']}{resumed}")
+    for job, error in failures:
+        print(f"  Error: {os.path.basename(job.path)}: {error}")
+    return not any(os.path.basename(job.path) in REQUIRED_FILES for job, _ in failures)
 
 def count_lines(filepath):
     """Count lines in a file."""
@@ -73,160 +119,72 @@ def count_lines(filepath):
     except:
         return 0
 
-def parse_master_line(line):
-    """Parse a single line from MASTER file."""
-    if len(line) < 50:
-        return None
-    
-    try:
-        # FAA MASTER.txt fixed-width format
-        return {
-            'n_number': 'N' + line[0:5].strip(),
-            'serial_number': line[6:36].strip(),
-            'mfr_model_code': line[37:44].strip(),
-            'eng_mfr_code': line[45:50].strip(),
-            'year_mfr': line[51:55].strip(),
-            'type_registrant': line[56:57].strip(),
-            'name': line[58:108].strip(),
-            'street1': line[109:142].strip(),
-            'street2': line[143:176].strip(),
-            'city': line[177:195].strip(),
-            'state': line[196:198].strip(),
-            'zip_code': line[199:209].strip(),
-            'region': line[210:211].strip(),
-            'county': line[212:215].strip(),
-            'country': line[216:218].strip(),
-            'last_action_date': line[219:227].strip(),
-            'cert_issue_date': line[228:236].strip(),
-            'airworthiness_class': line[237:238].strip(),
-            'air_worth_date': line[239:247].strip(),
-            'type_aircraft': line[248:250].strip(),
-            'type_engine': line[251:253].strip(),
-            'status_code': line[254:256].strip(),
-        }
-    except Exception as e:
-        return None
-
-def parse_acftref(filepath):
-    """Parse ACFTREF file to get manufacturer/model names."""
-    print("Parsing ACFTREF for manufacturer/model names...")
-    models = {}
-    
-    try:
-        with open(filepath, 'r', encoding='latin-1') as f:
-            for line in f:
-                if len(line) < 44:
-                    continue
-                try:
-                    # ACFTREF format: Code, Mfr, Model
-                    code = line[0:7].strip()
-                    mfr = line[8:38].strip()
-                    model = line[39:79].strip()
-                    if code:
-                        models[code] = {'mfr': mfr, 'model': model}
-                except:
-                    continue
-    except Exception as e:
-        print(f"Error parsing ACFTREF: {e}")
-    
-    print(f"  Found {len(models)} aircraft models")
-    return models
-
-def process_master_files(acftref):
+def process_master_files(acftref, engines=None):
     """Process all MASTER files and yield aircraft data."""
     print("\n=== Processing MASTER files ===")
     
-    for i in range(1, 10):
-        filepath = os.path.join(MASTER_FILES_DIR, f"MASTER-{i}.txt")
-        if not os.path.exists(filepath):
-            continue
-            
-        print(f"Processing MASTER-{i}.txt...")
+    for filepath in master_paths(MASTER_FILES_DIR):
+        print(f"Processing {os.path.basename(filepath)}...")
         count = 0
         
-        with open(filepath, 'r', encoding='latin-1') as f:
-            for line in f:
-                parsed = parse_master_line(line)
-                if not parsed:
-                    continue
-                
-                n_number = parsed.get('n_number', '')
-                if not n_number or n_number == 'N':
-                    continue
-                
-                # Look up manufacturer/model from ACFTREF
-                mfr_model_code = parsed.get('mfr_model_code', '')
-                model_info = acftref.get(mfr_model_code, {})
-                
-                # Map type registrant code to name
-                type_reg_map = {
-                    '1': 'Individual',
-                    '2': 'Partnership', 
-                    '3': 'Corporation',
-                    '4': 'Co-Owned',
-                    '5': 'Government',
-                    '7': 'LLC',
-                    '8': 'Non Citizen Corporation',
-                    '9': 'Non Citizen Co-Owned',
-                }
-                
-                # Map status code
-                status_map = {
-                    'V': 'Valid',
-                    'D': 'Deregistered',
-                    'E': 'Expired',
-                    'R': 'Reserved',
-                }
-                
-                aircraft = {
-                    'n_number': n_number,
-                    'serial_number': parsed.get('serial_number', ''),
-                    'mfr': model_info.get('mfr', ''),
-                    'model': model_info.get('model', ''),
-                    'status_code': status_map.get(parsed.get('status_code', ''), parsed.get('status_code', '')),
-                    'air_worth_date': parsed.get('air_worth_date', ''),
-                    'last_action_date': parsed.get('last_action_date', ''),
-                    'type_registrant': type_reg_map.get(parsed.get('type_registrant', ''), parsed.get('type_registrant', '')),
-                    'name': parsed.get('name', ''),
-                    'eng_mfr': '',  # Would need ENGINE file for this
-                    'engine_model': '',
-                    'eng_count': 1,
-                }
-                
-                count += 1
-                yield aircraft
+        for aircraft in iter_aircraft([filepath], acftref, engines, parser='columnar', cache_dir=INDEX_DIR):
+            count += 1
+            yield aircraft
         
-        print(f"  Processed {count} aircraft from MASTER-{i}.txt")
+        print(f"  Processed {count} aircraft from {os.path.basename(filepath)}")
     
     print("\nDone processing all MASTER files!")
 
 def main():
+    parser = argparse.ArgumentParser(description="Download the FAA registry release")
+    parser.add_argument('--mirror', nargs='?', const=GITHUB_RAW_BASE, metavar='BASE_URL',
+                        help="Fetch MASTER-1..9, ACFTREF, ENGINE and DEREG from the GitHub mirror "
+                             "instead of the FAA release zip")
+    parser.add_argument('--workers', type=int, default=DEFAULT_FETCH_WORKERS,
+                        help=f"Concurrent mirror downloads (default: {DEFAULT_FETCH_WORKERS})")
+    parser.add_argument('--checksums', metavar='FILE_OR_URL',
+                        help="sha256sum-style manifest to verify mirror files against")
+    parser.add_argument('--force', action='store_true',
+                        help="Download even if the release is unchanged or the files exist")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("FAA Database Download & Import")
     print("=" * 60)
-    
+
     ensure_dirs()
-    
-    # Download files
-    download_master_files()
-    acftref_path = download_acftref()
-    
-    if not acftref_path:
-        print("\nERROR: Could not download ACFTREF file")
+
+    if args.mirror:
+        if not download_mirror(args.mirror, args.workers, args.checksums, args.force):
+            print("\nERROR: Some files could not be downloaded; rerun to resume them")
+            return
+    elif not download_release(args.force):
         return
+
+    acftref_path = os.path.join(DATA_DIR, "ACFTREF.txt")
+    engine_path = os.path.join(DATA_DIR, "ENGINE.txt")
+    dereg_path = os.path.join(DATA_DIR, "DEREG.txt")
+    if not os.path.exists(dereg_path):
+        dereg_path = None
     
     # Parse ACFTREF for manufacturer/model lookup
-    acftref = parse_acftref(acftref_path)
+    print("Parsing ACFTREF for manufacturer/model names...")
+    # ENGINE is optional: without it engine columns are left blank
+    acftref, engines = load_reference_data(acftref_path, engine_path, INDEX_DIR)
+    print(f"  Found {len(acftref)} aircraft models")
+    print(f"  Found {len(engines)} engine models")
     
     # Count total aircraft
     total = 0
-    for _ in process_master_files(acftref):
+    for _ in process_master_files(acftref, engines):
         total += 1
         if total % 50000 == 0:
             print(f"  Counted {total} aircraft so far...")
     
     print(f"\nTotal aircraft in database: {total}")
-    print("\nTo import to Azure SQL, run: python scripts/import_full_faa.py")
+    print("\nTo import to Azure SQL, run: python scripts/ingest_faa.py")
+    if dereg_path:
+        print(f"For ownership history, run: python scripts/ingest_faa.py --dereg {dereg_path}")
 
 if __name__ == "__main__":
     main()
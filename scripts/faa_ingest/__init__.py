@@ -0,0 +1,22 @@
+"""
+FAA registry ingestion engine.
+
+One streaming pipeline (read -> parse -> enrich -> batch -> sink) shared by
+every FAA import, with pluggable sinks for Azure SQL, local SQLite and files.
+
+The columnar parser (faa_ingest.columnar) needs numpy and is imported on
+demand, so the line-based path keeps working without it.
+
+Run: python scripts/ingest_faa.py --help
+"""
+
+from .layout import (
+    FieldSpec, MASTER_FIELDS, ACFTREF_FIELDS, ENGINE_FIELDS,
+    TYPE_REGISTRANT_NAMES, STATUS_NAMES, AIRCRAFT_COLUMNS, AIRCRAFT_LOAD_COLUMNS,
+)
+from .parse import parse_master_line, parse_acftref, parse_engine, load_reference_data
+from .pipeline import (
+    DEFAULT_BATCH_SIZE, PARSERS, master_paths, read_lines, parse_lines,
+    iter_parsed, enrich_records, batched, iter_aircraft, run_pipeline,
+)
+from .sinks import Sink, AzureSqlSink, SQLiteSink, FileSink, NullSink, make_sink
@@ -0,0 +1,112 @@
+"""
+Fleet summary counts computed during ingestion (FleetAggregate).
+
+Dashboard questions such as aircraft per manufacturer, model, state,
+registrant type or status would otherwise be COUNT(*) ... GROUP BY scans of
+the whole AircraftMaster table. Instead FleetAggregates.count() sits in the
+pipeline between parse and enrich and counts every MASTER record by its raw
+codes (model code, state, registrant type, status) - one dict increment per
+record. Only when the run ends are the few thousand distinct code
+combinations resolved to names through ACFTREF and rolled up per dimension.
+
+Each row of the table is one count for one release:
+
+    RELEASE_DATE    YYYYMMDD of the release the counts describe
+    DIMENSION       MFR, MODEL, STATE, TYPE_REGISTRANT or STATUS_CODE
+    GROUP_VALUE     manufacturer / state / registrant type / status name
+    GROUP_DETAIL    model name for MODEL rows (GROUP_VALUE is its manufacturer), else ''
+    AIRCRAFT_COUNT  MASTER records in the group
+
+A load replaces the rows of its release date, so rerunning it is idempotent
+and earlier releases stay available for trends. The date comes from the
+release itself (its Last-Modified, or the MASTER files' modification time),
+never from the day the load happens to run.
+"""
+
+import os
+import time
+from collections import Counter
+
+from .layout import STATUS_NAMES, TYPE_REGISTRANT_NAMES
+
+AGGREGATE_TABLE = 'FleetAggregate'
+AGGREGATE_COLUMNS = ['RELEASE_DATE', 'DIMENSION', 'GROUP_VALUE', 'GROUP_DETAIL', 'AIRCRAFT_COUNT']
+DIMENSIONS = ('MFR', 'MODEL', 'STATE', 'TYPE_REGISTRANT', 'STATUS_CODE')
+
+
+class FleetAggregates:
+    """Per-release fleet counts, accumulated from parsed MASTER records."""
+
+    def __init__(self, release_date=None):
+        # YYYYMMDD; shard counters that are merge()d into another leave it None
+        self.release_date = release_date
+        self.counts = Counter()
+        # False once a run only saw part of the release (resumed from a checkpoint)
+        self.complete = True
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def count(self, records):
+        """Pass parsed records through, counting each by its raw codes."""
+        counts = self.counts
+        for parsed in records:
+            counts[parsed['mfr_model_code'], parsed['state'], parsed['type_registrant'], parsed['status_code']] += 1
+            yield parsed
+
+    def merge(self, counts, complete=True):
+        """Add another run's counts (e.g. a worker's shard)."""
+        self.counts.update(counts)
+        self.complete = self.complete and complete
+
+    def rows(self, acftref):
+        """FleetAggregate rows, as tuples in AGGREGATE_COLUMNS order."""
+        totals = {dimension: Counter() for dimension in DIMENSIONS}
+        models = {}
+        for (model_code, state, type_registrant, status_code), n in self.counts.items():
+            model = models.get(model_code)
+            if model is None:
+                info = acftref.get(model_code) or {}
+                model = models[model_code] = (info.get('mfr', ''), info.get('model', ''))
+            totals['MFR'][model[0], ''] += n
+            totals['MODEL'][model] += n
+            totals['STATE'][state, ''] += n
+            totals['TYPE_REGISTRANT'][TYPE_REGISTRANT_NAMES.get(type_registrant, type_registrant), ''] += n
+            totals['STATUS_CODE'][STATUS_NAMES.get(status_code, status_code), ''] += n
+        return [
+            (self.release_date, dimension, value, detail, n)
+            for dimension in DIMENSIONS
+            for (value, detail), n in sorted(totals[dimension].items())
+        ]
+
+
+def release_date_at(timestamp):
+    """YYYYMMDD (UTC) of a POSIX timestamp."""
+    return time.strftime('%Y%m%d', time.gmtime(timestamp))
+
+
+def files_release_date(paths):
+    """Release date of MASTER files: the newest one's modification time, None without files.
+
+    download_faa_full.py stamps the files it saves with the release's Last-Modified.
+    """
+    return release_date_at(max(os.path.getmtime(path) for path in paths)) if paths else None
+
+
+def write_sqlite_aggregates(conn, release_date, rows):
+    """Replace one release's rows in a SQLite FleetAggregate table (created if missing)."""
+    column_defs = ', '.join(
+        f"{column} {'INTEGER' if column == 'AIRCRAFT_COUNT' else 'TEXT'}" for column in AGGREGATE_COLUMNS
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {AGGREGATE_TABLE} ({column_defs}, "
+        f"PRIMARY KEY (RELEASE_DATE, DIMENSION, GROUP_VALUE, GROUP_DETAIL)) WITHOUT ROWID"
+    )
+    conn.execute(f"DELETE FROM {AGGREGATE_TABLE} WHERE RELEASE_DATE = ?", (release_date,))
+    conn.executemany(
+        f"INSERT INTO {AGGREGATE_TABLE} ({', '.join(AGGREGATE_COLUMNS)}) "
+        f"VALUES ({', '.join(['?'] * len(AGGREGATE_COLUMNS))})",
+        rows,
+    )
+    conn.commit()
+    return len(rows)
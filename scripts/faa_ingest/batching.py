@@ -0,0 +1,112 @@
+"""
+Adaptive batch sizing from measured commit latency.
+
+A fixed 500-row batch is too small on a fast link (round-trip bound) and
+too big on a throttled Azure SQL tier (long transactions, timeouts).
+AdaptiveBatchSize watches how long each committed batch took and whether it
+failed, keeps a smoothed seconds-per-row estimate, and sizes the next batch
+so a commit takes about target_seconds:
+
+- after a success the size moves toward target_seconds / seconds_per_row,
+  at most twice the size of the batch that just committed;
+- after a failure it halves, the size that failed (less 20%) becomes a
+  ceiling that only creeps back up by 0.2% per successful batch, and it does
+  not grow at all while the recent error rate is above ERROR_RATE_LIMIT;
+- the size always stays within [min_size, max_size].
+
+When the size has stayed within 10% for SETTLE_BATCHES batches it is
+reported as settled (and again if it later settles more than 25% away).
+"""
+
+from .pipeline import DEFAULT_BATCH_SIZE
+
+DEFAULT_MIN_BATCH = 100
+DEFAULT_MAX_BATCH = 5000
+DEFAULT_TARGET_SECONDS = 1.0
+
+# Weight of the newest observation in the moving averages
+SMOOTHING = 0.3
+ERROR_RATE_LIMIT = 0.1
+FAILED_SIZE_MARGIN = 0.8
+CEILING_RECOVERY = 1.002
+SETTLE_BATCHES = 5
+SETTLE_TOLERANCE = 0.1
+# A new settled size is only reported if it moved this much from the last one
+RESETTLE_CHANGE = 0.25
+
+
+class AdaptiveBatchSize:
+    """Batch size controller; call it for the size of the next batch."""
+
+    def __init__(self, initial=DEFAULT_BATCH_SIZE, min_size=DEFAULT_MIN_BATCH, max_size=DEFAULT_MAX_BATCH,
+                 target_seconds=DEFAULT_TARGET_SECONDS, verbose=True):
+        if not 0 < min_size <= max_size:
+            raise ValueError(f"batch bounds must satisfy 0 < min ({min_size}) <= max ({max_size})")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.verbose = verbose
+        self.size = self._clamp(initial)
+        self.ceiling = max_size
+        self.seconds_per_row = None
+        self.error_rate = 0.0
+        self.batches = 0
+        self.failures = 0
+        self.smallest = self.largest = self.size
+        self.settled = None
+        self._stable = 0
+
+    def __call__(self):
+        return self.size
+
+    def _clamp(self, size):
+        return max(self.min_size, min(self.max_size, int(round(size))))
+
+    def observe(self, rows, seconds, ok):
+        """Record one committed (ok) or failed batch and pick the next size."""
+        self.batches += 1
+        self.error_rate += SMOOTHING * ((0.0 if ok else 1.0) - self.error_rate)
+
+        if not ok:
+            self.failures += 1
+            self.ceiling = max(self.min_size, min(self.ceiling, rows * FAILED_SIZE_MARGIN))
+            # Batches already in flight at the old size do not halve it again
+            size = min(self.size, rows / 2)
+        elif rows:
+            per_row = seconds / rows
+            if self.seconds_per_row is None:
+                self.seconds_per_row = per_row
+            else:
+                self.seconds_per_row += SMOOTHING * (per_row - self.seconds_per_row)
+            ideal = self.target_seconds / self.seconds_per_row if self.seconds_per_row else self.max_size
+            self.ceiling = min(self.max_size, self.ceiling * CEILING_RECOVERY)
+            size = min(ideal, max(rows * 2, self.size), self.ceiling)
+            if self.error_rate > ERROR_RATE_LIMIT:
+                size = min(size, self.size)
+        else:
+            return
+
+        size = self._clamp(size)
+        self._stable = self._stable + 1 if abs(size - self.size) <= self.size * SETTLE_TOLERANCE else 0
+        self.size = size
+        self.smallest = min(self.smallest, size)
+        self.largest = max(self.largest, size)
+
+        if self._stable >= SETTLE_BATCHES and (
+                self.settled is None or abs(size - self.settled) > self.settled * RESETTLE_CHANGE):
+            self.settled = size
+            if self.verbose:
+                commit = self.seconds_per_row * size if self.seconds_per_row else 0
+                print(f"  Batch size settled at {size:,} rows (~{commit:.2f}s per commit)")
+
+    @property
+    def stats(self):
+        return {
+            'final': self.size,
+            'settled': self.settled,
+            'smallest': self.smallest,
+            'largest': self.largest,
+            'failures': self.failures,
+            'ceiling': int(self.ceiling),
+            'commit_ms_per_row': round(self.seconds_per_row * 1000, 3) if self.seconds_per_row else None,
+        }
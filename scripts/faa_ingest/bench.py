@@ -0,0 +1,209 @@
+"""
+Ingestion benchmark: time each pipeline stage on synthetic (or real) files.
+
+Stages are cumulative prefixes of the pipeline, each run in a fresh process
+so its peak RSS is its own:
+
+    read    - raw MASTER lines (or byte chunks for the columnar parser)
+    parse   - read + parse
+    enrich  - read + parse + ACFTREF/ENGINE join
+    batch   - read + parse + enrich + batching
+    write   - run_pipeline() into a local SQLite database (stand-in for Azure SQL)
+
+For each stage the report shows rows/s, the time it adds over the previous
+stage and peak RSS. Results can be saved as JSON and compared against an
+earlier run with --baseline, so a regression shows up as a number.
+
+Run: python scripts/bench_faa_ingest.py --rows 500000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .parse import load_reference_data
+from .pipeline import (
+    DEFAULT_BATCH_SIZE, PARSERS, batched, enrich_records, iter_parsed, master_paths, read_lines, run_pipeline,
+)
+from .sinks import SQLiteSink
+from .synthetic import write_registry, write_release_zip
+
+STAGES = ('read', 'parse', 'enrich', 'batch', 'write')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _read(paths, parser):
+    if parser == 'columnar':
+        from .columnar import read_chunks
+        return sum(chunk.count(b'\n') for path in paths for _, chunk in read_chunks(path))
+    return sum(1 for _ in read_lines(paths))
+
+
+def _run_stage(stage, paths, acftref_path, engine_path, parser, batch_size, work_dir, writers=1):
+    """Run one stage to completion in this (fresh) process and measure it."""
+    acftref = engines = None
+    reference_seconds = 0.0
+    if stage not in ('read', 'parse'):
+        started = time.perf_counter()
+        acftref, engines = load_reference_data(acftref_path, engine_path, os.path.join(work_dir, 'index'))
+        reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    if stage == 'read':
+        rows = _read(paths, parser)
+    elif stage == 'parse':
+        rows = sum(1 for _ in iter_parsed(paths, parser))
+    elif stage == 'enrich':
+        rows = sum(1 for _ in enrich_records(iter_parsed(paths, parser), acftref, engines))
+    elif stage == 'batch':
+        records = enrich_records(iter_parsed(paths, parser), acftref, engines)
+        rows = sum(len(batch) for batch in batched(records, batch_size))
+    else:
+        db_path = os.path.join(work_dir, 'bench.db')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        stats = run_pipeline(paths, SQLiteSink(db_path), acftref, engines, batch_size=batch_size,
+                             progress_every=0, parser=parser, writers=writers,
+                             sink_factory=lambda: SQLiteSink(db_path))
+        rows = stats['rows']
+    seconds = time.perf_counter() - started
+
+    return {
+        'stage': stage,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'cpu_seconds': round(time.process_time() - cpu_started, 3),
+        'rows_per_sec': round(rows / seconds) if seconds else 0,
+        'reference_seconds': round(reference_seconds, 3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_benchmark(paths, acftref_path, engine_path, stages=STAGES, parser='columnar',
+                  batch_size=DEFAULT_BATCH_SIZE, work_dir=None, repeat=1, writers=1):
+    """Measure each stage (best of `repeat` runs) and return the list of results."""
+    work_dir = work_dir or tempfile.mkdtemp(prefix='faa_bench_')
+    results = []
+    previous = None
+    # spawn: every stage starts from a clean interpreter, so peak RSS is per stage
+    context = multiprocessing.get_context('spawn')
+    for stage in stages:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(_run_stage, stage, paths, acftref_path, engine_path, parser,
+                                        batch_size, work_dir, writers).result())
+        result = min(runs, key=lambda run: run['seconds'])
+        result['stage_seconds'] = round(result['seconds'] - (previous['seconds'] if previous else 0), 3)
+        results.append(result)
+        previous = result
+    return results
+
+
+def _mb(value):
+    return 'n/a' if value is None else f"{value:,.1f}"
+
+
+def print_report(results, baseline=None):
+    baseline = {result['stage']: result for result in baseline or []}
+    print(f"\n{'stage':<8} {'rows':>10} {'seconds':>9} {'+stage':>8} {'rows/s':>11} {'peak MB':>9}"
+          + ('  vs baseline' if baseline else ''))
+    for result in results:
+        line = (f"{result['stage']:<8} {result['rows']:>10,} {result['seconds']:>9.2f} "
+                f"{result['stage_seconds']:>8.2f} {result['rows_per_sec']:>11,} {_mb(result['peak_rss_mb']):>9}")
+        before = baseline.get(result['stage'])
+        if before and before['rows_per_sec']:
+            change = (result['rows_per_sec'] - before['rows_per_sec']) / before['rows_per_sec'] * 100
+            line += f"  {change:+.1f}% rows/s"
+        print(line)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the FAA ingestion pipeline stage by stage.")
+    parser.add_argument('--rows', type=int, default=100000, help="synthetic MASTER records to generate")
+    parser.add_argument('--source', help="benchmark existing files instead (directory with MASTER/ACFTREF/ENGINE)")
+    parser.add_argument('--acftref', help="ACFTREF.txt for --source (default: SOURCE/ACFTREF.txt)")
+    parser.add_argument('--engine', help="ENGINE.txt for --source (default: SOURCE/ENGINE.txt)")
+    parser.add_argument('--out', help="directory for the generated files (default: a temp dir, removed afterwards)")
+    parser.add_argument('--shards', action='store_true', help="generate MASTER-1..9.txt instead of MASTER.txt")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--generate-only', action='store_true', help="write the synthetic files and exit")
+    parser.add_argument('--release-zip', action='store_true',
+                        help="with --generate-only: also pack them as OUT/ReleasableAircraft.zip (download tests); "
+                             "--shards are joined into one MASTER.txt as in the FAA's zip")
+    parser.add_argument('--stages', default=','.join(STAGES), help="comma-separated subset of " + ','.join(STAGES))
+    parser.add_argument('--parser', choices=PARSERS, default='columnar')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--writers', type=int, default=1, help="writer threads for the write stage")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per stage; the fastest is reported")
+    parser.add_argument('--json', metavar='PATH', help="save the results as JSON")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against results saved with --json")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        print(f"ERROR: unknown stage(s) {', '.join(unknown)}")
+        return 1
+
+    work_dir = tempfile.mkdtemp(prefix='faa_bench_')
+    try:
+        if args.source:
+            paths = master_paths(args.source)
+            acftref_path = args.acftref or os.path.join(args.source, 'ACFTREF.txt')
+            engine_path = args.engine or os.path.join(args.source, 'ENGINE.txt')
+            if not paths or not os.path.exists(acftref_path):
+                print(f"ERROR: no MASTER/ACFTREF files found at {args.source}")
+                return 1
+        else:
+            out_dir = args.out or os.path.join(work_dir, 'registry')
+            print(f"Generating {args.rows:,} synthetic MASTER records in {out_dir}...")
+            started = time.perf_counter()
+            files = write_registry(out_dir, args.rows, seed=args.seed, shards=args.shards)
+            print(f"  {time.perf_counter() - started:.1f}s")
+            paths, acftref_path, engine_path = files['master'], files['acftref'], files['engine']
+            if args.generate_only:
+                if args.release_zip:
+                    print(f"  {write_release_zip(files, os.path.join(out_dir, 'ReleasableAircraft.zip'))}")
+                return 0
+
+        size_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+        print(f"Benchmarking {len(paths)} MASTER file(s), {size_mb:,.1f} MB, {args.parser} parser...")
+        results = run_benchmark(paths, acftref_path, engine_path, stages, args.parser, args.batch_size,
+                                work_dir, args.repeat, args.writers)
+
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+        print_report(results, baseline)
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'rows': results[0]['rows'] if results else 0, 'parser': args.parser,
+                           'batch_size': args.batch_size, 'writers': args.writers, 'mb': round(size_mb, 1), 'results': results}, f, indent=2)
+            print(f"\nSaved {args.json}")
+        return 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
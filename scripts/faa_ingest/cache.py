@@ -0,0 +1,216 @@
+"""
+Parsed-source cache keyed by file content and parser version.
+
+When the FAA files have not changed since the last run (a resumed load, a
+--dry-run, a second sink), parsing MASTER is most of a run's CPU time. After
+the first full columnar parse of a file its parsed columns are saved as
+data/index/<file>-<key>.parsed, in the single-file array layout of
+reference.py: one fixed-width bytes array per MASTER field plus each
+record's end offset in the file. The low-cardinality fields
+(layout.MASTER_DICTIONARY_FIELDS) are stored dictionary-encoded instead:
+their distinct values once, plus a uint8/uint16 code per record. Later runs
+mmap that file and never read or parse the text; a dictionary is decoded
+once per file, not per record.
+
+The entry is built while the file is parsed: ParsedCacheWriter spills each
+block to disk as it goes by, so the first parse uses no more memory than
+an uncached one.
+
+An entry is only used for the same file content (a full BLAKE2b hash) and
+the same parser (PARSE_VERSION plus a signature of the field layout), so
+editing the parser or the layout invalidates it. File hashes are remembered
+against size and mtime (see checkpoint.content_hash()), so an unchanged
+file is not re-hashed on every run either.
+
+Requires numpy.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .checkpoint import content_hash
+from .columnar import (
+    DEFAULT_CHUNK_BYTES, MasterColumns, StringDictionary, code_dtype, key_values, parse_master_chunk, read_chunks,
+    sort_keys,
+)
+from .layout import MASTER_DICTIONARY_FIELDS, MASTER_FIELDS, MASTER_MIN_LENGTH
+from .parse import MASTER_HEADER_PREFIX
+from .reference import open_arrays, save_arrays
+
+# Bump when the parsed output changes without a layout change
+PARSE_VERSION = 2
+MAGIC = b'FAAPARSED1\n'
+# Records per MasterColumns block handed out from a cached file
+CACHED_BLOCK_ROWS = 65536
+# Fixed width of each field in the cache: its layout width ('N' is added to n_number)
+FIELD_WIDTHS = {spec.name: spec.end - spec.start + (spec.name == 'n_number') for spec in MASTER_FIELDS}
+
+
+def parser_signature():
+    """PARSE_VERSION plus a digest of everything in the layout that shapes parsed output."""
+    layout = json.dumps([[spec.name, spec.start, spec.end] for spec in MASTER_FIELDS]
+                        + [MASTER_MIN_LENGTH, MASTER_HEADER_PREFIX, sorted(MASTER_DICTIONARY_FIELDS)])
+    return f"{PARSE_VERSION}-{hashlib.blake2b(layout.encode(), digest_size=4).hexdigest()}"
+
+
+def parsed_cache_path(path, cache_dir):
+    key = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=4).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.basename(path)}-{key}.parsed")
+
+
+def load_parsed(path, cache_dir, digest=None):
+    """(columns, offsets, dictionaries) from a valid cache entry for path, else None."""
+    cache_path = parsed_cache_path(path, cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        header, arrays, _ = open_arrays(cache_path, MAGIC)
+    except (ValueError, KeyError, json.JSONDecodeError):
+        return None
+    digest = digest or content_hash(path, cache_dir)
+    if header.get('content_hash') != digest or header.get('parser') != parser_signature():
+        return None
+    columns = {}
+    dictionaries = {}
+    for name in header['fields']:
+        if f"codes:{name}" in arrays:
+            columns[name] = arrays[f"codes:{name}"]
+            dictionaries[name] = StringDictionary(arrays[f"dict:{name}"])
+        else:
+            columns[name] = arrays[f"field:{name}"]
+    return columns, arrays['offsets'], dictionaries
+
+
+def _distinct(sorted_keys):
+    return sorted_keys[np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))] if len(sorted_keys) else sorted_keys
+
+
+def merge_distinct(distinct, keys):
+    """Sorted distinct values of a sorted distinct array plus new keys (np.union1d, by plain sorts)."""
+    merged = np.concatenate((distinct, _distinct(np.sort(keys))))
+    merged.sort()
+    return _distinct(merged)
+
+
+def _spilled(path, dtype):
+    """Read-only memmap of a spill file (an empty array for an empty file)."""
+    if os.path.getsize(path) == 0:
+        return np.array([], dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+class ParsedCacheWriter:
+    """Builds one file's cache entry while its blocks are parsed.
+
+    Each block's columns are appended to spill files (data/index/.parsing-*)
+    as it goes by, and only the distinct values of the dictionary fields are
+    kept in memory, so a first parse streams like an uncached one. finish()
+    writes the entry from the memory-mapped spill files.
+    """
+
+    def __init__(self, path, cache_dir, digest=None):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.digest = digest
+        os.makedirs(cache_dir, exist_ok=True)
+        self.spill_dir = tempfile.mkdtemp(prefix='.parsing-', dir=cache_dir)
+        self.files = {name: open(os.path.join(self.spill_dir, name), 'wb') for name in ['offsets', *FIELD_WIDTHS]}
+        # Sorted distinct sort_keys() of each dictionary field
+        self.dictionaries = {name: sort_keys(np.array([], dtype=f'S{FIELD_WIDTHS[name]}'))
+                             for name in MASTER_DICTIONARY_FIELDS}
+        self.rows = 0
+
+    def add(self, block):
+        self.files['offsets'].write(np.asarray(block.offsets, dtype=np.int64).tobytes())
+        for name, width in FIELD_WIDTHS.items():
+            column = block[name].astype(f'S{width}')
+            if name in self.dictionaries:
+                self.dictionaries[name] = merge_distinct(self.dictionaries[name], sort_keys(column))
+            self.files[name].write(column.tobytes())
+        self.rows += len(block)
+
+    def finish(self):
+        """Write the cache entry and remove the spill files."""
+        try:
+            for f in self.files.values():
+                f.close()
+            spill = lambda name: os.path.join(self.spill_dir, name)
+            arrays = {'offsets': _spilled(spill('offsets'), np.int64)}
+            for name, width in FIELD_WIDTHS.items():
+                column = _spilled(spill(name), f'S{width}')
+                if name not in self.dictionaries:
+                    arrays[f"field:{name}"] = column
+                    continue
+                keys = self.dictionaries[name]
+                codes_path = spill(f"codes-{name}")
+                with open(codes_path, 'wb') as f:
+                    dtype = code_dtype(len(keys))
+                    for start in range(0, len(column), CACHED_BLOCK_ROWS):
+                        codes = np.searchsorted(keys, sort_keys(column[start:start + CACHED_BLOCK_ROWS]))
+                        f.write(codes.astype(dtype).tobytes())
+                arrays[f"dict:{name}"] = key_values(keys, width)
+                arrays[f"codes:{name}"] = _spilled(codes_path, dtype)
+            header = {'content_hash': self.digest or content_hash(self.path, self.cache_dir),
+                      'parser': parser_signature(), 'source': os.path.basename(self.path),
+                      'fields': list(FIELD_WIDTHS), 'rows': self.rows}
+            save_arrays(parsed_cache_path(self.path, self.cache_dir), MAGIC, header, arrays)
+        finally:
+            self.discard()
+
+    def discard(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def _cached_blocks(columns, offsets, dictionaries, start_offset, end_offset):
+    """MasterColumns blocks of the cached records that end inside (start_offset, end_offset].
+
+    The blocks share the file's dictionaries, so their strings are decoded once.
+    """
+    first = int(np.searchsorted(offsets, start_offset, side='right'))
+    last = len(offsets) if end_offset is None else int(np.searchsorted(offsets, end_offset, side='right'))
+    for start in range(first, last, CACHED_BLOCK_ROWS):
+        stop = min(start + CACHED_BLOCK_ROWS, last)
+        yield MasterColumns({name: column[start:stop] for name, column in columns.items()}, offsets[start:stop],
+                            dictionaries)
+
+
+def iter_cached_columns(paths, cache_dir, chunk_bytes=DEFAULT_CHUNK_BYTES, start_offset=0, end_offset=None):
+    """Drop-in for columnar.iter_master_columns() that reads and fills the parse cache.
+
+    A file with a valid entry is served from it (any byte range). Otherwise
+    it is parsed, and a parse that covered the whole file is saved.
+    """
+    last = len(paths) - 1
+    for i, path in enumerate(paths):
+        start = start_offset if i == 0 else 0
+        end = end_offset if i == last else None
+        digest = content_hash(path, cache_dir)
+        cached = load_parsed(path, cache_dir, digest)
+        if cached is not None:
+            for block in _cached_blocks(*cached, start, end):
+                yield path, block
+            continue
+
+        if start != 0 or end is not None:
+            for offset, chunk in read_chunks(path, chunk_bytes, start, end):
+                yield path, parse_master_chunk(chunk, offset)
+            continue
+
+        writer = ParsedCacheWriter(path, cache_dir, digest)
+        try:
+            for offset, chunk in read_chunks(path, chunk_bytes):
+                block = parse_master_chunk(chunk, offset)
+                writer.add(block)
+                yield path, block
+        except BaseException:
+            # Includes the consumer closing the generator early: no entry
+            writer.discard()
+            raise
+        writer.finish()
@@ -0,0 +1,145 @@
+"""
+Byte-offset checkpoints for resumable registry loads.
+
+The readers keep a SourcePosition up to date with the file and byte offset
+just past the last record they produced. Because no pipeline stage reads
+ahead of the batch being filled, that position is exactly where the next
+run must start once the batch is committed. Checkpoint stores it (plus the
+last committed N-number and a fingerprint of the file) as a small JSON file
+written atomically, so a restart seeks straight to it.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+FINGERPRINT_BYTES = 1024 * 1024
+HASH_CHUNK_BYTES = 16 * 1024 * 1024
+CONTENT_HASHES_NAME = 'content-hashes.json'
+
+
+class SourcePosition:
+    """Current read position: file path and byte offset after the last record read."""
+
+    __slots__ = ('path', 'offset')
+
+    def __init__(self, path=None, offset=0):
+        self.path = path
+        self.offset = offset
+
+
+def file_fingerprint(path):
+    """Cheap file identity: size plus a hash of the first and last MB."""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+def _hash_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(path, cache_dir=None):
+    """Full file identity: BLAKE2b of every byte.
+
+    With a cache_dir the hash is remembered in content-hashes.json against the
+    file's size and mtime, so an unchanged file is only read once.
+    """
+    if not cache_dir:
+        return _hash_file(path)
+    stat = os.stat(path)
+    memo_path = os.path.join(cache_dir, CONTENT_HASHES_NAME)
+    key = os.path.abspath(path)
+    try:
+        with open(memo_path, 'r', encoding='utf-8') as f:
+            memo = json.load(f)
+    except (OSError, ValueError):
+        memo = {}
+    entry = memo.get(key)
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+
+    digest = _hash_file(path)
+    memo[key] = [stat.st_size, stat.st_mtime_ns, digest]
+    os.makedirs(cache_dir, exist_ok=True)
+    # Per-process temp name: parallel workers may update the memo at once
+    tmp = f"{memo_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(memo, f)
+    os.replace(tmp, memo_path)
+    return digest
+
+
+def checkpoint_path(state_dir, sink_spec, paths, part=None):
+    """One checkpoint per (sink, ordered source files[, byte range]), e.g. data/checkpoints/azure-1a2b3c4d.json."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', sink_spec).strip('_')
+    key = hashlib.blake2b('\n'.join(os.path.abspath(p) for p in paths).encode(), digest_size=4).hexdigest()
+    suffix = f"-{part}" if part is not None else ''
+    return os.path.join(state_dir, f"{slug}-{key}{suffix}.json")
+
+
+class Checkpoint:
+    """Durable resume point for one load of an ordered list of source files."""
+
+    def __init__(self, path, paths):
+        self.path = path
+        self.paths = [os.path.abspath(p) for p in paths]
+        self._fingerprints = {}
+
+    def fingerprint(self, path):
+        if path not in self._fingerprints:
+            self._fingerprints[path] = file_fingerprint(path)
+        return self._fingerprints[path]
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def resume_point(self):
+        """(index into paths, byte offset) to start from; (0, 0) if nothing valid to resume."""
+        saved = self.load()
+        if not saved:
+            return 0, 0
+        if saved.get('paths') != self.paths or saved.get('file') not in self.paths:
+            print("  Checkpoint is for a different set of files, starting over")
+            return 0, 0
+        if saved.get('file_hash') != self.fingerprint(saved['file']):
+            print(f"  {os.path.basename(saved['file'])} changed since the checkpoint, starting over")
+            return 0, 0
+        return self.paths.index(saved['file']), saved['offset']
+
+    def save(self, position, last_n_number):
+        """Atomically record a committed position."""
+        path = os.path.abspath(position.path)
+        state = {
+            'paths': self.paths,
+            'file': path,
+            'offset': position.offset,
+            'file_hash': self.fingerprint(path),
+            'last_n_number': last_n_number,
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
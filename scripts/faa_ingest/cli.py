@@ -0,0 +1,618 @@
+"""
+Command line entry point for the FAA ingestion engine.
+"""
+
+import argparse
+import contextlib
+import os
+import re
+import sys
+import time
+import zlib
+
+from .aggregates import AGGREGATE_TABLE, FleetAggregates, files_release_date, release_date_at
+from .batching import AdaptiveBatchSize, DEFAULT_MAX_BATCH, DEFAULT_MIN_BATCH, DEFAULT_TARGET_SECONDS
+from .checkpoint import Checkpoint, checkpoint_path
+from .delta import DeltaFilter, HashState
+from .download import RELEASE_URL, ReleaseState, StreamedRelease, last_modified_time, open_release
+from .parallel import run_parallel
+from .parse import load_reference_data
+from .pipeline import DEFAULT_BATCH_SIZE, PARSERS, master_paths, run_pipeline
+from .sinks import AzureSqlSink, FileSink, make_sink
+from .bulkcopy import BcpFileSink, DEFAULT_BULK_BATCH, bulk_load
+from .indexes import DeferredIndexes
+from .snapshot import SnapshotSink
+from .swap import DEFAULT_MIN_RATIO, ShadowTable
+from .telemetry import Telemetry, prometheus_path
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "data")
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "checkpoints")
+INDEX_DIR = os.path.join(DATA_DIR, "index")
+METRICS_PATH = os.path.join(DATA_DIR, "metrics", "faa_ingest.json")
+CHANGES_PATH = os.path.join(DATA_DIR, "faa_changes.csv")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load the FAA aircraft registry into AircraftMaster.")
+    parser.add_argument('--master', default=os.path.join(DATA_DIR, "master_files"),
+                        help="MASTER.txt, or a directory with MASTER-1..9.txt / MASTER.txt")
+    parser.add_argument('--acftref', default=os.path.join(DATA_DIR, "ACFTREF.txt"),
+                        help="ACFTREF.txt path")
+    parser.add_argument('--engine', default=os.path.join(DATA_DIR, "ENGINE.txt"),
+                        help="ENGINE.txt path (optional)")
+    parser.add_argument('--sink', default='azure',
+                        help="azure[:TABLE], sqlite:PATH, file:PATH (.csv or .ndjson), "
+                             "bcp:PATH (bcp data file + .fmt format file), "
+                             "snapshot:DIR (indexed SQLite + columnar file) or null (store nothing)")
+    parser.add_argument('--azure-mode', choices=AzureSqlSink.modes, default='merge',
+                        help="merge: staged set-based MERGE per batch; row: one upsert per record; "
+                             "insert: append only (empty tables)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per batch (the starting size with --adaptive-batch)")
+    parser.add_argument('--adaptive-batch', action='store_true',
+                        help="size batches from measured commit latency and errors, within --min/--max-batch")
+    parser.add_argument('--min-batch', type=int, default=DEFAULT_MIN_BATCH)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--target-commit', type=float, default=DEFAULT_TARGET_SECONDS, metavar='SECONDS',
+                        help="commit latency --adaptive-batch aims for")
+    parser.add_argument('--parser', choices=PARSERS, default='columnar',
+                        help="columnar: NumPy chunk parser (default); line: pure-Python per-line parser")
+    parser.add_argument('--no-parse-cache', action='store_true',
+                        help="always parse MASTER text instead of reusing cached parsed columns (data/index)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="read, parse and enrich everything but store nothing (same as --sink null)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="load MASTER shards in N worker processes, one DB connection each (0 = one per CPU)")
+    parser.add_argument('--writers', type=int, default=1,
+                        help="write batches from N threads with one DB connection each while parsing continues")
+    parser.add_argument('--download', nargs='?', const=RELEASE_URL, metavar='URL',
+                        help="load straight from the FAA ReleasableAircraft.zip (default URL: the FAA's), "
+                             "streamed and parsed in memory; does nothing if it has not changed since the last load")
+    parser.add_argument('--force-download', action='store_true',
+                        help="with --download: ignore the saved ETag/Last-Modified and fetch the release anyway")
+    parser.add_argument('--release-state', default=None,
+                        help="ETag/Last-Modified state file for --download (default: data/faa_release_<sink>.json)")
+    parser.add_argument('--diff', metavar='OLD_MASTER',
+                        help="write what changed from OLD_MASTER (file or directory, the previous release) "
+                             "to --master as a change set (--diff-out), then exit")
+    parser.add_argument('--diff-out', default=CHANGES_PATH, metavar='PATH',
+                        help="change set written by --diff, CSV or .ndjson (default: data/faa_changes.csv)")
+    parser.add_argument('--changes', metavar='PATH',
+                        help="incremental load from a --diff change set: upsert its new and changed records, "
+                             "delete its removed N-numbers")
+    parser.add_argument('--lookup', metavar='N_NUMBER',
+                        help="print one aircraft straight from the MASTER file(s) via the offset index, then exit")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore any saved checkpoint and load from the start")
+    parser.add_argument('--no-checkpoint', action='store_true',
+                        help="do not write byte-offset checkpoints")
+    parser.add_argument('--delta', action='store_true',
+                        help="send only records whose content changed since the last --delta load, "
+                             "and delete N-numbers missing from the release (source must be a full release)")
+    parser.add_argument('--history', action='store_true',
+                        help="append AircraftHistory events for every row the load inserts, changes or deletes")
+    parser.add_argument('--dereg', metavar='DEREG_TXT',
+                        help="append registration/cancellation events from the FAA DEREG file to AircraftHistory, then exit")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="with a bcp sink: load the written files into Azure SQL with bcp/BULK INSERT (TABLOCK)")
+    parser.add_argument('--bulk-table', default='AircraftMaster', help="target table for --bulk-load")
+    parser.add_argument('--bulk-data-source', metavar='NAME',
+                        help="EXTERNAL DATA SOURCE holding uploaded copies of the bcp files; "
+                             "loads with BULK INSERT instead of the local bcp tool")
+    parser.add_argument('--bulk-batch', type=int, default=DEFAULT_BULK_BATCH,
+                        help="rows per bcp/BULK INSERT commit")
+    parser.add_argument('--truncate', action='store_true',
+                        help="empty the --bulk-table first (full rebuild; minimally logged)")
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help="disable the table's nonclustered indexes during the load and rebuild them after "
+                             "(the N_NUMBER_KEY lookup index stays enabled)")
+    parser.add_argument('--online', action='store_true',
+                        help="rebuild deferred indexes with ONLINE = ON so queries keep running")
+    parser.add_argument('--swap', action='store_true',
+                        help="full reload: load a shadow copy of the table, index it and swap it in atomically")
+    parser.add_argument('--swap-min-ratio', type=float, default=DEFAULT_MIN_RATIO,
+                        help="refuse the swap if the shadow has fewer rows than this fraction of the live table")
+    parser.add_argument('--keep-old', action='store_true',
+                        help="keep the replaced table as <table>_old after --swap")
+    parser.add_argument('--no-aggregates', action='store_true',
+                        help=f"do not write {AGGREGATE_TABLE} counts (per manufacturer/model/state/registrant/status)")
+    parser.add_argument('--release-date', metavar='YYYYMMDD',
+                        help=f"release the {AGGREGATE_TABLE} counts are stored under (default: the download's "
+                             "Last-Modified, or the MASTER files' modification time)")
+    parser.add_argument('--delta-state', default=None,
+                        help="hash state file (default: data/faa_delta_<sink>.db)")
+    parser.add_argument('--metrics', default=METRICS_PATH, metavar='PATH',
+                        help="JSON run report with per-stage timings, commit latencies and counters; "
+                             "a Prometheus text file is written beside it as .prom "
+                             "(default: data/metrics/faa_ingest.json)")
+    parser.add_argument('--no-metrics', action='store_true', help="do not time stages or write a run report")
+    return parser
+
+
+def default_delta_state(sink_spec):
+    """One hash state file per sink target, e.g. data/faa_delta_azure.db."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', sink_spec).strip('_')
+    return os.path.join(DATA_DIR, f"faa_delta_{slug}.db")
+
+
+def default_release_state(sink_spec):
+    """One release state file per sink target, like the delta hash state."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', sink_spec).strip('_')
+    return os.path.join(DATA_DIR, f"faa_release_{slug}.json")
+
+
+def open_download(args):
+    """--download: conditional GET of the release. (response, state); response is None if unchanged."""
+    state = ReleaseState(args.release_state or default_release_state(args.sink))
+    print(f"\nChecking {args.download}...")
+    response = open_release(args.download, None if args.force_download else state)
+    if response is None:
+        entry = state.get(args.download)
+        seen = ', '.join(f"{label} {entry[key]}" for key, label in
+                         (('etag', 'ETag'), ('last_modified', 'Last-Modified'), ('loaded_at', 'loaded'))
+                         if entry.get(key))
+        print(f"  Not modified ({seen}); nothing to do")
+        return None, state
+    length = response.headers.get('Content-Length')
+    print("  New release" + (f" ({int(length) / (1024 * 1024):,.1f} MB)" if length else "")
+          + f", Last-Modified {response.headers.get('Last-Modified')}")
+    return response, state
+
+
+def print_summary(stats):
+    print("\n" + "=" * 60)
+    print("IMPORT COMPLETE!")
+    print("=" * 60)
+    print(f"  Records: {stats['rows']:,}")
+    print(f"  Written: {stats['written']:,}")
+    print(f"  Time:    {stats['seconds']}s ({stats['rows_per_sec']:,} rows/s)")
+    if stats.get('failed_batches'):
+        print(f"  Failed batches: {stats['failed_batches']:,} (checkpoint kept; rerun to retry)")
+    if 'workers' in stats:
+        print(f"  Workers: {stats['workers']}")
+    if 'writers' in stats:
+        print(f"  Writers: {stats['writers']} (parser waited {stats['parse_wait_seconds']}s on a full queue)")
+    for key, value in stats['sink'].items():
+        print(f"  {key.replace('_', ' ').capitalize()}: {value:,}")
+    if 'batch_size' in stats:
+        sizes = stats['batch_size']
+        settled = f"settled at {sizes['settled']:,}" if sizes['settled'] else "did not settle"
+        print(f"  Batch size: {settled}, final {sizes['final']:,} (range {sizes['smallest']:,}-{sizes['largest']:,})")
+    if 'delta' in stats:
+        print("  Delta: " + ", ".join(f"{value:,} {key}" for key, value in stats['delta'].items()))
+    if stats.get('aggregates', {}).get('rows'):
+        aggregates = stats['aggregates']
+        print(f"  Aggregates: {aggregates['rows']:,} {AGGREGATE_TABLE} rows for release {aggregates['release_date']}")
+
+
+def timed_stage(telemetry, name):
+    return telemetry.stage(name) if telemetry is not None else contextlib.nullcontext()
+
+
+def write_metrics(args, telemetry, stats):
+    """Write the run report (--metrics) and print where the time went."""
+    if telemetry is None:
+        return
+    try:
+        report = telemetry.write(args.metrics, stats)
+    except OSError as e:
+        print(f"  Metrics not written: {e}")
+        return
+    print("  Stages: " + ", ".join(f"{name} {stage['wall_seconds']}s" for name, stage in report['stages'].items()))
+    commit = report['histograms'].get('commit_seconds')
+    if commit and commit['count']:
+        print(f"  Commit latency: p50 {commit['p50'] * 1000:,.0f} ms, p95 {commit['p95'] * 1000:,.0f} ms, "
+              f"max {commit['max'] * 1000:,.0f} ms")
+    if report['peak_rss_mb'] is not None:
+        print(f"  Peak memory: {report['peak_rss_mb']:,} MB (CPU {report['cpu_seconds']}s)")
+    print(f"  Metrics: {args.metrics}, {prometheus_path(args.metrics)}")
+
+
+def run_lookup(args, paths):
+    """--lookup: point lookup of one tail in the raw MASTER file(s)."""
+    from .master_index import MasterReader
+
+    for path in paths:
+        with MasterReader(path, INDEX_DIR) as reader:
+            record = reader.lookup(args.lookup)
+        if record:
+            print(f"\n{os.path.basename(path)}:")
+            for key, value in record.items():
+                print(f"  {key}: {value}")
+            return 0
+    print(f"\n{args.lookup} not found in {len(paths)} MASTER file(s)")
+    return 1
+
+
+def run_diff(args, paths):
+    """--diff: merge-join the previous release against --master and write the change set."""
+    try:
+        from .diff import diff_releases, write_change_set
+    except ImportError as e:
+        print(f"\nERROR: --diff needs numpy ({e})")
+        return 1
+
+    old_paths = master_paths(args.diff)
+    if not old_paths:
+        print(f"\nERROR: no MASTER files found at {args.diff}")
+        return 1
+    print(f"\nDiffing {len(old_paths)} old against {len(paths)} new MASTER file(s)...")
+    started = time.perf_counter()
+    counts = write_change_set(diff_releases(old_paths, paths, INDEX_DIR), args.diff_out)
+    elapsed = time.perf_counter() - started
+    print(f"  {sum(counts.values()):,} changes in {elapsed:.2f}s -> {args.diff_out}")
+    for category, n in counts.items():
+        print(f"    {category}: {n:,}")
+    print(f"  Load them with: python scripts/ingest_faa.py --changes {args.diff_out}")
+    return 0
+
+
+def count_records(paths):
+    """Record total from the cached offset indexes (None without numpy)."""
+    try:
+        from .master_index import MasterIndex
+    except ImportError:
+        return None
+    return sum(len(MasterIndex.load_or_build(path, INDEX_DIR)) for path in paths)
+
+
+def run_dereg(args):
+    """--dereg: append DEREG registration/cancellation events to AircraftHistory."""
+    from .history import load_dereg
+
+    if not os.path.exists(args.dereg):
+        print(f"\nERROR: DEREG file not found at {args.dereg}")
+        return 1
+    acftref = {}
+    if os.path.exists(args.acftref):
+        acftref, _ = load_reference_data(args.acftref, None, INDEX_DIR)
+    try:
+        sink = make_sink(args.sink, azure_mode=args.azure_mode)
+        print(f"\nLoading {os.path.basename(args.dereg)} history into {sink.name} sink...")
+        stats = load_dereg([args.dereg], sink, acftref, batch_size=args.batch_size)
+    except (ValueError, NotImplementedError) as e:
+        print(f"\nERROR: {e}")
+        return 1
+
+    print_summary(stats)
+    return 0
+
+
+def run_bulk_load(args, sink, deferred=None):
+    """--bulk-load: push the bcp files the pipeline just wrote into Azure SQL."""
+    print(f"\nBulk loading {sink.path} into {args.bulk_table}"
+          + (" (truncated first)" if args.truncate else "") + "...")
+    try:
+        with deferred or contextlib.nullcontext():
+            stats = bulk_load(sink.path, args.bulk_table, sink.format_path, truncate=args.truncate,
+                              batch_size=args.bulk_batch, data_source=args.bulk_data_source)
+    except (ImportError, RuntimeError, ValueError) as e:
+        print(f"\nERROR: {e}")
+        return 1
+    print(f"  {stats['method']}: {stats['rows']:,} rows ({stats['mb']:,} MB) in {stats['seconds']}s "
+          f"({stats['rows_per_sec']:,} rows/s)")
+    print_index_timings(deferred)
+    return 0
+
+
+def defer_indexes(args):
+    """DeferredIndexes for --defer-indexes on the table this run loads, else None."""
+    if not args.defer_indexes:
+        return None
+    if args.swap:
+        raise ValueError("--swap already loads an unindexed shadow table; drop --defer-indexes")
+    kind, _, target = args.sink.partition(':')
+    if kind == 'azure':
+        table = target or 'AircraftMaster'
+    elif kind == 'bcp' and args.bulk_load:
+        table = args.bulk_table
+    else:
+        raise ValueError("--defer-indexes needs the azure sink, or a bcp sink with --bulk-load")
+    return DeferredIndexes(table, online=args.online)
+
+
+def print_index_timings(deferred):
+    if deferred is None:
+        return
+    timings = deferred.timings
+    print(f"  Indexes: {len(timings['indexes'])} disabled in {timings['disable']}s, load phase {timings['load']}s, "
+          f"rebuilt in {timings['rebuild']}s" + (" (ONLINE)" if deferred.online else ""))
+    for name, seconds in timings['indexes'].items():
+        print(f"    {name}: {seconds}s")
+
+
+def start_swap(args):
+    """--swap: create the shadow table and point this run's writes at it."""
+    if args.delta or args.history:
+        raise ValueError("--swap is a full reload; it cannot be combined with --delta or --history")
+    kind, _, target = args.sink.partition(':')
+    if kind == 'azure':
+        table = target or 'AircraftMaster'
+    elif kind == 'bcp' and args.bulk_load:
+        table = args.bulk_table
+    else:
+        raise ValueError("--swap needs the azure sink, or a bcp sink with --bulk-load")
+
+    shadow = ShadowTable(table, min_ratio=args.swap_min_ratio, keep_old=args.keep_old)
+    print(f"\nSwap reload: loading {shadow.name}, then swapping it in for {table}")
+    shadow.prepare()
+    if kind == 'azure':
+        args.sink = f"azure:{shadow.name}"
+        args.azure_mode = 'insert'
+    else:
+        args.bulk_table = shadow.name
+        args.truncate = False
+    # The shadow is recreated on every run, so there is nothing to resume into
+    args.no_checkpoint = True
+    return shadow
+
+
+def finish_swap(shadow, stats):
+    """Index the loaded shadow table and swap it in, unless the load failed."""
+    if stats.get('failed_batches'):
+        print(f"\nERROR: {stats['failed_batches']:,} batch(es) failed; {shadow.table} is unchanged "
+              f"and {shadow.name} is left for inspection")
+        return 1
+    print(f"\nIndexing {shadow.name} and swapping it in...")
+    try:
+        timings = shadow.finish()
+    except RuntimeError as e:
+        print(f"\nERROR: {e}")
+        return 1
+    print(f"  {timings['rows']:,} rows replaced {timings['replaced_rows']:,}"
+          + (f" ({timings['duplicates']:,} duplicate N-numbers dropped)" if timings['duplicates'] else ""))
+    print(f"  Check {timings['check']}s, index build {timings['index']}s, swap {timings['swap']}s"
+          + (f"; previous table kept as {shadow.old}" if shadow.keep_old else ""))
+    return 0
+
+
+def fleet_aggregates(args, sink_kind, source_date=None):
+    """FleetAggregates for a run into a database/snapshot sink, else None.
+
+    The counts are stored under --release-date, else source_date (taken from
+    the release being loaded); a run with neither is refused.
+    """
+    if args.no_aggregates or sink_kind not in ('azure', 'sqlite', 'snapshot'):
+        return None
+    if args.release_date and not re.fullmatch(r'\d{8}', args.release_date):
+        raise ValueError(f"--release-date must be YYYYMMDD, got '{args.release_date}'")
+    release_date = args.release_date or source_date
+    if not release_date:
+        raise ValueError(f"cannot tell which release this is; pass --release-date YYYYMMDD "
+                         f"(or --no-aggregates to skip {AGGREGATE_TABLE})")
+    return FleetAggregates(release_date)
+
+
+def adaptive_settings(args):
+    """AdaptiveBatchSize keyword arguments for --adaptive-batch, else None."""
+    if not args.adaptive_batch:
+        return None
+    return {'initial': args.batch_size, 'min_size': args.min_batch, 'max_size': args.max_batch,
+            'target_seconds': args.target_commit}
+
+
+def run_workers(args, paths, shadow=None, deferred=None, telemetry=None):
+    """--workers: load shards in a process pool."""
+    if args.delta:
+        print("\nERROR: --delta compares the whole release in one pass; use it with --workers 1")
+        return 1
+
+    workers = args.workers or None
+    print(f"\nLoading {len(paths)} MASTER file(s) into {args.sink} with {workers or 'one per CPU'} worker(s)...")
+    try:
+        aggregates = fleet_aggregates(args, args.sink.partition(':')[0], files_release_date(paths))
+        with deferred or contextlib.nullcontext():
+            stats = run_parallel(paths, args.sink, args.acftref, args.engine, workers=workers,
+                                 azure_mode=args.azure_mode, batch_size=args.batch_size, parser=args.parser,
+                                 checkpoint_dir=None if args.no_checkpoint else CHECKPOINT_DIR,
+                                 restart=args.restart, index_dir=INDEX_DIR, writers=args.writers,
+                                 adaptive=adaptive_settings(args), history=args.history,
+                                 parse_cache=not args.no_parse_cache, aggregates=aggregates,
+                                 telemetry=telemetry)
+    except (ImportError, ValueError) as e:
+        print(f"\nERROR: {e}")
+        return 1
+
+    print_summary(stats)
+    print_index_timings(deferred)
+    status = 0
+    if shadow:
+        with timed_stage(telemetry, 'swap'):
+            status = finish_swap(shadow, stats)
+    write_metrics(args, telemetry, stats)
+    return status
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    print("=" * 60)
+    print("FAA Registry Ingestion")
+    print("=" * 60)
+
+    if args.dry_run:
+        args.sink = 'null'
+        args.no_checkpoint = True
+
+    if args.dereg:
+        return run_dereg(args)
+
+    telemetry = None if args.no_metrics else Telemetry()
+
+    release = None
+    changes = None
+    source_date = None
+    if args.download:
+        if args.workers != 1 or args.lookup:
+            print("\nERROR: --download streams one release in one process; drop --workers/--lookup")
+            return 1
+        try:
+            response, release_state = open_download(args)
+        except OSError as e:
+            print(f"\nERROR: {e}")
+            return 1
+        if response is None:
+            return 0
+        release = StreamedRelease(response)
+        modified = last_modified_time(response.headers)
+        source_date = release_date_at(modified) if modified is not None else None
+        paths = []
+    elif args.changes:
+        if args.workers != 1 or args.delta or args.swap:
+            print("\nERROR: --changes is one incremental load; drop --workers/--delta/--swap")
+            return 1
+        for path in (args.changes, args.acftref):
+            if not os.path.exists(path):
+                print(f"\nERROR: {path} not found")
+                return 1
+        from .diff import ChangeSet
+        changes = ChangeSet(args.changes)
+        paths = []
+    else:
+        paths = master_paths(args.master)
+        if not paths:
+            print(f"\nERROR: no MASTER files found at {args.master}")
+            print("Run first: python scripts/download_faa_full.py")
+            return 1
+
+        if args.lookup:
+            return run_lookup(args, paths)
+        if args.diff:
+            return run_diff(args, paths)
+
+        if not os.path.exists(args.acftref):
+            print(f"\nERROR: ACFTREF.txt not found at {args.acftref}")
+            return 1
+        source_date = files_release_date(paths)
+
+    shadow = None
+    try:
+        deferred = defer_indexes(args)
+        if args.swap:
+            shadow = start_swap(args)
+    except (ImportError, ValueError) as e:
+        print(f"\nERROR: {e}")
+        return 1
+
+    if args.workers != 1:
+        return run_workers(args, paths, shadow, deferred, telemetry)
+
+    print("\nLoading reference data...")
+    with timed_stage(telemetry, 'reference'):
+        if release is not None:
+            try:
+                acftref, engines = release.references()
+            except (ValueError, OSError, zlib.error) as e:
+                print(f"\nERROR: {e}")
+                return 1
+        else:
+            acftref, engines = load_reference_data(args.acftref, args.engine, INDEX_DIR)
+    print(f"  {len(acftref):,} aircraft models, {len(engines):,} engine models")
+
+    try:
+        sink = make_sink(args.sink, azure_mode=args.azure_mode, history=args.history)
+    except ValueError as e:
+        print(f"\nERROR: {e}")
+        return 1
+    if args.writers > 1 and isinstance(sink, (FileSink, BcpFileSink, SnapshotSink)):
+        print("\nERROR: a file sink cannot be shared between writer threads; use --writers 1")
+        return 1
+    is_bcp = isinstance(sink, BcpFileSink)
+    # Sinks that rebuild their output from scratch on every run
+    full_build = is_bcp or isinstance(sink, SnapshotSink)
+    if args.bulk_load and not is_bcp:
+        print("\nERROR: --bulk-load loads the files of a bcp:PATH sink")
+        return 1
+    if (args.delta or changes) and full_build:
+        print(f"\nERROR: a {sink.name} sink writes a full snapshot; it cannot carry --delta/--changes deletes")
+        return 1
+
+    # A change set deletes its removed N-numbers the way a delta load does
+    delta = changes
+    if args.delta:
+        state_path = args.delta_state or default_delta_state(args.sink)
+        delta = DeltaFilter(HashState(state_path))
+        print(f"\nDelta mode: {len(delta.previous):,} hashes from {state_path}")
+
+    # A delta load has to see the whole release, so it never resumes part-way;
+    # bcp files and snapshots are rebuilt from the start on every run, and
+    # a streamed release or a change set has no file offsets to resume from
+    checkpoint = None
+    if not args.no_checkpoint and not args.delta and not full_build and release is None and changes is None:
+        checkpoint = Checkpoint(checkpoint_path(CHECKPOINT_DIR, args.sink, paths), paths)
+        if args.restart:
+            checkpoint.clear()
+
+    adaptive = None
+    try:
+        settings = adaptive_settings(args)
+        if settings:
+            adaptive = AdaptiveBatchSize(**settings)
+        # A change set is only part of the release, so it has no fleet counts to give
+        aggregates = fleet_aggregates(args, sink.name, source_date) if changes is None else None
+    except ValueError as e:
+        print(f"\nERROR: {e}")
+        return 1
+
+    if release is not None:
+        print(f"\nLoading MASTER.txt from the download into {sink.name} sink...")
+    elif changes is not None:
+        print(f"\nLoading change set {args.changes} into {sink.name} sink...")
+    else:
+        total = count_records(paths)
+        print(f"\nLoading {len(paths)} MASTER file(s)"
+              + (f" ({total:,} records)" if total is not None else "") + f" into {sink.name} sink...")
+    parsed = None
+    if release is not None:
+        parsed = release.master_records(args.parser)
+    elif changes is not None:
+        parsed = changes.records()
+    # A bcp sink only writes files; its indexes are deferred around the bulk load
+    try:
+        with deferred if deferred and not is_bcp else contextlib.nullcontext():
+            stats = run_pipeline(paths, sink, acftref, engines, batch_size=args.batch_size, parser=args.parser,
+                                 delta=delta, checkpoint=checkpoint, writers=args.writers,
+                                 sink_factory=lambda: make_sink(args.sink, azure_mode=args.azure_mode,
+                                                                history=args.history),
+                                 adaptive=adaptive, cache_dir=None if args.no_parse_cache else INDEX_DIR,
+                                 aggregates=aggregates,
+                                 parsed=parsed,
+                                 telemetry=telemetry)
+    except ImportError as e:
+        print(f"\nERROR: {e}")
+        return 1
+    except (ValueError, OSError, zlib.error) as e:
+        if release is None:
+            raise
+        print(f"\nERROR: download failed: {e}")
+        return 1
+
+    print_summary(stats)
+    if release is not None:
+        print(f"  Downloaded: {release.mb:,} MB")
+    if isinstance(sink, SnapshotSink):
+        timings = sink.timings
+        for path in (sink.db_path, sink.columns_path):
+            print(f"  Snapshot: {path} ({os.path.getsize(path) / (1024 * 1024):,.1f} MB)")
+        print(f"  Snapshot build: load {timings['load']}s, indexes {timings['index']}s, "
+              f"columnar {timings['columnar']}s, vacuum {timings['vacuum']}s")
+    if not is_bcp:
+        print_index_timings(deferred)
+    status = 0
+    if args.bulk_load:
+        with timed_stage(telemetry, 'bulk_load'):
+            status = run_bulk_load(args, sink, deferred)
+    if shadow and not status:
+        with timed_stage(telemetry, 'swap'):
+            status = finish_swap(shadow, stats)
+    # Only a release that reached the live table makes the next run's "not modified"
+    # answer safe: a failed batch, bulk load or refused swap downloads it again
+    if release is not None and not status and not stats['failed_batches'] and not args.dry_run:
+        release_state.save(args.download, response.headers)
+    write_metrics(args, telemetry, stats)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Columnar MASTER.txt parser.
+
+Reads MASTER files in large byte chunks and cuts every field in
+layout.MASTER_FIELDS out of the whole chunk at once with NumPy, instead of
+slicing and stripping 22 strings per line. Columns stay as fixed-width
+latin-1 byte arrays (one byte per character, no per-value objects) until a
+caller asks for str values, which match parse_master_line() exactly. Values
+of the low-cardinality fields (layout.MASTER_DICTIONARY_FIELDS) go through a
+string pool kept for the whole run, so each city, date or code is one str
+object however many records repeat it.
+
+Requires numpy (pulled in by pandas, see requirements.txt).
+"""
+
+import sys
+
+import numpy as np
+
+from .layout import MASTER_DICTIONARY_FIELDS, MASTER_FIELDS, MASTER_MIN_LENGTH
+from .parse import MASTER_HEADER_PREFIX
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Record width covered by the field spec
+MASTER_WIDTH = max(spec.end for spec in MASTER_FIELDS)
+
+# Characters str.strip() removes from a latin-1 decoded string
+LATIN1_WHITESPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0'
+
+
+class StringDictionary:
+    """Distinct bytes values of a field, decoded to interned str once on first use."""
+
+    def __init__(self, values):
+        self.values = values
+        self._strings = None
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def strings(self):
+        if self._strings is None:
+            self._strings = [sys.intern(value) for value in decode_latin1(self.values).tolist()]
+        return self._strings
+
+
+def code_dtype(size):
+    """Smallest integer dtype for codes into a dictionary of `size` values."""
+    if size <= 1 << 8:
+        return np.uint8
+    return np.uint16 if size <= 1 << 16 else np.int32
+
+
+def sort_keys(column):
+    """Keys with the same order and equality as a bytes array's values, for sorting and searching.
+
+    Up to 8 bytes wide these are big-endian integers, which NumPy sorts and
+    searches far faster than bytes; wider columns are returned as they are.
+    """
+    width = column.dtype.itemsize
+    if width > 8:
+        return column
+    grid = np.zeros((len(column), 8), dtype=np.uint8)
+    grid[:, :width] = column.view(np.uint8).reshape(len(column), width)
+    return grid.view('>u8').ravel().astype(np.uint64)
+
+
+def key_values(keys, width):
+    """Inverse of sort_keys(): bytes values of width `width`."""
+    if keys.dtype.kind == 'S':
+        return keys
+    return keys.astype('>u8').view('S8').astype(f'S{width}')
+
+
+def dictionary_encode(column):
+    """Bytes array -> (StringDictionary of its distinct values, codes)."""
+    _, first, codes = np.unique(sort_keys(column), return_index=True, return_inverse=True)
+    values = column[first]
+    return StringDictionary(values), codes.astype(code_dtype(len(values)))
+
+
+class MasterColumns:
+    """One chunk of parsed MASTER records as {field name: bytes array}.
+
+    A field can also be held as integer codes into a StringDictionary
+    (dictionaries); the parse cache stores MASTER_DICTIONARY_FIELDS that way.
+    """
+
+    def __init__(self, columns, offsets=None, dictionaries=None):
+        self.columns = columns
+        # Byte offset just past each record in its file
+        self.offsets = offsets
+        self.dictionaries = dictionaries or {}
+
+    def __len__(self):
+        return len(self.columns['n_number'])
+
+    def __getitem__(self, name):
+        """Bytes values of one field; dictionary-encoded fields are expanded."""
+        dictionary = self.dictionaries.get(name)
+        if dictionary is None:
+            return self.columns[name]
+        return dictionary.values[self.columns[name]]
+
+    @property
+    def nbytes(self):
+        return (sum(column.nbytes for column in self.columns.values())
+                + sum(dictionary.values.nbytes for dictionary in self.dictionaries.values()))
+
+    def encoded(self, name):
+        """(StringDictionary, codes) of one field, encoding it here if it is stored plain."""
+        dictionary = self.dictionaries.get(name)
+        if dictionary is not None:
+            return dictionary, self.columns[name]
+        return dictionary_encode(self.columns[name])
+
+    def column(self, name, pool=None):
+        """Decoded str values of one field, as a list.
+
+        A dictionary-encoded field decodes each distinct value once and
+        repeats the same str objects. So does a MASTER_DICTIONARY_FIELDS
+        field given a pool ({str: str}, kept across chunks by the caller).
+        """
+        dictionary = self.dictionaries.get(name)
+        if dictionary is not None:
+            return list(map(dictionary.strings.__getitem__, self.columns[name].tolist()))
+        values = decode_latin1(self.columns[name]).tolist()
+        if pool is not None and name in MASTER_DICTIONARY_FIELDS:
+            return list(map(pool.setdefault, values, values))
+        return values
+
+    def records(self, pool=None):
+        """Yield dicts identical to parse_master_line() output; pool as for column()."""
+        if pool is None:
+            pool = {}
+        names = list(self.columns)
+        for values in zip(*(self.column(name, pool) for name in names)):
+            yield dict(zip(names, values))
+
+    def to_frame(self):
+        """pandas DataFrame with one str column per field; low-cardinality fields are categoricals."""
+        import pandas as pd
+        frame = {}
+        for name in self.columns:
+            if name in MASTER_DICTIONARY_FIELDS or name in self.dictionaries:
+                dictionary, codes = self.encoded(name)
+                frame[name] = pd.Categorical.from_codes(codes.astype(np.int32), dictionary.strings)
+            else:
+                frame[name] = self.column(name)
+        return pd.DataFrame(frame)
+
+
+def decode_latin1(column):
+    """Bytes array -> str array. Latin-1 maps each byte to the same code point,
+    so widening the bytes to UCS-4 is an exact (and vectorized) decode."""
+    width = column.dtype.itemsize
+    if len(column) == 0:
+        return column.astype(f'U{width}')
+    grid = column.view(np.uint8).reshape(len(column), width)
+    return grid.astype(np.uint32).view(f'U{width}').ravel()
+
+
+def read_chunks(path, chunk_bytes=DEFAULT_CHUNK_BYTES, start_offset=0, end_offset=None):
+    """Yield (offset, chunk) pairs of a file; chunks always end on a line boundary.
+
+    end_offset (exclusive, on a line boundary) stops reading early.
+    """
+    with open(path, 'rb') as f:
+        if start_offset:
+            f.seek(start_offset)
+        offset = start_offset
+        remaining = None if end_offset is None else end_offset - start_offset
+        tail = b''
+        while True:
+            size = chunk_bytes if remaining is None else min(chunk_bytes, remaining)
+            data = f.read(size) if size > 0 else b''
+            if remaining is not None:
+                remaining -= len(data)
+            if not data:
+                break
+            data = tail + data
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                tail = data
+                continue
+            tail = data[cut:]
+            yield offset, data[:cut]
+            offset += cut
+        if tail:
+            yield offset, tail
+
+
+def parse_master_chunk(chunk, base_offset=0):
+    """Parse a block of MASTER lines into MasterColumns.
+
+    base_offset is the chunk's position in its file, used for record offsets.
+    """
+    lines = chunk.split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    if not lines:
+        empty = {spec.name: np.array([], dtype='S1') for spec in MASTER_FIELDS}
+        return MasterColumns(empty, np.array([], dtype=np.int64))
+
+    # Bytes each line occupies in the file, including its newline
+    sizes = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines)) + 1
+    if not chunk.endswith(b'\n'):
+        sizes[-1] -= 1
+    offsets = base_offset + np.cumsum(sizes)
+
+    # parse_master_line() sees the line with a single trailing newline
+    carriage = np.fromiter((line.endswith(b'\r') for line in lines), dtype=bool, count=len(lines))
+    lengths = sizes - carriage
+
+    raw = np.array(lines, dtype=f'S{MASTER_WIDTH}')
+    grid = raw.view(np.uint8).reshape(len(lines), MASTER_WIDTH)
+
+    columns = {}
+    for spec in MASTER_FIELDS:
+        width = spec.end - spec.start
+        field = np.ascontiguousarray(grid[:, spec.start:spec.end]).view(f'S{width}').ravel()
+        columns[spec.name] = np.char.strip(field, LATIN1_WHITESPACE)
+
+    keep = (
+        (lengths >= MASTER_MIN_LENGTH)
+        & (columns['n_number'] != b'')
+        & ~np.char.startswith(raw, MASTER_HEADER_PREFIX.encode())
+    )
+    columns = {name: column[keep] for name, column in columns.items()}
+    columns['n_number'] = np.char.add(b'N', columns['n_number'])
+    return MasterColumns(columns, offsets[keep])
+
+
+def iter_master_columns(paths, chunk_bytes=DEFAULT_CHUNK_BYTES, start_offset=0, end_offset=None):
+    """Yield (path, MasterColumns) for each chunk of each MASTER file.
+
+    start_offset applies to the first file and end_offset to the last.
+    """
+    last = len(paths) - 1
+    for i, path in enumerate(paths):
+        start = start_offset if i == 0 else 0
+        end = end_offset if i == last else None
+        for offset, chunk in read_chunks(path, chunk_bytes, start, end):
+            yield path, parse_master_chunk(chunk, offset)
+
+
+def iter_parsed_records(paths, chunk_bytes=DEFAULT_CHUNK_BYTES, position=None, start_offset=0, end_offset=None,
+                        cache_dir=None):
+    """Columnar drop-in for pipeline.parse_lines(read_lines(paths)).
+
+    A SourcePosition, if given, is advanced past each record as it is yielded.
+    With cache_dir, parsed files are read from and saved to the parse cache
+    (see cache.py).
+    """
+    if cache_dir:
+        from .cache import iter_cached_columns
+        chunks = iter_cached_columns(paths, cache_dir, chunk_bytes, start_offset, end_offset)
+    else:
+        chunks = iter_master_columns(paths, chunk_bytes, start_offset, end_offset)
+    # One str per distinct low-cardinality value for the whole run, not per chunk
+    pool = {}
+    for path, columns in chunks:
+        if position is None:
+            yield from columns.records(pool)
+            continue
+        position.path = path
+        for record, offset in zip(columns.records(pool), columns.offsets.tolist()):
+            position.offset = offset
+            yield record
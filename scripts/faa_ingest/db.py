@@ -0,0 +1,28 @@
+"""
+Azure SQL connection settings shared by the ingestion sinks.
+"""
+
+import os
+
+# Azure SQL connection settings
+AZURE_SERVER = os.environ.get('AZURE_SERVER', 'aviation-server-dk.database.windows.net')
+AZURE_DATABASE = os.environ.get('AZURE_DATABASE', 'aviation_db')
+AZURE_USER = os.environ.get('AZURE_USER', 'CloudSA183a5780')
+AZURE_PASSWORD = os.environ.get('AZURE_PASSWORD', 'Password123')
+
+
+def get_connection():
+    """Get Azure SQL connection."""
+    try:
+        import pymssql
+    except ImportError:
+        raise ImportError("pymssql not installed. Install with: pip install pymssql")
+
+    return pymssql.connect(
+        server=AZURE_SERVER,
+        database=AZURE_DATABASE,
+        user=AZURE_USER,
+        password=AZURE_PASSWORD,
+        charset='UTF-8',
+        autocommit=False,
+    )
@@ -0,0 +1,116 @@
+"""
+Content-hash delta loading between FAA releases.
+
+A HashState remembers a 64-bit content hash per N-number from the last
+successful load into a given sink. DeltaFilter compares the new release
+against it in the same streaming pass: only inserted and changed records
+continue down the pipeline, and N-numbers that disappeared are returned by
+removed() so the sink can delete them. A daily refresh then only touches the
+rows that actually changed.
+
+The comparison assumes the source is a full release; loading a single shard
+with --delta would report every other shard's aircraft as removed.
+"""
+
+import hashlib
+import os
+import sqlite3
+
+from .layout import AIRCRAFT_KEYS
+
+# Hashed fields in a fixed order, so saved hashes survive changes to the
+# column layout (N_NUMBER_KEY has always been hashed second)
+HASH_KEYS = ['n_number', 'n_number_key'] + [key for key in AIRCRAFT_KEYS if key not in ('n_number', 'n_number_key')]
+
+
+def record_hash(record):
+    """Stable signed 64-bit hash of an aircraft record's AircraftMaster values."""
+    payload = '\x1f'.join(str(record[key]) for key in HASH_KEYS).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'big', signed=True)
+
+
+class HashState:
+    """Per-N-number content hashes from the previous load, kept in SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE IF NOT EXISTS AircraftHash (N_NUMBER TEXT PRIMARY KEY, HASH INTEGER NOT NULL)")
+        return conn
+
+    def load(self):
+        """{n_number: hash} from the last saved load (empty on first run)."""
+        if not os.path.exists(self.path):
+            return {}
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT N_NUMBER, HASH FROM AircraftHash"))
+        finally:
+            conn.close()
+
+    def save(self, hashes):
+        """Replace the stored hashes in one transaction."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM AircraftHash")
+                conn.executemany("INSERT INTO AircraftHash (N_NUMBER, HASH) VALUES (?, ?)", hashes.items())
+        finally:
+            conn.close()
+
+
+class DeltaFilter:
+    """Pass through only new or changed records and track what was removed."""
+
+    def __init__(self, state):
+        self.state = state
+        self.previous = state.load()
+        self.seen = set()
+        self.pending = {}
+        self.committed = {}
+        self.stats = {'inserted': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+
+    def changed(self, records):
+        """Yield records whose content hash differs from the previous load."""
+        previous = self.previous
+        seen = self.seen
+        pending = self.pending
+        for record in records:
+            n_number = record['n_number']
+            seen.add(n_number)
+            digest = record_hash(record)
+            old = previous.get(n_number)
+            if old == digest:
+                self.stats['unchanged'] += 1
+                continue
+            self.stats['inserted' if old is None else 'changed'] += 1
+            pending[n_number] = digest
+            yield record
+
+    def commit(self, batch):
+        """Mark a batch the sink stored successfully as loaded."""
+        for record in batch:
+            n_number = record['n_number']
+            if n_number in self.pending:
+                self.committed[n_number] = self.pending.pop(n_number)
+
+    def removed(self):
+        """N-numbers in the previous load that the new release no longer has."""
+        gone = sorted(set(self.previous) - self.seen)
+        self.stats['removed'] = len(gone)
+        return gone
+
+    def save(self, deleted=()):
+        """Persist hashes: previous state + committed changes - deleted rows.
+
+        Records whose batch failed keep their old hash (or none), so the next
+        run sends them again.
+        """
+        hashes = dict(self.previous)
+        hashes.update(self.committed)
+        for n_number in deleted:
+            hashes.pop(n_number, None)
+        self.state.save(hashes)
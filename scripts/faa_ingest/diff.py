@@ -0,0 +1,216 @@
+"""
+Release-to-release registry diff: what changed between two MASTER snapshots.
+
+Both snapshots are walked in N-number order through their MasterIndex
+(cached in data/index, one vectorized scan per new file). The records come
+straight off the mmap'd files, so a diff is a single merge join: linear in
+the two releases, and memory stays at the indexes' offset arrays whatever
+the file size. Lines that are byte-for-byte identical are skipped without
+being parsed; only the rest are parsed and compared field by field.
+
+Every difference becomes one change row, categorized like the history
+events (history.py):
+
+    REGISTERED      N-number only in the new release
+    REMOVED         N-number only in the old release (deregistered / dropped)
+    OWNER_CHANGE    NAME or TYPE_REGISTRANT changed
+    STATUS_CHANGE   STATUS_CODE changed
+    UPDATED         any other MASTER field changed
+
+A record can be both an OWNER_CHANGE and a STATUS_CHANGE; CHANGE then holds
+both, joined by '|'. The change set is written as CSV or NDJSON (by
+extension). It carries every MASTER field of the new record (of the old one
+for REMOVED), so ChangeSet can feed it back into run_pipeline() as an
+incremental load: changed and new records are upserted, removed N-numbers
+deleted.
+
+Requires numpy (through master_index).
+"""
+
+import csv
+import heapq
+import json
+import os
+from collections import Counter
+
+from .layout import MASTER_FIELDS
+from .master_index import MasterIndex, open_mmap
+from .parse import parse_master_line
+
+REGISTERED = 'REGISTERED'
+REMOVED = 'REMOVED'
+OWNER_CHANGE = 'OWNER_CHANGE'
+STATUS_CHANGE = 'STATUS_CHANGE'
+UPDATED = 'UPDATED'
+CATEGORIES = (REGISTERED, REMOVED, OWNER_CHANGE, STATUS_CHANGE, UPDATED)
+
+OWNER_FIELDS = ('name', 'type_registrant')
+MASTER_KEYS = [spec.name for spec in MASTER_FIELDS]
+# Previous values carried along for the categories operations look at
+OLD_KEYS = ['name', 'type_registrant', 'status_code']
+# Index entries turned into Python objects at a time
+SORTED_CHUNK = 65536
+CHANGE_COLUMNS = (['CHANGE', 'CHANGED_FIELDS'] + [key.upper() for key in MASTER_KEYS]
+                  + [f"OLD_{key.upper()}" for key in OLD_KEYS])
+
+
+def _sorted_lines(path, cache_dir):
+    """(key, raw line) for each N-number of one MASTER file, in key order; the last of a repeated key wins."""
+    index = MasterIndex.load_or_build(path, cache_dir)
+    mm = open_mmap(path)
+    if mm is None:
+        return
+    try:
+        count = len(index.keys)
+        # Plain Python keys/offsets a slice at a time: fast to compare, bounded in memory
+        for chunk_start in range(0, count, SORTED_CHUNK):
+            keys = index.keys[chunk_start:chunk_start + SORTED_CHUNK + 1].tolist()
+            offsets = index.key_offsets[chunk_start:chunk_start + SORTED_CHUNK].tolist()
+            for i, offset in enumerate(offsets):
+                if i + 1 < len(keys) and keys[i + 1] == keys[i]:
+                    continue
+                end = mm.find(b'\n', offset)
+                yield keys[i], mm[offset:end if end >= 0 else len(mm)].rstrip(b'\r\n')
+    finally:
+        mm.close()
+
+
+def iter_sorted_lines(paths, cache_dir):
+    """(key, raw line) across all files of a release (e.g. MASTER-1..9), merged in key order.
+
+    An N-number in more than one file is taken from the later file, as a
+    full load would leave it.
+    """
+    merged = heapq.merge(*(_sorted_lines(path, cache_dir) for path in paths), key=lambda item: item[0])
+    pending = None
+    for item in merged:
+        if pending is not None and pending[0] != item[0]:
+            yield pending
+        pending = item
+    if pending is not None:
+        yield pending
+
+
+def _parse(raw):
+    return parse_master_line(raw.decode('latin-1'))
+
+
+def compare(old, new):
+    """(categories, changed field names) between two parsed records of one N-number."""
+    changed = [key for key in MASTER_KEYS if old[key] != new[key]]
+    categories = []
+    if any(key in changed for key in OWNER_FIELDS):
+        categories.append(OWNER_CHANGE)
+    if 'status_code' in changed:
+        categories.append(STATUS_CHANGE)
+    if changed and not categories:
+        categories.append(UPDATED)
+    return categories, changed
+
+
+def diff_releases(old_paths, new_paths, cache_dir):
+    """Yield change dicts (n_number, change, changed_fields, old, new) in N-number order."""
+    old_lines = iter_sorted_lines(old_paths, cache_dir)
+    new_lines = iter_sorted_lines(new_paths, cache_dir)
+    old_item = next(old_lines, None)
+    new_item = next(new_lines, None)
+    while old_item is not None or new_item is not None:
+        if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+            old = _parse(old_item[1])
+            yield {'n_number': old['n_number'], 'change': REMOVED, 'changed_fields': [], 'old': old, 'new': None}
+            old_item = next(old_lines, None)
+        elif old_item is None or new_item[0] < old_item[0]:
+            new = _parse(new_item[1])
+            yield {'n_number': new['n_number'], 'change': REGISTERED, 'changed_fields': [], 'old': None, 'new': new}
+            new_item = next(new_lines, None)
+        else:
+            if old_item[1] != new_item[1]:
+                old, new = _parse(old_item[1]), _parse(new_item[1])
+                categories, changed = compare(old, new)
+                if categories:
+                    yield {'n_number': new['n_number'], 'change': '|'.join(categories),
+                           'changed_fields': changed, 'old': old, 'new': new}
+            old_item = next(old_lines, None)
+            new_item = next(new_lines, None)
+
+
+def change_row(change):
+    """Change dict -> CSV row in CHANGE_COLUMNS order."""
+    record = change['new'] or change['old']
+    old = change['old'] if change['new'] is not None else None
+    return ([change['change'], ' '.join(change['changed_fields'])]
+            + [record[key] for key in MASTER_KEYS]
+            + [old[key] if old else '' for key in OLD_KEYS])
+
+
+def write_change_set(changes, path):
+    """Write changes to CSV or NDJSON (by extension); returns counts per category."""
+    stats = Counter({category: 0 for category in CATEGORIES})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        writer = None
+        if path.lower().endswith('.csv'):
+            writer = csv.writer(f)
+            writer.writerow(CHANGE_COLUMNS)
+        for change in changes:
+            for category in change['change'].split('|'):
+                stats[category] += 1
+            if writer is not None:
+                writer.writerow(change_row(change))
+            else:
+                f.write(json.dumps(change) + '\n')
+    os.replace(tmp, path)
+    return dict(stats)
+
+
+def read_change_set(path):
+    """Change dicts back from a CSV or NDJSON change set."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if not path.lower().endswith('.csv'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        for row in csv.DictReader(f):
+            record = {key: row[key.upper()] for key in MASTER_KEYS}
+            removed = row['CHANGE'] == REMOVED
+            yield {'n_number': record['n_number'], 'change': row['CHANGE'],
+                   'changed_fields': row['CHANGED_FIELDS'].split(),
+                   'old': record if removed else None, 'new': None if removed else record}
+
+
+class ChangeSet:
+    """A change set as an incremental load, in place of a DeltaFilter.
+
+    records() yields the new records of REGISTERED/changed rows as parsed
+    MASTER records for run_pipeline(parsed=...); removed() then lists the
+    REMOVED N-numbers for the sink to delete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.gone = []
+        self.stats = {'inserted': 0, 'changed': 0, 'removed': 0}
+
+    def records(self):
+        for change in read_change_set(self.path):
+            if change['change'] == REMOVED:
+                self.gone.append(change['n_number'])
+                continue
+            self.stats['inserted' if change['change'] == REGISTERED else 'changed'] += 1
+            yield change['new']
+
+    # DeltaFilter interface used by run_pipeline()
+    def changed(self, records):
+        return records
+
+    def commit(self, batch):
+        pass
+
+    def removed(self):
+        self.stats['removed'] = len(self.gone)
+        return self.gone
+
+    def save(self, deleted=()):
+        pass
@@ -0,0 +1,370 @@
+"""
+Conditional, streaming download of the FAA ReleasableAircraft.zip.
+
+open_release() sends the ETag / Last-Modified validators saved after the
+last successful load (If-None-Match / If-Modified-Since). When the FAA has
+not published a new release the server answers 304 and the run is over
+after that single round trip.
+
+Otherwise StreamedRelease reads the zip straight off the HTTP response:
+iter_zip_members() walks the local file headers in archive order and
+inflates each member incrementally, so nothing is written to disk and no
+member is held in memory whole except the small reference files. ACFTREF
+and ENGINE (which come before MASTER in the FAA archive) are parsed into
+lookups first; MASTER's bytes then go directly to the columnar or line
+parser as they arrive. A save_dir tees every member to disk on the way
+(download_faa_full.py), still without a zip file or a separate extract.
+
+Any HTTP server that honours If-Modified-Since works as a local stand-in,
+e.g. `python -m http.server` over a directory holding a zip written by
+synthetic.write_release_zip().
+"""
+
+import email.utils
+import io
+import json
+import os
+import struct
+import time
+import urllib.error
+import urllib.request
+import zlib
+
+from .layout import ACFTREF_FIELDS, ACFTREF_MIN_LENGTH, ENGINE_FIELDS, ENGINE_MIN_LENGTH
+from .parse import parse_reference_lines
+from .pipeline import parse_lines
+
+RELEASE_URL = 'https://registry.faa.gov/database/ReleasableAircraft.zip'
+STREAM_CHUNK_BYTES = 1024 * 1024
+DEFAULT_TIMEOUT = 60
+# registry.faa.gov rejects requests without a browser-like agent
+USER_AGENT = 'Mozilla/5.0 (compatible; faa-ingest)'
+
+LOCAL_HEADER = b'PK\x03\x04'
+CENTRAL_HEADER = b'PK\x01\x02'
+DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+LOCAL_HEADER_FORMAT = '<HHHHHIIIHH'
+ZIP64_EXTRA_ID = 0x0001
+FLAG_DESCRIPTOR = 0x08
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+REFERENCE_MEMBERS = {
+    'ACFTREF.TXT': (ACFTREF_FIELDS, ACFTREF_MIN_LENGTH),
+    'ENGINE.TXT': (ENGINE_FIELDS, ENGINE_MIN_LENGTH),
+}
+MASTER_MEMBER = 'MASTER.TXT'
+
+
+class ReleaseState:
+    """ETag / Last-Modified of the last fully loaded release, per URL, in a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, url):
+        return self.load().get(url) or {}
+
+    def save(self, url, headers):
+        """Remember a response's validators once its release has been loaded."""
+        state = self.load()
+        state[url] = {
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def last_modified_time(headers):
+    """A response's Last-Modified as a POSIX timestamp; None if absent or unparseable."""
+    value = headers.get('Last-Modified')
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def conditional_headers(entry):
+    headers = {'User-Agent': USER_AGENT}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def open_release(url=RELEASE_URL, state=None, timeout=DEFAULT_TIMEOUT):
+    """GET the release, conditional on state's validators. None when it is unchanged (304)."""
+    request = urllib.request.Request(url, headers=conditional_headers(state.get(url) if state else {}))
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise
+
+
+class _Reader:
+    """Exact-size reads from a non-seekable stream, with push-back."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = b''
+        self.bytes_read = 0
+
+    def read(self, size):
+        """Up to size bytes; fewer only at end of stream."""
+        parts = [self.buffer[:size]]
+        self.buffer = self.buffer[size:]
+        have = len(parts[0])
+        while have < size:
+            data = self.stream.read(size - have)
+            if not data:
+                break
+            self.bytes_read += len(data)
+            parts.append(data)
+            have += len(data)
+        return b''.join(parts)
+
+    def read_exact(self, size):
+        data = self.read(size)
+        if len(data) != size:
+            raise ValueError("release zip ended in the middle of a member")
+        return data
+
+    def unread(self, data):
+        self.buffer = data + self.buffer
+
+
+def _zip64_sizes(extra, compressed, uncompressed):
+    """Sizes from a zip64 extra field, for headers that store 0xFFFFFFFF."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        field_id, size = struct.unpack_from('<HH', extra, pos)
+        if field_id == ZIP64_EXTRA_ID:
+            values = list(struct.unpack_from(f'<{size // 8}Q', extra, pos + 4))
+            if uncompressed == 0xFFFFFFFF and values:
+                uncompressed = values.pop(0)
+            if compressed == 0xFFFFFFFF and values:
+                compressed = values.pop(0)
+            return compressed, uncompressed, True
+        pos += 4 + size
+    return compressed, uncompressed, False
+
+
+def _member_data(reader, method, flags, compressed, chunk_bytes):
+    """Yield a member's uncompressed bytes; returns (crc, size) through StopIteration."""
+    crc = 0
+    size = 0
+    known_size = not flags & FLAG_DESCRIPTOR
+    if method == METHOD_STORED:
+        if not known_size:
+            raise ValueError("stored zip members with a trailing data descriptor cannot be streamed")
+        remaining = compressed
+        while remaining:
+            data = reader.read_exact(min(chunk_bytes, remaining))
+            remaining -= len(data)
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            yield data
+        return crc, size
+    if method != METHOD_DEFLATED:
+        raise ValueError(f"unsupported zip compression method {method}")
+
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    remaining = compressed if known_size else None
+    while not inflater.eof:
+        data = reader.read(chunk_bytes if remaining is None else min(chunk_bytes, remaining))
+        if not data:
+            raise ValueError("release zip ended in the middle of a member")
+        if remaining is not None:
+            remaining -= len(data)
+        out = inflater.decompress(data)
+        if out:
+            crc = zlib.crc32(out, crc)
+            size += len(out)
+            yield out
+    # Bytes read past the end of the deflate stream belong to what follows
+    reader.unread(inflater.unused_data)
+    return crc, size
+
+
+def iter_zip_members(stream, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Yield (name, chunks) for each member of a zip read front to back.
+
+    chunks is a generator of uncompressed bytes; each member is CRC-checked
+    when its data ends. A member the caller does not drain is skipped over.
+    """
+    reader = stream if isinstance(stream, _Reader) else _Reader(stream)
+    while True:
+        signature = reader.read(4)
+        if signature != LOCAL_HEADER:
+            if signature in (CENTRAL_HEADER, b'PK\x05\x06', b''):
+                return
+            raise ValueError("not a zip stream (bad local file header)")
+        (_, flags, method, _, _, crc, compressed, uncompressed,
+         name_length, extra_length) = struct.unpack(LOCAL_HEADER_FORMAT, reader.read_exact(26))
+        name = reader.read_exact(name_length).decode('utf-8' if flags & 0x800 else 'cp437')
+        extra = reader.read_exact(extra_length)
+        compressed, uncompressed, zip64 = _zip64_sizes(extra, compressed, uncompressed)
+
+        def chunks():
+            crc_read, size_read = yield from _member_data(reader, method, flags, compressed, chunk_bytes)
+            expected_crc, expected_size = crc, uncompressed
+            if flags & FLAG_DESCRIPTOR:
+                descriptor = reader.read_exact(4)
+                if descriptor == DESCRIPTOR_SIGNATURE:
+                    descriptor = reader.read_exact(4)
+                sizes = reader.read_exact(16 if zip64 else 8)
+                expected_crc = struct.unpack('<I', descriptor)[0]
+                expected_size = struct.unpack('<QQ' if zip64 else '<II', sizes)[1]
+            # Checked before the last chunk is handed on returns, so a bad member never looks complete
+            if crc_read != expected_crc or size_read != expected_size:
+                raise ValueError(f"{name}: CRC or size mismatch in the release zip")
+
+        data = chunks()
+        yield name, data
+        for _ in data:
+            pass
+
+
+def iter_lines(chunks):
+    """Decoded MASTER lines from byte chunks, as pipeline.read_lines() yields them."""
+    tail = b''
+    for chunk in chunks:
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for raw in lines:
+            if raw.endswith(b'\r'):
+                raw = raw[:-1]
+            yield (raw + b'\n').decode('latin-1')
+    if tail:
+        yield tail.decode('latin-1')
+
+
+def iter_line_blocks(chunks, block_bytes):
+    """Re-cut byte chunks into blocks of about block_bytes that end on a line boundary."""
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= block_bytes:
+            data = b''.join(pending)
+            cut = data.rfind(b'\n') + 1
+            if cut:
+                yield data[:cut]
+                pending, size = [data[cut:]], len(data) - cut
+    data = b''.join(pending)
+    if data:
+        yield data
+
+
+def iter_stream_records(chunks, parser='columnar'):
+    """Parsed MASTER records from a byte stream, with the line or columnar parser."""
+    if parser == 'line':
+        yield from parse_lines(iter_lines(chunks))
+        return
+    from .columnar import DEFAULT_CHUNK_BYTES, parse_master_chunk
+    offset = 0
+    for block in iter_line_blocks(chunks, DEFAULT_CHUNK_BYTES):
+        yield from parse_master_chunk(block, offset).records()
+        offset += len(block)
+
+
+class StreamedRelease:
+    """The members of a release zip, consumed once, in archive order, from a stream.
+
+    references() reads up to MASTER and returns the ACFTREF/ENGINE lookups;
+    master_records() then parses MASTER as it downloads. Other members are
+    skipped, or written to save_dir when one is given.
+    """
+
+    def __init__(self, stream, save_dir=None, chunk_bytes=STREAM_CHUNK_BYTES):
+        self.reader = _Reader(stream)
+        self.members = iter_zip_members(self.reader, chunk_bytes)
+        self.save_dir = save_dir
+        self.lookups = {}
+        self.saved = []
+        self._buffered_master = None
+
+    @property
+    def mb(self):
+        return round(self.reader.bytes_read / (1024 * 1024), 1)
+
+    def _tee(self, name, chunks):
+        """Pass chunks through, also writing them to save_dir/name."""
+        if not self.save_dir:
+            yield from chunks
+            return
+        path = os.path.join(self.save_dir, os.path.basename(name))
+        os.makedirs(self.save_dir, exist_ok=True)
+        with open(path + '.part', 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(path + '.part', path)
+        self.saved.append(path)
+
+    def references(self):
+        """(acftref, engines) dicts, read from the members before MASTER.
+
+        If MASTER comes first it is held in memory until both are found.
+        """
+        while len(self.lookups) < len(REFERENCE_MEMBERS):
+            member = next(self.members, None)
+            if member is None:
+                break
+            name, chunks = member
+            key = os.path.basename(name).upper()
+            chunks = self._tee(name, chunks)
+            if key in REFERENCE_MEMBERS:
+                fields, min_length = REFERENCE_MEMBERS[key]
+                text = io.TextIOWrapper(io.BytesIO(b''.join(chunks)), encoding='latin-1')
+                self.lookups[key] = parse_reference_lines(text, fields, min_length)
+            elif key == MASTER_MEMBER:
+                # MASTER before the references: hold it until they are read
+                self._buffered_master = list(chunks)
+            else:
+                for _ in chunks:
+                    pass
+        if 'ACFTREF.TXT' not in self.lookups:
+            raise ValueError("release zip has no ACFTREF.txt before its end")
+        return self.lookups['ACFTREF.TXT'], self.lookups.get('ENGINE.TXT', {})
+
+    def _master_chunks(self):
+        if self._buffered_master is not None:
+            yield from self._buffered_master
+            self._buffered_master = []
+            return
+        for name, chunks in self.members:
+            chunks = self._tee(name, chunks)
+            if os.path.basename(name).upper() == MASTER_MEMBER:
+                yield from chunks
+                return
+            for _ in chunks:
+                pass
+        raise ValueError("release zip has no MASTER.txt")
+
+    def master_records(self, parser='columnar'):
+        """Parsed MASTER records as the member streams in; drains the rest of the zip at the end."""
+        yield from iter_stream_records(self._master_chunks(), parser)
+        self.finish()
+
+    def finish(self):
+        """Read (and save) whatever members are left, which also verifies the archive."""
+        for name, chunks in self.members:
+            for _ in self._tee(name, chunks):
+                pass
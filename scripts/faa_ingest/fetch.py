@@ -0,0 +1,267 @@
+"""
+Concurrent file downloads with range-resume and checksum verification.
+
+fetch_all() downloads a list of FetchJobs (the MASTER-1..9 shards and
+reference files of the GitHub mirror, see download_faa_full.py --mirror)
+on a bounded pool of threads, so the total time follows the bandwidth
+rather than nine sequential round trips.
+
+Each file is written to <path>.part and only renamed into place once its
+size matches what the server announced and, when a checksum is known, its
+SHA-256 matches. The response's ETag / Last-Modified are kept next to it in
+<path>.part.json. A .part left by an interrupted run or a dropped connection
+is resumed with a `Range: bytes=<size>-` request carrying them as If-Range,
+so a file that changed on the server since (next month's shard) comes back
+whole as a 200 instead of its tail being spliced onto the old bytes; so
+does a server that ignores the range. A .part without validators is never
+resumed. Failed transfers are retried (resuming each time) before the job
+is reported as failed.
+
+A TransferProgress shared by the workers prints one combined line for all
+files at most every few seconds.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = 60
+FETCH_CHUNK_BYTES = 256 * 1024
+HASH_CHUNK_BYTES = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 2.0
+USER_AGENT = 'Mozilla/5.0 (compatible; faa-ingest)'
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+# A 416 names the file's current size
+UNSATISFIED_RANGE = re.compile(r'bytes \*/(\d+)')
+
+# sha256 may be None when no checksum is published for the file
+FetchJob = namedtuple('FetchJob', ['url', 'path', 'sha256'])
+FetchJob.__new__.__defaults__ = (None,)
+
+
+class TransferProgress:
+    """Combined byte counts for concurrent transfers, printed as one line."""
+
+    def __init__(self, files, interval=PROGRESS_INTERVAL):
+        self.files = files
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.printed = self.started
+        self.sizes = {}
+        self.on_disk = {}
+        self.transferred = 0
+        self.finished = 0
+
+    @property
+    def total(self):
+        return sum(self.sizes.values())
+
+    @property
+    def done(self):
+        return sum(self.on_disk.values())
+
+    def expect(self, name, size, already=0):
+        """A transfer of name (size bytes) starts with `already` bytes on disk; restarts replace the counts."""
+        with self.lock:
+            self.sizes[name] = size
+            self.on_disk[name] = already
+
+    def add(self, name, n):
+        with self.lock:
+            self.on_disk[name] += n
+            self.transferred += n
+            now = time.perf_counter()
+            if now - self.printed < self.interval:
+                return
+            self.printed = now
+        self.report()
+
+    def file_done(self):
+        with self.lock:
+            self.finished += 1
+
+    @property
+    def mb_per_sec(self):
+        elapsed = time.perf_counter() - self.started
+        return self.transferred / (1024 * 1024) / elapsed if elapsed else 0.0
+
+    def report(self):
+        with self.lock:
+            done, total, finished = self.done, self.total, self.finished
+        mb = 1024 * 1024
+        pct = f" ({done / total * 100:.0f}%)" if total else ''
+        print(f"  {done / mb:,.1f} of {total / mb:,.1f} MB{pct}, "
+              f"{finished}/{self.files} files done, {self.mb_per_sec:.1f} MB/s")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_checksums(source):
+    """{file name: sha256} from a sha256sum-style manifest (local path or URL)."""
+    if re.match(r'https?://', source):
+        request = urllib.request.Request(source, headers={'User-Agent': USER_AGENT})
+        with urllib.request.urlopen(request, timeout=DEFAULT_TIMEOUT) as response:
+            text = response.read().decode('utf-8')
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            text = f.read()
+    checksums = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and len(parts[0]) == 64:
+            checksums[os.path.basename(parts[1].lstrip('*'))] = parts[0].lower()
+    return checksums
+
+
+def _response_range(response, offset):
+    """(start, total) of a response to a request for bytes from offset onwards."""
+    if response.status == 206:
+        match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        if not match or int(match.group(1)) != offset:
+            raise ValueError(f"unexpected Content-Range {response.headers.get('Content-Range')!r}")
+        total = match.group(3)
+        return offset, int(total) if total != '*' else None
+    length = response.headers.get('Content-Length')
+    return 0, int(length) if length else None
+
+
+def validators_path(part):
+    return part + '.json'
+
+
+def _load_validator(part):
+    """The If-Range value for resuming part: its ETag, else Last-Modified; None if unknown."""
+    try:
+        with open(validators_path(part), 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # A weak ETag is not allowed in If-Range
+    etag = saved.get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return saved.get('last_modified')
+
+
+def _save_validators(part, headers):
+    with open(validators_path(part), 'w', encoding='utf-8') as f:
+        json.dump({'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}, f)
+
+
+def discard_part(part):
+    """Remove a .part and its validators."""
+    for path in (part, validators_path(part)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _fetch_once(job, progress, timeout):
+    """One attempt at job, resuming its .part file. Returns (bytes fetched, resumed)."""
+    part = job.path + '.part'
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    validator = _load_validator(part) if offset else None
+    if offset and validator is None:
+        # Nothing to tell whether the bytes on disk are from the same version of the file
+        discard_part(part)
+        offset = 0
+    headers = {'User-Agent': USER_AGENT}
+    if offset:
+        headers['Range'] = f'bytes={offset}-'
+        headers['If-Range'] = validator
+
+    request = urllib.request.Request(job.url, headers=headers)
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            match = UNSATISFIED_RANGE.match(e.headers.get('Content-Range', ''))
+            if match and int(match.group(1)) == offset:
+                # The .part already holds the whole file
+                return 0, True
+            # Larger than the file on the server: not a prefix of it, start over
+            discard_part(part)
+            return _fetch_once(job, progress, timeout)
+        raise
+
+    with response:
+        start, total = _response_range(response, offset)
+        if not start:
+            _save_validators(part, response.headers)
+        progress.expect(job.path, total or 0, start)
+        fetched = 0
+        with open(part, 'ab' if start else 'wb') as f:
+            for chunk in iter(lambda: response.read(FETCH_CHUNK_BYTES), b''):
+                f.write(chunk)
+                fetched += len(chunk)
+                progress.add(job.path, len(chunk))
+    if total is not None and start + fetched != total:
+        raise ValueError(f"got {start + fetched:,} of {total:,} bytes")
+    return fetched, bool(start)
+
+
+def fetch(job, progress, retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT):
+    """Download job.path from job.url, verified; returns a result dict."""
+    part = job.path + '.part'
+    resumed = False
+    fetched = 0
+    for attempt in range(retries + 1):
+        try:
+            n, was_resumed = _fetch_once(job, progress, timeout)
+            fetched += n
+            resumed = resumed or was_resumed
+            break
+        except (OSError, ValueError) as e:
+            # HTTP errors other than 408/429/5xx will not change on a retry
+            if isinstance(e, urllib.error.HTTPError) and e.code < 500 and e.code not in (408, 429):
+                raise
+            if attempt == retries:
+                raise
+            print(f"  {os.path.basename(job.path)}: {e}; retrying ({attempt + 1}/{retries})")
+            time.sleep(2 ** attempt)
+
+    sha256 = file_sha256(part)
+    if job.sha256 and sha256 != job.sha256:
+        discard_part(part)
+        raise ValueError(f"SHA-256 {sha256} does not match {job.sha256}")
+    os.replace(part, job.path)
+    discard_part(part)
+    progress.file_done()
+    return {'path': job.path, 'bytes': fetched, 'sha256': sha256, 'resumed': resumed}
+
+
+def fetch_all(jobs, workers=DEFAULT_FETCH_WORKERS, retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT):
+    """Download jobs on up to `workers` threads.
+
+    Returns (results, failures): result dicts of the files fetched, and
+    (job, error) for those that still failed after their retries.
+    """
+    progress = TransferProgress(len(jobs))
+    results = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [(job, pool.submit(fetch, job, progress, retries, timeout)) for job in jobs]
+        for job, future in futures:
+            try:
+                results.append(future.result())
+            except (OSError, ValueError) as e:
+                failures.append((job, e))
+    if jobs:
+        progress.report()
+    return results, failures
@@ -0,0 +1,144 @@
+"""
+Append-only aircraft ownership/status history (AircraftHistory).
+
+Each row is one dated event for an N-number:
+
+    REGISTERED     a registration began (new tail in a load, or DEREG cert issue date)
+    OWNER_CHANGE   NAME or TYPE_REGISTRANT changed between two loads
+    STATUS_CHANGE  STATUS_CODE changed between two loads
+    DEREGISTERED   a registration was cancelled (DEREG cancel date)
+    REMOVED        the N-number dropped out of the release (delta loads)
+
+Events come from two places. load_dereg() turns the FAA DEREG file
+(cancelled registrations) into REGISTERED/DEREGISTERED pairs, and sinks
+opened with history=True compare each row they update against the row
+already stored (see snapshot_events()), so every load appends what changed
+since the previous snapshot.
+
+The table is keyed (N_NUMBER, ACTION_DATE, RECORD_HASH), where RECORD_HASH
+covers the whole event. That key makes a tail's timeline one clustered range
+scan, and re-loading the same DEREG file or release adds nothing.
+"""
+
+import hashlib
+import os
+import time
+
+from .layout import DEREG_FIELDS, DEREG_MIN_LENGTH, HISTORY_KEYS, STATUS_NAMES
+from .parse import MASTER_HEADER_PREFIX
+from .pipeline import DEFAULT_BATCH_SIZE, batched, read_lines
+
+HISTORY_TABLE = 'AircraftHistory'
+
+SOURCE_DEREG = 'DEREG'
+SOURCE_SNAPSHOT = 'SNAPSHOT'
+
+# Stored columns a sink needs from the current row to diff it (and to describe a removal)
+SNAPSHOT_KEYS = ['name', 'type_registrant', 'status_code', 'mfr', 'model', 'serial_number']
+
+
+def today():
+    return time.strftime('%Y%m%d')
+
+
+def event_hash(event):
+    """Stable signed 64-bit hash of everything in an event except the hash itself."""
+    payload = '\x1f'.join(str(event[key]) for key in HISTORY_KEYS if key != 'record_hash').encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'big', signed=True)
+
+
+def history_event(n_number, action_date, event, source, values):
+    """AircraftHistory record; values supplies the SNAPSHOT_KEYS fields."""
+    record = {
+        'n_number': n_number,
+        'action_date': action_date,
+        'record_hash': 0,
+        'event': event,
+        'source': source,
+    }
+    for key in SNAPSHOT_KEYS:
+        record[key] = values.get(key) or ''
+    record['record_hash'] = event_hash(record)
+    return record
+
+
+def snapshot_events(record, old, load_date=None):
+    """Events for one aircraft record given the stored row it replaces (None if new).
+
+    The action date is the record's LAST_ACTION_DATE when the FAA set one,
+    otherwise the load date.
+    """
+    action_date = record.get('last_action_date') or load_date or today()
+    n_number = record['n_number']
+    if old is None:
+        return [history_event(n_number, action_date, 'REGISTERED', SOURCE_SNAPSHOT, record)]
+
+    events = []
+    if (old.get('name') or '') != record['name'] or (old.get('type_registrant') or '') != record['type_registrant']:
+        events.append(history_event(n_number, action_date, 'OWNER_CHANGE', SOURCE_SNAPSHOT, record))
+    if (old.get('status_code') or '') != record['status_code']:
+        events.append(history_event(n_number, action_date, 'STATUS_CHANGE', SOURCE_SNAPSHOT, record))
+    return events
+
+
+def removal_event(n_number, old, load_date=None):
+    """REMOVED event for a row deleted because the release no longer has it."""
+    return history_event(n_number, load_date or today(), 'REMOVED', SOURCE_SNAPSHOT, old or {})
+
+
+def parse_dereg_line(line):
+    """Parse a single line from the DEREG file."""
+    if len(line) < DEREG_MIN_LENGTH or line.startswith(MASTER_HEADER_PREFIX):
+        return None
+    parsed = {spec.name: line[spec.start:spec.end].strip() for spec in DEREG_FIELDS}
+    if not parsed['n_number']:
+        return None
+    parsed['n_number'] = 'N' + parsed['n_number']
+    return parsed
+
+
+def dereg_events(parsed, acftref=None):
+    """REGISTERED (cert issue date) and DEREGISTERED (cancel date) events for one DEREG record."""
+    model = (acftref or {}).get(parsed['mfr_model_code']) or {}
+    status_code = parsed['status_code']
+    values = {
+        'name': parsed['name'],
+        'status_code': STATUS_NAMES.get(status_code, status_code),
+        'mfr': model.get('mfr', ''),
+        'model': model.get('model', ''),
+        'serial_number': parsed['serial_number'],
+    }
+    events = []
+    if parsed['cert_issue_date']:
+        events.append(history_event(parsed['n_number'], parsed['cert_issue_date'], 'REGISTERED', SOURCE_DEREG, values))
+    if parsed['cancel_date']:
+        events.append(history_event(parsed['n_number'], parsed['cancel_date'], 'DEREGISTERED', SOURCE_DEREG, values))
+    return events
+
+
+def iter_dereg_events(paths, acftref=None):
+    """Stream history events from one or more DEREG files."""
+    for line in read_lines(paths):
+        parsed = parse_dereg_line(line)
+        if parsed:
+            yield from dereg_events(parsed, acftref)
+
+
+def load_dereg(paths, sink, acftref=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Append DEREG history events through sink.write_history() and return run statistics."""
+    started = time.perf_counter()
+    events = 0
+    written = 0
+    with sink:
+        for batch in batched(iter_dereg_events(paths, acftref), batch_size):
+            events += len(batch)
+            written += sink.write_history(batch)
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': events,
+        'written': written,
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': round(events / elapsed) if elapsed else 0,
+        'sink': dict(sink.stats),
+        'files': [os.path.basename(path) for path in paths],
+    }
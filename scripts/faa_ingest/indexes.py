@@ -0,0 +1,161 @@
+"""
+Index discovery and deferred index maintenance for Azure SQL loads.
+
+Every row a load inserts or changes also has to be written into each
+nonclustered index of the table. For a large load it is cheaper to disable
+those indexes, load at heap/clustered-index speed, and rebuild each index
+once at the end with a sorted build.
+
+DeferredIndexes does that around a load:
+
+    with DeferredIndexes('AircraftMaster', online=True) as deferred:
+        ...load...
+    print(deferred.timings)
+
+Only plain (non-unique) nonclustered indexes are disabled. The clustered
+index holds the data and unique indexes enforce constraints, so those stay
+on, as do the indexes in KEEP_ENABLED: the tail-number lookup seeks
+IX_AircraftMaster_N_NUMBER_KEY and would scan the table without it. The
+indexes are rebuilt on exit even if the load failed, so the table is
+never left without them. While they are disabled, queries that would use
+them fall back to the clustered index. Use a swap reload (swap.py) if that
+is not acceptable.
+"""
+
+import time
+
+# Indexes lookups depend on while a load runs; DeferredIndexes never disables these
+KEEP_ENABLED = frozenset(['IX_AircraftMaster_N_NUMBER_KEY'])
+
+_INDEX_COLUMNS_SQL = """
+    SELECT i.name, i.type_desc, i.is_unique, i.is_primary_key, i.filter_definition,
+           c.name, ic.is_descending_key, ic.is_included_column, i.is_disabled
+    FROM sys.indexes i
+    JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE i.object_id = OBJECT_ID(%s) AND i.type IN (1, 2)
+    ORDER BY i.index_id, ic.is_included_column, ic.key_ordinal, ic.index_column_id
+"""
+
+
+def run_statements(conn, statements, fetch=False):
+    """Execute (sql, params) statements in one transaction and close conn.
+
+    Returns the last statement's rows when fetch is set.
+    """
+    try:
+        cursor = conn.cursor()
+        result = None
+        for sql, params in statements:
+            cursor.execute(sql, params)
+            if fetch:
+                result = cursor.fetchall()
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def index_definitions(cursor, table):
+    """Clustered/nonclustered rowstore indexes of a table: the clustered one first, then the primary key."""
+    cursor.execute(_INDEX_COLUMNS_SQL, (table,))
+    indexes = {}
+    for name, type_desc, unique, primary, filter_sql, column, descending, included, disabled in cursor.fetchall():
+        index = indexes.setdefault(name, {
+            'name': name, 'clustered': type_desc == 'CLUSTERED', 'unique': bool(unique),
+            'primary_key': bool(primary), 'filter': filter_sql, 'disabled': bool(disabled),
+            'columns': [], 'include': [],
+        })
+        if included:
+            index['include'].append(column)
+        else:
+            index['columns'].append(f"[{column}]" + (' DESC' if descending else ''))
+    return sorted(indexes.values(), key=lambda index: (not index['clustered'], not index['primary_key']))
+
+
+def create_index_sql(index, table, name=None, options=None):
+    """DDL that recreates an index_definitions() entry on table (optionally under another name)."""
+    name = name or index['name']
+    kind = 'CLUSTERED' if index['clustered'] else 'NONCLUSTERED'
+    columns = ', '.join(index['columns'])
+    if index['primary_key']:
+        sql = f"ALTER TABLE [{table}] ADD CONSTRAINT [{name}] PRIMARY KEY {kind} ({columns})"
+    else:
+        sql = f"CREATE {'UNIQUE ' if index['unique'] else ''}{kind} INDEX [{name}] ON [{table}] ({columns})"
+        if index['include']:
+            sql += f" INCLUDE ({', '.join(f'[{column}]' for column in index['include'])})"
+        if index['filter']:
+            sql += f" WHERE {index['filter']}"
+    if options:
+        sql += f" WITH ({options})"
+    return sql
+
+
+def deferrable(index, keep=KEEP_ENABLED):
+    """True for indexes a load can disable: nonclustered, not unique, not a key, not in keep."""
+    return not (index['clustered'] or index['unique'] or index['primary_key'] or index['name'] in keep)
+
+
+class DeferredIndexes:
+    """Disable a table's deferrable nonclustered indexes for a load, rebuild them after."""
+
+    def __init__(self, table='AircraftMaster', connect=None, online=False, keep=KEEP_ENABLED):
+        self.table = table
+        self.connect = connect
+        self.online = online
+        self.keep = keep
+        self.indexes = []
+        self.timings = {}
+        self._started = None
+
+    def _connection(self):
+        if self.connect is None:
+            from .db import get_connection
+            self.connect = get_connection
+        return self.connect()
+
+    def __enter__(self):
+        self.disable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.rebuild()
+        return False
+
+    def disable(self):
+        """Disable the deferrable indexes; returns their names."""
+        started = time.perf_counter()
+        conn = self._connection()
+        try:
+            # Indexes already disabled by an earlier interrupted run are rebuilt too
+            self.indexes = [index for index in index_definitions(conn.cursor(), self.table) if deferrable(index, self.keep)]
+        finally:
+            conn.close()
+        run_statements(self._connection(), [
+            (f"ALTER INDEX [{index['name']}] ON [{self.table}] DISABLE", None)
+            for index in self.indexes if not index['disabled']
+        ])
+        self.timings['disable'] = round(time.perf_counter() - started, 2)
+        self._started = time.perf_counter()
+        return [index['name'] for index in self.indexes]
+
+    def rebuild(self):
+        """Rebuild each disabled index (ONLINE if requested); returns the timings."""
+        if self._started is not None:
+            self.timings['load'] = round(time.perf_counter() - self._started, 2)
+            self._started = None
+        options = 'ONLINE = ON' if self.online else None
+        rebuilt = {}
+        started = time.perf_counter()
+        for index in self.indexes:
+            index_started = time.perf_counter()
+            sql = f"ALTER INDEX [{index['name']}] ON [{self.table}] REBUILD"
+            run_statements(self._connection(), [(sql + (f" WITH ({options})" if options else ''), None)])
+            rebuilt[index['name']] = round(time.perf_counter() - index_started, 2)
+        self.indexes = []
+        self.timings['rebuild'] = round(time.perf_counter() - started, 2)
+        self.timings['indexes'] = rebuilt
+        return self.timings
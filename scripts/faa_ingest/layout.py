@@ -0,0 +1,164 @@
+"""
+FAA Releasable Aircraft file layouts and code tables.
+
+Every importer used to carry its own copy of these slices. They live here
+once so the parser, the enrichment step and the sinks agree on them.
+"""
+
+from collections import namedtuple
+
+# A fixed-width field: name plus 0-indexed [start, end) slice of the line.
+FieldSpec = namedtuple('FieldSpec', ['name', 'start', 'end'])
+
+# MASTER.txt, as sliced by download_faa_full.parse_master_line()
+MASTER_FIELDS = [
+    FieldSpec('n_number', 0, 5),
+    FieldSpec('serial_number', 6, 36),
+    FieldSpec('mfr_model_code', 37, 44),
+    FieldSpec('eng_mfr_code', 45, 50),
+    FieldSpec('year_mfr', 51, 55),
+    FieldSpec('type_registrant', 56, 57),
+    FieldSpec('name', 58, 108),
+    FieldSpec('street1', 109, 142),
+    FieldSpec('street2', 143, 176),
+    FieldSpec('city', 177, 195),
+    FieldSpec('state', 196, 198),
+    FieldSpec('zip_code', 199, 209),
+    FieldSpec('region', 210, 211),
+    FieldSpec('county', 212, 215),
+    FieldSpec('country', 216, 218),
+    FieldSpec('last_action_date', 219, 227),
+    FieldSpec('cert_issue_date', 228, 236),
+    FieldSpec('airworthiness_class', 237, 238),
+    FieldSpec('air_worth_date', 239, 247),
+    FieldSpec('type_aircraft', 248, 250),
+    FieldSpec('type_engine', 251, 253),
+    FieldSpec('status_code', 254, 256),
+]
+
+# Lines shorter than this are not MASTER records
+MASTER_MIN_LENGTH = 50
+
+# MASTER fields with few distinct values (codes, places, dates): parsers hand
+# out one shared str per distinct value and caches store them dictionary-encoded
+MASTER_DICTIONARY_FIELDS = frozenset([
+    'mfr_model_code', 'eng_mfr_code', 'year_mfr', 'type_registrant', 'city', 'state', 'region',
+    'county', 'country', 'last_action_date', 'cert_issue_date', 'airworthiness_class',
+    'air_worth_date', 'type_aircraft', 'type_engine', 'status_code',
+])
+
+# ACFTREF.txt per the FAA record layout (ardata.pdf): MODEL is 20 characters,
+# followed by the aircraft/engine type codes and the number of engines.
+ACFTREF_FIELDS = [
+    FieldSpec('code', 0, 7),
+    FieldSpec('mfr', 8, 38),
+    FieldSpec('model', 39, 59),
+    FieldSpec('no_eng', 69, 71),
+]
+ACFTREF_MIN_LENGTH = 44
+
+# ENGINE.txt per the FAA record layout: the 5-character code is what MASTER's
+# ENG MFR MDL (eng_mfr_code) refers to.
+ENGINE_FIELDS = [
+    FieldSpec('code', 0, 5),
+    FieldSpec('mfr', 6, 16),
+    FieldSpec('model', 17, 30),
+]
+ENGINE_MIN_LENGTH = 30
+
+# DEREG.txt (cancelled registrations) per the FAA record layout
+DEREG_FIELDS = [
+    FieldSpec('n_number', 0, 5),
+    FieldSpec('serial_number', 6, 36),
+    FieldSpec('mfr_model_code', 37, 44),
+    FieldSpec('status_code', 45, 46),
+    FieldSpec('name', 47, 97),
+    FieldSpec('street1', 98, 131),
+    FieldSpec('street2', 132, 165),
+    FieldSpec('city', 166, 184),
+    FieldSpec('state', 185, 187),
+    FieldSpec('zip_code', 188, 198),
+    FieldSpec('eng_mfr_code', 199, 204),
+    FieldSpec('year_mfr', 205, 209),
+    FieldSpec('certification', 210, 220),
+    FieldSpec('region', 221, 222),
+    FieldSpec('county', 223, 226),
+    FieldSpec('country', 227, 229),
+    FieldSpec('air_worth_date', 230, 238),
+    FieldSpec('cancel_date', 239, 247),
+    FieldSpec('mode_s_code', 248, 256),
+    FieldSpec('indicator_group', 257, 258),
+    FieldSpec('exp_country', 259, 277),
+    FieldSpec('last_action_date', 278, 286),
+    FieldSpec('cert_issue_date', 287, 295),
+]
+DEREG_MIN_LENGTH = 248
+
+TYPE_REGISTRANT_NAMES = {
+    '1': 'Individual',
+    '2': 'Partnership',
+    '3': 'Corporation',
+    '4': 'Co-Owned',
+    '5': 'Government',
+    '7': 'LLC',
+    '8': 'Non Citizen Corporation',
+    '9': 'Non Citizen Co-Owned',
+}
+
+STATUS_NAMES = {
+    'V': 'Valid',
+    'D': 'Deregistered',
+    'E': 'Expired',
+    'R': 'Reserved',
+}
+
+# Enriched aircraft record key -> AircraftMaster column, in the table's physical
+# order: N_NUMBER_KEY was added later (ALTER TABLE ... ADD), so it comes last
+AIRCRAFT_COLUMNS = [
+    ('n_number', 'N_NUMBER'),
+    ('name', 'NAME'),
+    ('type_registrant', 'TYPE_REGISTRANT'),
+    ('last_action_date', 'LAST_ACTION_DATE'),
+    ('air_worth_date', 'AIR_WORTH_DATE'),
+    ('mfr', 'MFR'),
+    ('model', 'MODEL'),
+    ('serial_number', 'SERIAL_NUMBER'),
+    ('eng_mfr', 'ENG_MFR'),
+    ('engine_model', 'ENGINE_MODEL'),
+    ('eng_count', 'ENG_COUNT'),
+    ('status_code', 'STATUS_CODE'),
+    ('n_number_key', 'N_NUMBER_KEY'),
+]
+
+AIRCRAFT_KEYS = [key for key, _ in AIRCRAFT_COLUMNS]
+
+# AircraftMaster columns Azure SQL computes itself (PERSISTED computed columns,
+# see prisma/migrations/add_aircraft_n_number_key.sql); loads into Azure SQL
+# write AIRCRAFT_LOAD_COLUMNS and leave these to the server
+AIRCRAFT_COMPUTED_COLUMNS = frozenset(['N_NUMBER_KEY'])
+AIRCRAFT_LOAD_COLUMNS = [(key, column) for key, column in AIRCRAFT_COLUMNS if column not in AIRCRAFT_COMPUTED_COLUMNS]
+AIRCRAFT_LOAD_KEYS = [key for key, _ in AIRCRAFT_LOAD_COLUMNS]
+
+# AircraftMaster columns stored dictionary-encoded in the columnar snapshot
+AIRCRAFT_DICTIONARY_COLUMNS = frozenset([
+    'TYPE_REGISTRANT', 'LAST_ACTION_DATE', 'AIR_WORTH_DATE', 'MFR', 'MODEL', 'ENG_MFR', 'ENGINE_MODEL',
+    'STATUS_CODE',
+])
+
+# AircraftHistory event record key -> column, in insert order. The table's
+# key is (N_NUMBER, ACTION_DATE, RECORD_HASH).
+HISTORY_COLUMNS = [
+    ('n_number', 'N_NUMBER'),
+    ('action_date', 'ACTION_DATE'),
+    ('record_hash', 'RECORD_HASH'),
+    ('event', 'EVENT'),
+    ('source', 'SOURCE'),
+    ('name', 'NAME'),
+    ('type_registrant', 'TYPE_REGISTRANT'),
+    ('status_code', 'STATUS_CODE'),
+    ('mfr', 'MFR'),
+    ('model', 'MODEL'),
+    ('serial_number', 'SERIAL_NUMBER'),
+]
+
+HISTORY_KEYS = [key for key, _ in HISTORY_COLUMNS]
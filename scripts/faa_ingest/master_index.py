@@ -0,0 +1,190 @@
+"""
+Memory-mapped MASTER reader with a persisted record-offset index.
+
+MasterIndex finds every record boundary in one vectorized pass over the
+mmap'd file and keeps the start offset of each MASTER record plus a sorted
+N-number -> offset map. The index is cached next to the other pipeline
+state (data/index) and reused while the file's fingerprint is unchanged, so
+record counts for progress, splitting a file into byte ranges for workers
+and looking up a single tail never need a full scan.
+
+Requires numpy.
+"""
+
+import hashlib
+import mmap
+import os
+
+import numpy as np
+
+from .checkpoint import file_fingerprint
+from .columnar import LATIN1_WHITESPACE
+from .layout import MASTER_FIELDS, MASTER_MIN_LENGTH
+from .parse import MASTER_HEADER_PREFIX, parse_master_line
+
+INDEX_VERSION = 1
+
+_N_NUMBER = MASTER_FIELDS[0]
+
+
+def open_mmap(path):
+    """Read-only mmap of a file (None for an empty file)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def normalize_tail(n_number):
+    """'n12345 ' / 'N12345' / '12345' -> '12345' as stored in MASTER."""
+    value = n_number.strip().upper()
+    return value[1:] if value.startswith('N') else value
+
+
+class MasterIndex:
+    """Record start offsets and N-number lookup for one MASTER file."""
+
+    def __init__(self, path, starts, ends, keys, key_offsets, fingerprint):
+        self.path = path
+        self.starts = starts
+        self.ends = ends
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def build(cls, path, fingerprint=None):
+        """Scan the file once for line boundaries and N-numbers."""
+        fingerprint = fingerprint or file_fingerprint(path)
+        mm = open_mmap(path)
+        if mm is None:
+            empty = np.array([], dtype=np.int64)
+            return cls(path, empty, empty, np.array([], dtype='S5'), empty, fingerprint)
+
+        data = np.frombuffer(mm, dtype=np.uint8)
+        try:
+            starts, ends, keys, keep = cls._scan(data)
+        finally:
+            # The numpy view must go before the mmap can close
+            del data
+            mm.close()
+
+        starts, ends, keys = starts[keep], ends[keep], keys[keep]
+        order = np.argsort(keys, kind='stable')
+        return cls(path, starts, ends, keys[order], starts[order], fingerprint)
+
+    @staticmethod
+    def _scan(data):
+        """Record boundaries, stripped N-numbers and the keep mask for a file's bytes."""
+        newline = ord('\n')
+        ends = np.flatnonzero(data == newline) + 1
+        if data[-1] != newline:
+            ends = np.append(ends, len(data))
+        ends = ends.astype(np.int64)
+        starts = np.concatenate(([0], ends[:-1])).astype(np.int64)
+
+        # Same acceptance rule as parse_master_line(): length with a single newline, no header
+        lengths = ends - starts
+        crlf = (lengths >= 2) & (data[ends - 1] == newline) & (data[np.maximum(ends - 2, 0)] == ord('\r'))
+        lengths = lengths - crlf
+        keep = lengths >= MASTER_MIN_LENGTH
+
+        last = len(data) - 1
+        width = _N_NUMBER.end - _N_NUMBER.start
+        gather = np.minimum(starts[:, None] + np.arange(_N_NUMBER.start, _N_NUMBER.end), last)
+        keys = np.char.strip(np.ascontiguousarray(data[gather]).view(f'S{width}').ravel(), LATIN1_WHITESPACE)
+
+        header = MASTER_HEADER_PREFIX.encode()
+        head = np.minimum(starts[:, None] + np.arange(len(header)), last)
+        is_header = np.ascontiguousarray(data[head]).view(f'S{len(header)}').ravel() == header
+
+        keep &= ~is_header & (keys != b'')
+        return starts, ends, keys, keep
+
+    @classmethod
+    def cache_path(cls, path, cache_dir):
+        key = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=4).hexdigest()
+        return os.path.join(cache_dir, f"{os.path.basename(path)}-{key}.idx.npz")
+
+    def save(self, cache_path):
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        tmp = cache_path + '.tmp.npz'
+        np.savez(tmp, version=INDEX_VERSION, fingerprint=self.fingerprint, starts=self.starts,
+                 ends=self.ends, keys=self.keys, key_offsets=self.key_offsets)
+        os.replace(tmp, cache_path)
+
+    @classmethod
+    def load_or_build(cls, path, cache_dir):
+        """Cached index if the file is unchanged, otherwise rebuild and cache it."""
+        cache_path = cls.cache_path(path, cache_dir)
+        fingerprint = file_fingerprint(path)
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                if int(cached['version']) == INDEX_VERSION and str(cached['fingerprint']) == fingerprint:
+                    return cls(path, cached['starts'], cached['ends'], cached['keys'],
+                               cached['key_offsets'], fingerprint)
+        index = cls.build(path, fingerprint)
+        index.save(cache_path)
+        return index
+
+    def offset_of(self, n_number):
+        """Start offset of an N-number's record (the last one if repeated), or None."""
+        key = normalize_tail(n_number).encode('latin-1')
+        pos = np.searchsorted(self.keys, key, side='right') - 1
+        if pos < 0 or self.keys[pos] != key:
+            return None
+        return int(self.key_offsets[pos])
+
+    def ranges(self, parts):
+        """Split the file into up to `parts` contiguous byte ranges on record boundaries."""
+        count = len(self.starts)
+        if count == 0:
+            return []
+        parts = max(1, min(parts, count))
+        cuts = [count * i // parts for i in range(parts)]
+        ranges = []
+        for i, first in enumerate(cuts):
+            last = cuts[i + 1] if i + 1 < parts else count
+            ranges.append((int(self.starts[first]), int(self.ends[last - 1])))
+        return ranges
+
+
+class MasterReader:
+    """mmap-backed random access to MASTER records through a MasterIndex."""
+
+    def __init__(self, path, cache_dir):
+        self.path = path
+        self.index = MasterIndex.load_or_build(path, cache_dir)
+        self.mm = open_mmap(path)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.index)
+
+    def line_at(self, offset):
+        end = self.mm.find(b'\n', offset)
+        raw = self.mm[offset:] if end < 0 else self.mm[offset:end + 1]
+        if raw.endswith(b'\r\n'):
+            raw = raw[:-2] + b'\n'
+        return raw.decode('latin-1')
+
+    def lookup(self, n_number):
+        """Parsed record for one N-number straight from the raw file, or None."""
+        offset = self.index.offset_of(n_number)
+        if offset is None or self.mm is None:
+            return None
+        return parse_master_line(self.line_at(offset))
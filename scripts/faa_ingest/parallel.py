@@ -0,0 +1,152 @@
+"""
+Process-parallel ingestion across MASTER-1..9 shards.
+
+Each worker process opens the reference tables once (mmap'd from the
+binary cache the parent builds, so the pages are shared), opens its own sink
+(and so its own database connection) per shard, and runs the normal
+pipeline over that shard. A single MASTER.txt is split into byte ranges
+on record boundaries with the cached MasterIndex instead. The parent merges the per-shard statistics into
+one summary as shards finish.
+"""
+
+import contextlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .aggregates import FleetAggregates
+from .batching import AdaptiveBatchSize
+from .checkpoint import Checkpoint, checkpoint_path
+from .parse import load_reference_data
+from .pipeline import DEFAULT_BATCH_SIZE, run_pipeline
+from .sinks import make_sink
+from .telemetry import Telemetry
+
+# Reference tables, opened once per worker process by _init_worker()
+_reference = {}
+
+
+def _init_worker(acftref_path, engine_path, index_dir):
+    _reference['acftref'], _reference['engines'] = load_reference_data(acftref_path, engine_path, index_dir)
+
+
+def _load_shard(job, sink_spec, azure_mode, batch_size, parser, checkpoint_dir, restart, writers=1, adaptive=None,
+                history=False, cache_dir=None, count_aggregates=False, measure=False):
+    path, start, end = job
+    aggregates = FleetAggregates() if count_aggregates else None
+    telemetry = Telemetry() if measure else None
+    sink = make_sink(sink_spec, azure_mode=azure_mode, history=history)
+    checkpoint = None
+    if checkpoint_dir:
+        # One checkpoint per shard/range, so each worker resumes independently
+        part = None if end is None else f"{start}_{end}"
+        checkpoint = Checkpoint(checkpoint_path(checkpoint_dir, sink_spec, [path], part), [path])
+        if restart:
+            checkpoint.clear()
+    stats = run_pipeline([path], sink, _reference['acftref'], _reference['engines'],
+                         batch_size=batch_size, progress_every=0, parser=parser, checkpoint=checkpoint,
+                         start_offset=start, end_offset=end, writers=writers,
+                         sink_factory=lambda: make_sink(sink_spec, azure_mode=azure_mode, history=history),
+                         adaptive=AdaptiveBatchSize(verbose=False, **adaptive) if adaptive else None,
+                         cache_dir=cache_dir, aggregates=aggregates, write_aggregates=False, telemetry=telemetry)
+    if aggregates is not None:
+        # Raw code counts are small; the parent merges them and writes once
+        stats['aggregate_counts'] = aggregates.counts
+    if telemetry is not None:
+        stats['telemetry'] = telemetry.snapshot()
+    return job, stats
+
+
+def plan_jobs(paths, workers, index_dir=None):
+    """(path, start, end) jobs: one per shard, or byte ranges of a single file."""
+    if len(paths) == 1 and workers > 1 and index_dir:
+        from .master_index import MasterIndex
+        index = MasterIndex.load_or_build(paths[0], index_dir)
+        return [(paths[0], start, end) for start, end in index.ranges(workers)]
+    return [(path, 0, None) for path in paths]
+
+
+def describe_job(job):
+    path, start, end = job
+    name = os.path.basename(path)
+    return name if end is None else f"{name}[{start:,}:{end:,}]"
+
+
+def merge_stats(shard_stats, seconds):
+    """Combine per-shard run_pipeline() stats into one summary."""
+    merged = {'rows': 0, 'written': 0, 'batches': 0, 'failed_batches': 0, 'sink': {}}
+    for stats in shard_stats:
+        for key in ('rows', 'written', 'batches', 'failed_batches'):
+            merged[key] += stats[key]
+        for key, value in stats['sink'].items():
+            merged['sink'][key] = merged['sink'].get(key, 0) + value
+    merged['seconds'] = round(seconds, 2)
+    merged['rows_per_sec'] = round(merged['rows'] / seconds) if seconds else 0
+    return merged
+
+
+def run_parallel(paths, sink_spec, acftref_path, engine_path=None, workers=None, azure_mode='merge',
+                 batch_size=DEFAULT_BATCH_SIZE, parser='line', checkpoint_dir=None, restart=False,
+                 index_dir=None, writers=1, adaptive=None, history=False, parse_cache=False, aggregates=None,
+                 telemetry=None):
+    """Load each MASTER shard in a process pool and return merged statistics.
+
+    writers > 1 also overlaps parsing and writing inside each worker (see run_pipeline()).
+    adaptive is AdaptiveBatchSize keyword arguments; each shard sizes its own batches.
+    parse_cache keeps parsed shards in index_dir (see cache.py); byte ranges of a
+    single file are served from an existing entry but do not create one.
+    With an aggregates.FleetAggregates each worker counts its shard and the
+    merged counts are written through one more sink at the end.
+    With a telemetry.Telemetry each worker times its own stages and the
+    parent adds them up (stage times are then summed over processes).
+    """
+    if sink_spec.startswith(('file', 'bcp', 'snapshot')):
+        raise ValueError("file sinks cannot be shared between worker processes; use --workers 1")
+
+    jobs = plan_jobs(paths, workers or os.cpu_count() or 1, index_dir)
+    # Build the binary reference cache once here; workers only mmap it
+    with telemetry.stage('reference') if telemetry is not None else contextlib.nullcontext():
+        acftref, _ = load_reference_data(acftref_path, engine_path, index_dir)
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) or 1
+    started = time.perf_counter()
+    shard_stats = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(acftref_path, engine_path, index_dir)) as pool:
+        futures = [
+            pool.submit(_load_shard, job, sink_spec, azure_mode, batch_size, parser, checkpoint_dir, restart,
+                        writers, adaptive, history, index_dir if parse_cache else None, aggregates is not None,
+                        telemetry is not None)
+            for job in jobs
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            job, stats = future.result()
+            shard_stats.append(stats)
+            if aggregates is not None:
+                aggregates.merge(stats.pop('aggregate_counts'), stats['aggregates']['complete'])
+            if telemetry is not None:
+                telemetry.merge(stats.pop('telemetry'))
+            rows = sum(s['rows'] for s in shard_stats)
+            elapsed = time.perf_counter() - started
+            sized = f", batch size {stats['batch_size']['final']:,}" if 'batch_size' in stats else ''
+            print(f"  [{done}/{len(jobs)}] {describe_job(job)}: {stats['written']:,} written "
+                  f"in {stats['seconds']}s{sized} ({rows:,} total, {rows / elapsed:,.0f} rows/s)")
+
+    merged = merge_stats(shard_stats, time.perf_counter() - started)
+    merged['workers'] = workers
+    if aggregates is not None:
+        with telemetry.stage('aggregates_write') if telemetry is not None else contextlib.nullcontext():
+            merged['aggregates'] = write_aggregates(aggregates, acftref, sink_spec, azure_mode)
+    return merged
+
+
+def write_aggregates(aggregates, acftref, sink_spec, azure_mode='merge'):
+    """Write merged shard counts through a fresh sink; returns the run's aggregate stats."""
+    stats = {'release_date': aggregates.release_date, 'records': len(aggregates),
+             'complete': aggregates.complete, 'rows': 0}
+    if not aggregates.complete:
+        print("  Fleet aggregates not written: a shard resumed from a checkpoint")
+        return stats
+    with make_sink(sink_spec, azure_mode=azure_mode) as sink:
+        stats['rows'] = sink.write_aggregates(aggregates.release_date, aggregates.rows(acftref))
+    return stats
@@ -0,0 +1,96 @@
+"""
+Line parsers for the FAA MASTER, ACFTREF and ENGINE files.
+"""
+
+import os
+import sys
+
+from .layout import (
+    MASTER_FIELDS, MASTER_MIN_LENGTH, MASTER_DICTIONARY_FIELDS,
+    ACFTREF_FIELDS, ACFTREF_MIN_LENGTH,
+    ENGINE_FIELDS, ENGINE_MIN_LENGTH,
+)
+
+MASTER_HEADER_PREFIX = 'N-NUMBER'
+
+# (name, start, end, interned) per MASTER field
+_MASTER_SLICES = [(spec.name, spec.start, spec.end, spec.name in MASTER_DICTIONARY_FIELDS)
+                  for spec in MASTER_FIELDS]
+
+
+def n_number_key(n_number):
+    """Canonical lookup key: trimmed, uppercase, always 'N'-prefixed ('n12345 ' / '12345' -> 'N12345')."""
+    value = n_number.strip()
+    if not value.isupper():
+        value = value.upper()
+    # A parsed 'N12345' comes back as the same str object, not a copy
+    return value if value.startswith('N') else 'N' + value
+
+
+def parse_master_line(line):
+    """Parse a single line from MASTER file.
+
+    Values of the low-cardinality fields (layout.MASTER_DICTIONARY_FIELDS) are
+    interned, so a registry's worth of records shares one str per distinct
+    city, date or code.
+    """
+    if len(line) < MASTER_MIN_LENGTH or line.startswith(MASTER_HEADER_PREFIX):
+        return None
+
+    intern = sys.intern
+    parsed = {name: intern(line[start:end].strip()) if interned else line[start:end].strip()
+              for name, start, end, interned in _MASTER_SLICES}
+    parsed['n_number'] = 'N' + parsed['n_number']
+    return parsed
+
+
+def parse_reference_lines(lines, fields, min_length):
+    """Fixed-width reference lines -> {code: {field: value}}."""
+    table = {}
+    value_fields = [spec for spec in fields if spec.name != 'code']
+    code_spec = fields[0]
+    for line in lines:
+        if len(line) < min_length:
+            continue
+        code = line[code_spec.start:code_spec.end].strip()
+        if code:
+            table[code] = {spec.name: line[spec.start:spec.end].strip() for spec in value_fields}
+    return table
+
+
+def _parse_reference(filepath, fields, min_length, label):
+    """Parse a fixed-width reference file into {code: {field: value}}."""
+    try:
+        with open(filepath, 'r', encoding='latin-1') as f:
+            return parse_reference_lines(f, fields, min_length)
+    except Exception as e:
+        print(f"Error parsing {label}: {e}")
+    return {}
+
+
+def parse_acftref(filepath):
+    """Parse ACFTREF file to get manufacturer/model names."""
+    return _parse_reference(filepath, ACFTREF_FIELDS, ACFTREF_MIN_LENGTH, 'ACFTREF')
+
+
+def parse_engine(filepath):
+    """Parse ENGINE file to get engine manufacturer/model names."""
+    return _parse_reference(filepath, ENGINE_FIELDS, ENGINE_MIN_LENGTH, 'ENGINE')
+
+
+def load_reference_data(acftref_path, engine_path=None, cache_dir=None):
+    """(acftref, engines) lookups for enrichment.
+
+    With numpy and a cache_dir these are mmap'd reference.ReferenceTable
+    files shared between processes; otherwise plain dicts.
+    """
+    if cache_dir:
+        try:
+            from .reference import load_reference_tables
+        except ImportError:
+            pass
+        else:
+            return load_reference_tables(acftref_path, engine_path, cache_dir)
+
+    engines = parse_engine(engine_path) if engine_path and os.path.exists(engine_path) else {}
+    return parse_acftref(acftref_path), engines
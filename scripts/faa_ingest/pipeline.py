@@ -0,0 +1,360 @@
+"""
+Generator pipeline: read -> parse -> enrich -> batch -> sink.
+
+Each stage is a plain generator so stages can be swapped or reused on their
+own (download_faa_full.process_master_files is read + parse + enrich).
+"""
+
+import contextlib
+import os
+import time
+
+from .checkpoint import SourcePosition
+from .layout import TYPE_REGISTRANT_NAMES, STATUS_NAMES
+from .parse import n_number_key, parse_master_line
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def master_paths(source):
+    """Resolve a MASTER source (file or directory) to the files to read, in order."""
+    if os.path.isfile(source):
+        return [source]
+
+    shards = [os.path.join(source, f"MASTER-{i}.txt") for i in range(1, 10)]
+    shards = [path for path in shards if os.path.exists(path)]
+    if shards:
+        return shards
+
+    single = os.path.join(source, "MASTER.txt")
+    return [single] if os.path.exists(single) else []
+
+
+def read_lines(paths, position=None, start_offset=0, end_offset=None):
+    """Yield raw lines from each MASTER file in turn.
+
+    The first file starts at start_offset and the last stops at end_offset
+    (exclusive, on a line boundary). If a SourcePosition is given it is
+    advanced past each line as the line is yielded.
+    """
+    last = len(paths) - 1
+    for i, path in enumerate(paths):
+        offset = start_offset if i == 0 else 0
+        end = end_offset if i == last else None
+        with open(path, 'rb') as f:
+            if offset:
+                f.seek(offset)
+            for raw in f:
+                if end is not None and offset >= end:
+                    break
+                offset += len(raw)
+                if position is not None:
+                    position.path = path
+                    position.offset = offset
+                if raw.endswith(b'\r\n'):
+                    raw = raw[:-2] + b'\n'
+                yield raw.decode('latin-1')
+
+
+def parse_lines(lines):
+    """Yield parsed MASTER records, dropping short lines and blank N-numbers."""
+    for line in lines:
+        parsed = parse_master_line(line)
+        if parsed and parsed['n_number'] != 'N':
+            yield parsed
+
+
+def engine_count(value):
+    """ACFTREF NO-ENG ('01') -> 1; None when blank or not a number."""
+    return int(value) if value.isdigit() else None
+
+
+def enrich_records(records, acftref, engines=None):
+    """Join ACFTREF/ENGINE names and decode code columns into AircraftMaster records.
+
+    Both joins go through a per-run memo of code -> joined values, so each
+    distinct model/engine code is looked up once for the whole registry.
+    """
+    engines = engines or {}
+    models = {}
+    engine_names = {}
+    for parsed in records:
+        model_code = parsed['mfr_model_code']
+        model = models.get(model_code)
+        if model is None:
+            info = acftref.get(model_code) or {}
+            model = models[model_code] = (
+                info.get('mfr', ''), info.get('model', ''), engine_count(info.get('no_eng', '')),
+            )
+
+        eng_code = parsed['eng_mfr_code']
+        engine = engine_names.get(eng_code)
+        if engine is None:
+            info = engines.get(eng_code) or {}
+            engine = engine_names[eng_code] = (info.get('mfr', ''), info.get('model', ''))
+
+        type_registrant = parsed['type_registrant']
+        status_code = parsed['status_code']
+
+        yield {
+            'n_number': parsed['n_number'],
+            'n_number_key': n_number_key(parsed['n_number']),
+            'serial_number': parsed['serial_number'],
+            'mfr': model[0],
+            'model': model[1],
+            'status_code': STATUS_NAMES.get(status_code, status_code),
+            'air_worth_date': parsed['air_worth_date'],
+            'last_action_date': parsed['last_action_date'],
+            'type_registrant': TYPE_REGISTRANT_NAMES.get(type_registrant, type_registrant),
+            'name': parsed['name'],
+            'eng_mfr': engine[0],
+            'engine_model': engine[1],
+            'eng_count': model[2],
+        }
+
+
+def batched(records, batch_size=DEFAULT_BATCH_SIZE):
+    """Group records into lists of at most batch_size.
+
+    batch_size may also be a callable (batching.AdaptiveBatchSize), asked
+    for the size of each new batch.
+    """
+    next_size = batch_size if callable(batch_size) else lambda: batch_size
+    size = next_size()
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+            size = next_size()
+    if batch:
+        yield batch
+
+
+PARSERS = ('line', 'columnar')
+
+
+def iter_parsed(paths, parser='line', position=None, start_offset=0, end_offset=None, cache_dir=None):
+    """Read and parse MASTER files with the line parser or the columnar (NumPy) parser.
+
+    cache_dir enables the columnar parser's parse cache (see cache.py).
+    """
+    if parser == 'columnar':
+        from .columnar import iter_parsed_records
+        return iter_parsed_records(paths, position=position, start_offset=start_offset, end_offset=end_offset,
+                                   cache_dir=cache_dir)
+    if parser == 'line':
+        return parse_lines(read_lines(paths, position, start_offset, end_offset))
+    raise ValueError(f"Unknown parser '{parser}' (expected one of {', '.join(PARSERS)})")
+
+
+def iter_aircraft(paths, acftref, engines=None, parser='line', position=None, start_offset=0, end_offset=None,
+                  cache_dir=None):
+    """Read, parse and enrich MASTER files into AircraftMaster records."""
+    return enrich_records(iter_parsed(paths, parser, position, start_offset, end_offset, cache_dir),
+                          acftref, engines)
+
+
+def run_pipeline(paths, sink, acftref, engines=None, batch_size=DEFAULT_BATCH_SIZE, progress_every=10,
+                 parser='line', delta=None, checkpoint=None, start_offset=0, end_offset=None,
+                 writers=1, sink_factory=None, adaptive=None, cache_dir=None, aggregates=None, write_aggregates=True,
+                 parsed=None, telemetry=None):
+    """Stream MASTER files into a sink and return run statistics.
+
+    parsed, if given, is an iterable of parsed MASTER records loaded instead
+    of reading paths (a release streamed from the FAA, see download.py); it
+    cannot be resumed, so it takes no checkpoint.
+
+    start_offset/end_offset limit the first/last file to a byte range (see
+    master_index.MasterIndex.ranges()).
+
+    With a delta.DeltaFilter only new/changed records are written, N-numbers
+    missing from the release are deleted, and the hash state is saved at the end.
+
+    With a checkpoint.Checkpoint the run starts from the saved byte offset and
+    saves a new one after every committed batch. After the first failed batch
+    the checkpoint stops advancing, so a rerun retries from there.
+
+    With writers > 1, batches are written by a writers.WriterPool of that many
+    threads, each with its own sink from sink_factory(), while this thread
+    keeps parsing. `sink` is then only used for delta deletes.
+
+    With a batching.AdaptiveBatchSize, batch sizes follow its measured commit
+    latency instead of the fixed batch_size.
+
+    cache_dir turns on the parse cache for the columnar parser: unchanged
+    MASTER files are read from their saved columns instead of re-parsed.
+
+    With an aggregates.FleetAggregates every parsed record is counted
+    (before the delta filter, so the counts cover the whole release) and
+    the sink's FleetAggregate rows are replaced at the end. A run resumed
+    from a checkpoint has only seen part of the release and skips the write;
+    write_aggregates=False only counts (parallel workers, merged by the parent).
+
+    With a telemetry.Telemetry every stage is timed, and each batch's
+    commit latency goes into its 'commit_seconds' histogram.
+    """
+    if writers > 1 and sink_factory is None:
+        raise ValueError("writers > 1 needs a sink_factory to give each writer its own sink")
+    if parsed is not None and checkpoint is not None:
+        raise ValueError("a streamed source cannot be checkpointed")
+
+    started = time.perf_counter()
+    rows = 0
+    written = 0
+    batch_num = 0
+    failed_batches = 0
+
+    start_index, resume_offset = checkpoint.resume_point() if checkpoint else (0, 0)
+    if start_index or resume_offset > start_offset:
+        start_offset = resume_offset
+        if aggregates is not None:
+            aggregates.complete = False
+        print(f"  Resuming {os.path.basename(paths[start_index])} at byte {start_offset:,}")
+    paths = paths[start_index:]
+    sizes = [os.path.getsize(path) for path in paths]
+    total_bytes = sum(sizes)
+    position = SourcePosition(paths[0] if paths else None, start_offset)
+
+    if parsed is None:
+        parsed = iter_parsed(paths, parser, position, start_offset, end_offset, cache_dir)
+    # Each timed stage's pulls include the stages before it; the report subtracts them
+    timed = telemetry.timed if telemetry is not None else lambda name, items, upstream=None, cpu=False: items
+    parsed = timed('parse', parsed)
+    upstream = 'parse'
+    if aggregates is not None:
+        parsed = timed('aggregate', aggregates.count(parsed), upstream)
+        upstream = 'aggregate'
+    records = timed('enrich', enrich_records(parsed, acftref, engines), upstream)
+    upstream = 'enrich'
+    if delta is not None:
+        records = timed('delta', delta.changed(records), upstream)
+        upstream = 'delta'
+
+    # Batches may complete out of order; the checkpoint only moves past a
+    # batch once it and every batch before it are committed.
+    finished = {}
+    next_to_save = 1
+    saving = checkpoint is not None
+
+    def committed(seq, batch, batch_position, stored, seconds):
+        nonlocal written, failed_batches, next_to_save, saving
+        if adaptive is not None:
+            adaptive.observe(len(batch), seconds, bool(stored))
+        if telemetry is not None:
+            # Wall time on whichever thread wrote the batch; with writers > 1 this sums over threads
+            telemetry.add_time('write', seconds, items=len(batch))
+            telemetry.observe('commit_seconds', seconds)
+        written += stored
+        if not stored:
+            failed_batches += 1
+        if delta is not None and stored:
+            delta.commit(batch)
+        if not saving:
+            return
+        finished[seq] = (batch_position, batch[-1]['n_number'], stored)
+        latest = None
+        while next_to_save in finished:
+            done_position, last_n_number, ok = finished.pop(next_to_save)
+            if not ok:
+                saving = False
+                break
+            latest = (done_position, last_n_number)
+            next_to_save += 1
+        if latest:
+            checkpoint.save(*latest)
+
+    def report():
+        elapsed = time.perf_counter() - started
+        if not total_bytes:
+            print(f"  Batch {batch_num}: {written:,} written ({rows / elapsed:,.0f} rows/s)...")
+            return
+        done = sum(sizes[:paths.index(position.path)]) + position.offset
+        pct = done / total_bytes * 100
+        print(f"  Batch {batch_num}: {written:,} written, {pct:.1f}% ({rows / elapsed:,.0f} rows/s)...")
+
+    def stage(name):
+        return telemetry.stage(name) if telemetry is not None else contextlib.nullcontext()
+
+    sizes_from = adaptive or batch_size
+    batches = timed('batch', batched(records, sizes_from), upstream, cpu=True)
+    pool = None
+    with sink:
+        if writers > 1:
+            from .writers import WriterPool
+            pool = WriterPool(sink_factory, writers)
+            with pool:
+                for batch in batches:
+                    batch_num += 1
+                    rows += len(batch)
+                    pool.submit(batch_num, batch, SourcePosition(position.path, position.offset))
+                    for result in pool.completed():
+                        committed(*result)
+                    if progress_every and batch_num % progress_every == 0:
+                        report()
+                for result in pool.close():
+                    committed(*result)
+            if telemetry is not None:
+                # The parser's waits on a full queue
+                telemetry.add_time('queue_wait', pool.wait_seconds)
+        else:
+            for batch in batches:
+                batch_num += 1
+                rows += len(batch)
+                write_started = time.perf_counter()
+                cpu_started = time.thread_time()
+                stored = sink.write(batch)
+                seconds = time.perf_counter() - write_started
+                if telemetry is not None:
+                    telemetry.add_time('write', 0.0, time.thread_time() - cpu_started)
+                committed(batch_num, batch, position, stored, seconds)
+                if progress_every and batch_num % progress_every == 0:
+                    report()
+
+        if delta is not None:
+            deleted = []
+            with stage('delete'):
+                for chunk in batched(delta.removed(), batch_size):
+                    if sink.delete(chunk):
+                        deleted.extend(chunk)
+                delta.save(deleted)
+
+        if aggregates is not None and write_aggregates:
+            if aggregates.complete:
+                with stage('aggregates_write'):
+                    aggregate_rows = sink.write_aggregates(aggregates.release_date, aggregates.rows(acftref))
+            else:
+                aggregate_rows = 0
+                print("  Fleet aggregates not written: this run did not load the whole release")
+
+    if checkpoint is not None and not failed_batches:
+        checkpoint.clear()
+
+    elapsed = time.perf_counter() - started
+    sink_stats = dict(sink.stats)
+    if pool is not None:
+        for key, value in pool.stats.items():
+            sink_stats[key] = sink_stats.get(key, 0) + value
+    stats = {
+        'rows': rows,
+        'written': written,
+        'batches': batch_num,
+        'failed_batches': failed_batches,
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': round(rows / elapsed) if elapsed else 0,
+        'sink': sink_stats,
+    }
+    if pool is not None:
+        stats['writers'] = writers
+        stats['parse_wait_seconds'] = round(pool.wait_seconds, 2)
+    if adaptive is not None:
+        stats['batch_size'] = adaptive.stats
+    if delta is not None:
+        stats['delta'] = dict(delta.stats)
+    if aggregates is not None:
+        stats['aggregates'] = {'release_date': aggregates.release_date, 'records': len(aggregates),
+                               'complete': aggregates.complete}
+        if write_aggregates:
+            stats['aggregates']['rows'] = aggregate_rows
+    return stats
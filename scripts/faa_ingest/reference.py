@@ -0,0 +1,231 @@
+"""
+Compact, shareable ACFTREF/ENGINE reference tables.
+
+A ReferenceTable keeps the sorted codes as one fixed-width byte array and
+every other field as an int32 index into a pool of distinct strings, so a
+manufacturer name repeated across thousands of models is stored once. The
+table is built once from the text file and cached as a single binary file
+(data/index/*.ref) that later runs and parallel workers open with mmap:
+the pages are shared read-only through the OS page cache instead of each
+process parsing ACFTREF again.
+
+The table is dict-like (get(code, default) -> {field: value}) so it drops
+into pipeline.enrich_records() in place of the parse_acftref() dicts.
+
+Requires numpy.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+from .checkpoint import content_hash
+from .layout import ACFTREF_FIELDS, ACFTREF_MIN_LENGTH, ENGINE_FIELDS, ENGINE_MIN_LENGTH
+
+REFERENCE_VERSION = 3
+MAGIC = b'FAAREF1\n'
+# Array elements written per slice by save_arrays()
+WRITE_CHUNK_ROWS = 1 << 20
+
+REFERENCE_LAYOUTS = {
+    'acftref': (ACFTREF_FIELDS, ACFTREF_MIN_LENGTH),
+    'engine': (ENGINE_FIELDS, ENGINE_MIN_LENGTH),
+}
+
+
+def _align(offset, to=8):
+    return (offset + to - 1) // to * to
+
+
+def save_arrays(path, magic, header, arrays):
+    """Write magic, an 8-byte header length, a JSON header and 8-byte aligned arrays.
+
+    header gets an 'arrays' entry {name: [offset, dtype, count]}; the file is
+    written to a temp name and renamed, so readers never see a partial file.
+    """
+    header = dict(header, arrays={})
+    # Two passes: header size depends on the offsets it records
+    for _ in range(2):
+        offset = _align(len(magic) + 8 + len(json.dumps(header).encode()))
+        for name, array in arrays.items():
+            header['arrays'][name] = [offset, array.dtype.str, len(array)]
+            offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(magic)
+        f.write(len(header_bytes).to_bytes(8, 'little'))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(header['arrays'][name][0])
+            # In slices, so a memory-mapped array is streamed rather than copied whole
+            for start in range(0, len(array), WRITE_CHUNK_ROWS):
+                f.write(np.ascontiguousarray(array[start:start + WRITE_CHUNK_ROWS]).tobytes())
+    os.replace(tmp, path)
+
+
+def open_arrays(path, magic):
+    """mmap a save_arrays() file: (header, {name: read-only array view}, mmap)."""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(magic)] != magic:
+        mm.close()
+        raise ValueError(f"{path} is not a {magic.decode().strip()} file")
+    header_len = int.from_bytes(mm[len(magic):len(magic) + 8], 'little')
+    header = json.loads(mm[len(magic) + 8:len(magic) + 8 + header_len])
+    arrays = {
+        name: np.frombuffer(mm, dtype=np.dtype(dtype), count=count, offset=offset)
+        for name, (offset, dtype, count) in header['arrays'].items()
+    }
+    return header, arrays, mm
+
+
+class ReferenceTable:
+    """Sorted codes, per-field string-pool indices and the pool itself."""
+
+    def __init__(self, codes, fields, pool_offsets, pool_data, fingerprint=None, _mmap=None):
+        self.codes = codes
+        self.fields = fields
+        self.pool_offsets = pool_offsets
+        self.pool_data = pool_data
+        self.fingerprint = fingerprint
+        self._mmap = _mmap
+        self._strings = [None] * (len(pool_offsets) - 1)
+        self._rows = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return self.row_of(code) is not None
+
+    @classmethod
+    def from_file(cls, path, kind):
+        """Parse an ACFTREF/ENGINE text file into a table."""
+        specs, min_length = REFERENCE_LAYOUTS[kind]
+        code_spec, value_specs = specs[0], specs[1:]
+        rows = {}
+        with open(path, 'r', encoding='latin-1') as f:
+            for line in f:
+                if len(line) < min_length:
+                    continue
+                code = line[code_spec.start:code_spec.end].strip()
+                if code:
+                    rows[code] = [line[spec.start:spec.end].strip() for spec in value_specs]
+        return cls.from_rows(rows, [spec.name for spec in value_specs], code_spec.end - code_spec.start)
+
+    @classmethod
+    def from_rows(cls, rows, field_names, code_width):
+        """Build from {code: [value per field]}."""
+        pool = {}
+        codes = sorted(rows)
+        columns = {name: np.empty(len(codes), dtype=np.int32) for name in field_names}
+        for i, code in enumerate(codes):
+            for name, value in zip(field_names, rows[code]):
+                columns[name][i] = pool.setdefault(value, len(pool))
+
+        encoded = [value.encode('latin-1') for value in pool]
+        pool_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=pool_offsets[1:])
+        pool_data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        code_array = np.array([code.encode('latin-1') for code in codes], dtype=f'S{code_width}')
+        return cls(code_array, columns, pool_offsets, pool_data)
+
+    def save(self, path):
+        """Write the single-file binary layout (see save_arrays())."""
+        arrays = {'codes': self.codes, 'pool_offsets': self.pool_offsets, 'pool_data': self.pool_data}
+        arrays.update({f"field:{name}": column for name, column in self.fields.items()})
+        save_arrays(path, MAGIC, {'version': REFERENCE_VERSION, 'fingerprint': self.fingerprint,
+                                  'fields': list(self.fields)}, arrays)
+
+    @classmethod
+    def open(cls, path):
+        """mmap a saved table; arrays are read-only views of the shared pages."""
+        header, arrays, mm = open_arrays(path, MAGIC)
+        fields = {name: arrays[f"field:{name}"] for name in header['fields']}
+        table = cls(arrays['codes'], fields, arrays['pool_offsets'], arrays['pool_data'],
+                    header['fingerprint'], _mmap=mm)
+        table.version = header['version']
+        return table
+
+    def string(self, index):
+        """Pool string by index, decoded once per process and interned."""
+        value = self._strings[index]
+        if value is None:
+            start, end = self.pool_offsets[index], self.pool_offsets[index + 1]
+            value = sys.intern(self.pool_data[start:end].tobytes().decode('latin-1'))
+            self._strings[index] = value
+        return value
+
+    def row_of(self, code):
+        """Row number of a code, or None."""
+        key = code.encode('latin-1') if isinstance(code, str) else code
+        pos = int(np.searchsorted(self.codes, key))
+        if pos < len(self.codes) and self.codes[pos] == key:
+            return pos
+        return None
+
+    def rows_of(self, codes):
+        """Vectorized row numbers for a bytes array of codes (-1 where missing)."""
+        codes = np.asarray(codes, dtype=self.codes.dtype)
+        if len(self.codes) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.codes, codes), len(self.codes) - 1)
+        return np.where(self.codes[pos] == codes, pos, -1)
+
+    def get(self, code, default=None):
+        """{field: value} for a code, like the parse_acftref() dicts."""
+        row = self._rows.get(code)
+        if row is None:
+            pos = self.row_of(code)
+            if pos is None:
+                return default
+            row = {name: self.string(int(column[pos])) for name, column in self.fields.items()}
+            self._rows[code] = row
+        return row
+
+
+def cache_path(source_path, cache_dir):
+    key = hashlib.blake2b(os.path.abspath(source_path).encode(), digest_size=4).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.basename(source_path)}-{key}.ref")
+
+
+def layout_signature(kind):
+    """Digest of a reference layout, so a field change invalidates cached tables."""
+    specs, min_length = REFERENCE_LAYOUTS[kind]
+    layout = json.dumps([[spec.name, spec.start, spec.end] for spec in specs] + [min_length])
+    return hashlib.blake2b(layout.encode(), digest_size=4).hexdigest()
+
+
+def load_reference(source_path, kind, cache_dir):
+    """Open the cached binary table for a reference file, building it if the source changed.
+
+    The table is keyed by the file's full content hash plus the layout, so
+    an unchanged ACFTREF/ENGINE is never parsed twice.
+    """
+    path = cache_path(source_path, cache_dir)
+    fingerprint = f"{content_hash(source_path, cache_dir)}-{layout_signature(kind)}"
+    if os.path.exists(path):
+        try:
+            table = ReferenceTable.open(path)
+            if table.version == REFERENCE_VERSION and table.fingerprint == fingerprint:
+                return table
+        except (ValueError, KeyError, json.JSONDecodeError):
+            pass
+    table = ReferenceTable.from_file(source_path, kind)
+    table.fingerprint = fingerprint
+    table.save(path)
+    return ReferenceTable.open(path)
+
+
+def load_reference_tables(acftref_path, engine_path, cache_dir):
+    """(acftref, engines) tables; engines is {} when there is no ENGINE file."""
+    acftref = load_reference(acftref_path, 'acftref', cache_dir)
+    engines = load_reference(engine_path, 'engine', cache_dir) if engine_path and os.path.exists(engine_path) else {}
+    return acftref, engines
@@ -0,0 +1,575 @@
+"""
+Pluggable sinks for enriched AircraftMaster batches.
+
+A sink is opened once, receives lists of aircraft records through write()
+and is closed at the end of the run. write() returns the number of rows it
+stored so the pipeline can report throughput; delete() removes N-numbers
+that dropped out of the registry (delta loads) and returns how many it
+removed, or 0 if the batch failed.
+
+Database sinks opened with history=True also append AircraftHistory events
+(see history.py) for every row a write changes or a delete removes, in the
+same transaction; write_history() appends ready-made events (DEREG).
+write_aggregates() replaces one release's FleetAggregate counts (see
+aggregates.py).
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import time
+
+from .aggregates import AGGREGATE_COLUMNS, AGGREGATE_TABLE, write_sqlite_aggregates
+from .history import HISTORY_TABLE, removal_event, snapshot_events, today
+from .layout import (
+    AIRCRAFT_COLUMNS, AIRCRAFT_KEYS, AIRCRAFT_LOAD_COLUMNS, AIRCRAFT_LOAD_KEYS, HISTORY_COLUMNS, HISTORY_KEYS,
+)
+
+
+def row_values(record):
+    """Aircraft record -> tuple in AIRCRAFT_COLUMNS order."""
+    return tuple(record[key] for key in AIRCRAFT_KEYS)
+
+
+def load_values(record):
+    """Aircraft record -> tuple in AIRCRAFT_LOAD_COLUMNS order (no server-computed columns)."""
+    return tuple(record[key] for key in AIRCRAFT_LOAD_KEYS)
+
+
+def history_values(event):
+    """History event -> tuple in HISTORY_COLUMNS order."""
+    return tuple(event[key] for key in HISTORY_KEYS)
+
+
+HISTORY_SQL_COLUMNS = [column for _, column in HISTORY_COLUMNS]
+
+
+class Sink:
+    """Base sink: open/write/close, usable as a context manager."""
+
+    name = 'sink'
+    stats = {}
+
+    def open(self):
+        pass
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def delete(self, n_numbers):
+        raise NotImplementedError(f"{self.name} sink cannot delete rows")
+
+    def write_history(self, events):
+        raise NotImplementedError(f"{self.name} sink has no {HISTORY_TABLE} table")
+
+    def write_aggregates(self, release_date, rows):
+        raise NotImplementedError(f"{self.name} sink has no {AGGREGATE_TABLE} table")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+# SQL Server caps a VALUES row constructor at 1000 rows; keep each statement
+# under ~2000 parameters as well so wide tables stay within limits.
+MAX_VALUES_ROWS = 1000
+MAX_STATEMENT_PARAMS = 2000
+
+# Azure SQL errors a batch is retried after. A deadlock victim or throttling
+# (1205, 40501, 10928/10929) leaves the session usable; after a failover or a
+# database move (40197, 40613, 49918-49920) the session and its #stage table
+# are gone, so the retry runs on a new connection.
+RETRY_SAME_CONNECTION_ERRORS = {1205, 10928, 10929, 40501}
+RECONNECT_ERRORS = {40197, 40613, 49918, 49919, 49920}
+TRANSIENT_ERRORS = RETRY_SAME_CONNECTION_ERRORS | RECONNECT_ERRORS
+WRITE_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 2.0
+
+
+def transient_error(e):
+    """True for pymssql errors whose SQL Server error number is in TRANSIENT_ERRORS."""
+    return bool(e.args) and e.args[0] in TRANSIENT_ERRORS
+
+
+def insert_values(cursor, table, columns, rows):
+    """Multi-row INSERT ... VALUES, chunked to SQL Server's limits. Returns statements sent."""
+    chunk = max(1, min(MAX_VALUES_ROWS, MAX_STATEMENT_PARAMS // len(columns)))
+    row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    statements = 0
+    for i in range(0, len(rows), chunk):
+        part = rows[i:i + chunk]
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ', '.join([row_sql] * len(part)),
+            tuple(value for row in part for value in row),
+        )
+        statements += 1
+    return statements
+
+
+class AzureSqlSink(Sink):
+    """Upsert into Azure SQL AircraftMaster, one transaction per batch.
+
+    mode='merge' (default) stages each batch in a temp table with multi-row
+    inserts and applies a single MERGE keyed on N_NUMBER, so a 500-row batch
+    costs a handful of round trips. mode='row' sends one UPDATE-or-INSERT
+    statement per record. mode='insert' only appends with multi-row inserts,
+    for loading an empty table such as a swap reload's shadow (see swap.py).
+
+    With history=True (merge mode only) the MERGE also outputs the previous
+    owner/status of every row it changes, and the resulting AircraftHistory
+    events are inserted in the same transaction.
+    """
+
+    name = 'azure'
+    modes = ('merge', 'row', 'insert')
+
+    def __init__(self, table='AircraftMaster', connect=None, mode='merge', history=False):
+        if mode not in self.modes:
+            raise ValueError(f"Unknown Azure sink mode '{mode}' (expected one of {', '.join(self.modes)})")
+        if history and mode != 'merge':
+            raise ValueError("history needs the merge mode (the MERGE reports what each row replaced)")
+        self.table = table
+        self.history = history
+        self.stage_table = f"#{table}_stage"
+        self.connect = connect
+        self.mode = mode
+        self.conn = None
+        self.cursor = None
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0, 'round_trips': 0,
+                      'retries': 0}
+        if history:
+            self.stats['history'] = 0
+
+    @property
+    def columns(self):
+        # N_NUMBER_KEY is computed by the server from N_NUMBER
+        return [column for _, column in AIRCRAFT_LOAD_COLUMNS]
+
+    def open(self):
+        if self.connect is None:
+            from .db import get_connection
+            self.connect = get_connection
+        self._connect()
+
+    def _connect(self):
+        self.conn = self.connect()
+        self.cursor = self.conn.cursor()
+        if self.mode == 'merge':
+            # Session temp table with the target's column types
+            self.cursor.execute(
+                f"SELECT TOP 0 {', '.join(self.columns)} INTO {self.stage_table} FROM {self.table}"
+            )
+            self.conn.commit()
+
+    def _reconnect(self):
+        """Replace a connection lost to a failover with a new one (and a new #stage table)."""
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self._connect()
+
+    def _rollback(self):
+        """Roll back the open transaction; a dead connection has nothing left to roll back."""
+        try:
+            self.conn.rollback()
+        except Exception:
+            pass
+
+    def _upsert_sql(self):
+        columns = self.columns
+        assignments = ', '.join(f"{column} = %s" for column in columns[1:])
+        placeholders = ', '.join(['%s'] * len(columns))
+        # UPDATE first and INSERT only when nothing matched: one round trip per row
+        return f"""
+            UPDATE {self.table} SET {assignments} WHERE N_NUMBER = %s;
+            IF @@ROWCOUNT = 0
+                INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({placeholders});
+        """
+
+    def _merge_sql(self):
+        columns = self.columns
+        data_columns = columns[1:]
+        source = ', '.join(f"s.{column}" for column in data_columns)
+        target = ', '.join(f"t.{column}" for column in data_columns)
+        assignments = ', '.join(f"{column} = s.{column}" for column in data_columns)
+        if self.history:
+            # Previous owner/status of each changed row, for snapshot_events()
+            output = """
+            OUTPUT $action, inserted.N_NUMBER, deleted.NAME, deleted.TYPE_REGISTRANT, deleted.STATUS_CODE
+                INTO @changes;
+            SELECT action, n_number, name, type_registrant, status_code FROM @changes;"""
+            changes = ("action NVARCHAR(10), n_number NVARCHAR(10), name NVARCHAR(255), "
+                       "type_registrant NVARCHAR(50), status_code NVARCHAR(50)")
+        else:
+            output = """
+            OUTPUT $action INTO @changes;
+            SELECT
+                COALESCE(SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END), 0)
+            FROM @changes;"""
+            changes = "action NVARCHAR(10)"
+        # EXCEPT compares NULLs as equal, so unchanged rows are left alone
+        return f"""
+            SET NOCOUNT ON;
+            DECLARE @changes TABLE ({changes});
+            MERGE {self.table} WITH (HOLDLOCK) AS t
+            USING {self.stage_table} AS s ON t.N_NUMBER = s.N_NUMBER
+            WHEN MATCHED AND EXISTS (SELECT {source} EXCEPT SELECT {target})
+                THEN UPDATE SET {assignments}
+            WHEN NOT MATCHED BY TARGET
+                THEN INSERT ({', '.join(columns)}) VALUES (s.{', s.'.join(columns)}){output}
+        """
+
+    def _insert_history(self, events):
+        """Append history events; duplicates of existing keys are dropped by the table's IGNORE_DUP_KEY."""
+        if not events:
+            return 0
+        statements = insert_values(self.cursor, HISTORY_TABLE, HISTORY_SQL_COLUMNS,
+                                   [history_values(event) for event in events])
+        self.stats['history'] = self.stats.get('history', 0) + len(events)
+        return statements
+
+    def _write_rows(self, batch):
+        params = []
+        for record in batch:
+            values = load_values(record)
+            params.append(values[1:] + values[:1] + values)
+        self.cursor.executemany(self._upsert_sql(), params)
+        self.stats['round_trips'] += len(params)
+        return len(batch)
+
+    def _write_merge(self, batch):
+        # MERGE rejects duplicate source keys; the last record for an N-number wins
+        rows = list({record['n_number']: load_values(record) for record in batch}.values())
+        self.cursor.execute(f"TRUNCATE TABLE {self.stage_table}")
+        statements = insert_values(self.cursor, self.stage_table, self.columns, rows)
+        self.cursor.execute(self._merge_sql())
+        if self.history:
+            changes = self.cursor.fetchall()
+            inserted = sum(1 for change in changes if change[0] == 'INSERT')
+            updated = len(changes) - inserted
+            by_n_number = {record['n_number']: record for record in batch}
+            load_date = today()
+            events = []
+            for action, n_number, name, type_registrant, status_code in changes:
+                old = None if action == 'INSERT' else {
+                    'name': name, 'type_registrant': type_registrant, 'status_code': status_code,
+                }
+                events.extend(snapshot_events(by_n_number[n_number], old, load_date))
+            statements += self._insert_history(events)
+        else:
+            inserted, updated = self.cursor.fetchone()
+        self.stats['inserted'] += inserted
+        self.stats['updated'] += updated
+        self.stats['unchanged'] += len(rows) - inserted - updated
+        self.stats['round_trips'] += statements + 2
+        return len(rows)
+
+    def _write_insert(self, batch):
+        self.stats['round_trips'] += insert_values(self.cursor, self.table, self.columns,
+                                                   [load_values(record) for record in batch])
+        self.stats['inserted'] += len(batch)
+        return len(batch)
+
+    def write(self, batch):
+        """Write one batch in one transaction, retried up to WRITE_RETRIES times on transient errors."""
+        reconnect = False
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                if reconnect:
+                    self._reconnect()
+                    reconnect = False
+                if self.mode == 'merge':
+                    written = self._write_merge(batch)
+                elif self.mode == 'insert':
+                    written = self._write_insert(batch)
+                else:
+                    written = self._write_rows(batch)
+                self.conn.commit()
+                self.stats['round_trips'] += 1
+                return written
+            except Exception as e:
+                self._rollback()
+                if attempt < WRITE_RETRIES and transient_error(e):
+                    reconnect = e.args[0] in RECONNECT_ERRORS
+                    self.stats['retries'] += 1
+                    print(f"  Batch error {e.args[0]}, retrying ({attempt + 1}/{WRITE_RETRIES})")
+                    time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                    continue
+                self.stats['failed'] += len(batch)
+                print(f"  Batch error: {e}")
+                return 0
+
+    def delete(self, n_numbers):
+        n_numbers = list(n_numbers)
+        deleted = 0
+        try:
+            for i in range(0, len(n_numbers), MAX_VALUES_ROWS):
+                part = n_numbers[i:i + MAX_VALUES_ROWS]
+                placeholders = ', '.join(['%s'] * len(part))
+                if self.history:
+                    self.cursor.execute(
+                        f"DELETE FROM {self.table} OUTPUT deleted.N_NUMBER, deleted.NAME, deleted.TYPE_REGISTRANT, "
+                        f"deleted.STATUS_CODE, deleted.MFR, deleted.MODEL, deleted.SERIAL_NUMBER "
+                        f"WHERE N_NUMBER IN ({placeholders})",
+                        tuple(part),
+                    )
+                    removed = self.cursor.fetchall()
+                    deleted += len(removed)
+                    load_date = today()
+                    self.stats['round_trips'] += self._insert_history([
+                        removal_event(row[0], dict(zip(('name', 'type_registrant', 'status_code', 'mfr', 'model',
+                                                        'serial_number'), row[1:])), load_date)
+                        for row in removed
+                    ])
+                else:
+                    self.cursor.execute(f"DELETE FROM {self.table} WHERE N_NUMBER IN ({placeholders})", tuple(part))
+                    deleted += self.cursor.rowcount
+                self.stats['round_trips'] += 1
+            self.conn.commit()
+            self.stats['round_trips'] += 1
+        except Exception as e:
+            self._rollback()
+            print(f"  Delete error: {e}")
+            return 0
+        self.stats['deleted'] += deleted
+        return deleted
+
+    def write_history(self, events):
+        """Append ready-made history events (e.g. from DEREG) in one transaction."""
+        try:
+            self.stats['round_trips'] += self._insert_history(events)
+            self.conn.commit()
+            self.stats['round_trips'] += 1
+        except Exception as e:
+            self._rollback()
+            self.stats['failed'] += len(events)
+            print(f"  History batch error: {e}")
+            return 0
+        return len(events)
+
+    def write_aggregates(self, release_date, rows):
+        """Replace one release's FleetAggregate rows in one transaction."""
+        try:
+            self.cursor.execute(f"DELETE FROM {AGGREGATE_TABLE} WHERE RELEASE_DATE = %s", (release_date,))
+            self.stats['round_trips'] += insert_values(self.cursor, AGGREGATE_TABLE, AGGREGATE_COLUMNS, rows) + 1
+            self.conn.commit()
+            self.stats['round_trips'] += 1
+        except Exception as e:
+            self._rollback()
+            print(f"  Aggregate error: {e}")
+            return 0
+        return len(rows)
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class SQLiteSink(Sink):
+    """Write AircraftMaster rows into a local SQLite database."""
+
+    name = 'sqlite'
+
+    # Stay well under SQLite's host-parameter limit in IN (...) lookups
+    MAX_IN_PARAMS = 500
+
+    def __init__(self, path, table='AircraftMaster', history=False):
+        self.path = path
+        self.table = table
+        self.history = history
+        self.conn = None
+        self.stats = {'history': 0} if history else {}
+        self._history_ready = False
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Parallel workers share the file; wait for the write lock instead of failing
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        column_defs = ', '.join(
+            f"{column} {'INTEGER' if column == 'ENG_COUNT' else 'TEXT'}" + (' PRIMARY KEY' if column == 'N_NUMBER' else '')
+            for _, column in AIRCRAFT_COLUMNS
+        )
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({column_defs})")
+        # Databases created before N_NUMBER_KEY existed get the column added in place
+        existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({self.table})")}
+        for _, column in AIRCRAFT_COLUMNS:
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {column} TEXT")
+        self.conn.execute(
+            f"CREATE INDEX IF NOT EXISTS IX_{self.table}_N_NUMBER_KEY ON {self.table} (N_NUMBER_KEY)"
+        )
+        if self.history:
+            self._ensure_history()
+
+    def _ensure_history(self):
+        if self._history_ready:
+            return
+        column_defs = ', '.join(
+            f"{column} {'INTEGER' if column == 'RECORD_HASH' else 'TEXT'}" for column in HISTORY_SQL_COLUMNS
+        )
+        # Clustered on the key like the Azure table, so a timeline is one range scan
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} ({column_defs}, "
+            f"PRIMARY KEY (N_NUMBER, ACTION_DATE, RECORD_HASH)) WITHOUT ROWID"
+        )
+        self._history_ready = True
+
+    def _stored(self, n_numbers, columns):
+        """{n_number: {key: value}} for the rows currently stored under these N-numbers."""
+        key_of = {column: key for key, column in AIRCRAFT_COLUMNS}
+        keys = [key_of[column] for column in columns]
+        stored = {}
+        for i in range(0, len(n_numbers), self.MAX_IN_PARAMS):
+            part = n_numbers[i:i + self.MAX_IN_PARAMS]
+            rows = self.conn.execute(
+                f"SELECT N_NUMBER, {', '.join(columns)} FROM {self.table} "
+                f"WHERE N_NUMBER IN ({', '.join(['?'] * len(part))})",
+                part,
+            )
+            for row in rows:
+                stored[row[0]] = dict(zip(keys, row[1:]))
+        return stored
+
+    def _insert_history(self, events):
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO {HISTORY_TABLE} ({', '.join(HISTORY_SQL_COLUMNS)}) "
+            f"VALUES ({', '.join(['?'] * len(HISTORY_SQL_COLUMNS))})",
+            [history_values(event) for event in events],
+        )
+        self.stats['history'] = self.stats.get('history', 0) + len(events)
+
+    def write(self, batch):
+        columns = [column for _, column in AIRCRAFT_COLUMNS]
+        placeholders = ', '.join(['?'] * len(columns))
+        if self.history:
+            stored = self._stored([record['n_number'] for record in batch],
+                                  ['NAME', 'TYPE_REGISTRANT', 'STATUS_CODE'])
+            load_date = today()
+            events = []
+            for record in batch:
+                events.extend(snapshot_events(record, stored.get(record['n_number']), load_date))
+                # A repeated N-number in the batch diffs against its previous record
+                stored[record['n_number']] = record
+            self._insert_history(events)
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [row_values(record) for record in batch],
+        )
+        self.conn.commit()
+        return len(batch)
+
+    def delete(self, n_numbers):
+        n_numbers = list(n_numbers)
+        if self.history:
+            stored = self._stored(n_numbers, ['NAME', 'TYPE_REGISTRANT', 'STATUS_CODE', 'MFR', 'MODEL',
+                                              'SERIAL_NUMBER'])
+            load_date = today()
+            self._insert_history([removal_event(n_number, old, load_date) for n_number, old in stored.items()])
+        cursor = self.conn.executemany(
+            f"DELETE FROM {self.table} WHERE N_NUMBER = ?",
+            [(n_number,) for n_number in n_numbers],
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def write_history(self, events):
+        self._ensure_history()
+        self._insert_history(events)
+        self.conn.commit()
+        return len(events)
+
+    def write_aggregates(self, release_date, rows):
+        return write_sqlite_aggregates(self.conn, release_date, rows)
+
+    def close(self):
+        if self.conn:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+
+class FileSink(Sink):
+    """Write AircraftMaster rows to CSV (by .csv extension) or NDJSON."""
+
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self.f = None
+        self.writer = None
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.f = open(self.path, 'w', encoding='utf-8', newline='')
+        if self.is_csv:
+            self.writer = csv.writer(self.f)
+            self.writer.writerow([column for _, column in AIRCRAFT_COLUMNS])
+
+    def write(self, batch):
+        if self.is_csv:
+            self.writer.writerows(row_values(record) for record in batch)
+        else:
+            self.f.writelines(json.dumps(record) + '\n' for record in batch)
+        return len(batch)
+
+    def delete(self, n_numbers):
+        # NDJSON tombstones; CSV output has no way to express a removal
+        if self.is_csv:
+            return super().delete(n_numbers)
+        n_numbers = list(n_numbers)
+        self.f.writelines(json.dumps({'n_number': n_number, 'deleted': True}) + '\n' for n_number in n_numbers)
+        return len(n_numbers)
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+class NullSink(Sink):
+    """Count rows and store nothing: dry runs and parse/enrich timing."""
+
+    name = 'null'
+
+    def __init__(self):
+        self.stats = {'rows': 0}
+
+    def write(self, batch):
+        self.stats['rows'] += len(batch)
+        return len(batch)
+
+
+def make_sink(spec, azure_mode='merge', history=False):
+    """Build a sink from a CLI spec: 'azure', 'sqlite:PATH', 'file:PATH', 'bcp:PATH', 'snapshot:DIR' or 'null'."""
+    kind, _, target = spec.partition(':')
+    if kind == 'azure':
+        return AzureSqlSink(table=target or 'AircraftMaster', mode=azure_mode, history=history)
+    if kind == 'sqlite':
+        return SQLiteSink(target or os.path.join('data', 'aircraft.db'), history=history)
+    if history:
+        raise ValueError("history needs a database sink (azure or sqlite)")
+    if kind == 'null':
+        return NullSink()
+    if kind == 'file' and target:
+        return FileSink(target)
+    if kind == 'bcp':
+        from .bulkcopy import BcpFileSink
+        return BcpFileSink(target or os.path.join('data', 'aircraft.bcp'))
+    if kind == 'snapshot':
+        from .snapshot import SnapshotSink
+        return SnapshotSink(target or os.path.join('data', 'snapshot'))
+    raise ValueError(f"Unknown sink '{spec}' (expected azure, sqlite:PATH, file:PATH, bcp:PATH, snapshot:DIR or null)")
@@ -0,0 +1,290 @@
+"""
+Local, read-optimized registry snapshot: SQLite database plus columnar file.
+
+The snapshot sink (--sink snapshot:DIR) turns one full pipeline run into two
+files that downstream jobs (matching, aggregates, tests) can read without
+Azure SQL:
+
+    DIR/aircraft.db     SQLite, AircraftMaster as a WITHOUT ROWID table
+                        clustered on N_NUMBER, secondary indexes on the
+                        lookup/filter columns, ANALYZEd and VACUUMed;
+                        plus the run's FleetAggregate counts
+    DIR/aircraft.cols   every column as flat arrays sorted by N_NUMBER,
+                        the low-cardinality ones dictionary-encoded,
+                        opened with mmap by ColumnarSnapshot
+
+Both are built under temporary names and renamed into place when the run
+closes the sink, so a reader only ever sees a complete snapshot. The build
+runs with journaling and syncs off; readers should open the database with
+connect_snapshot(), which opens it read-only/immutable with a memory map.
+
+Requires numpy for the columnar file.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from .aggregates import write_sqlite_aggregates
+from .columnar import code_dtype
+from .layout import AIRCRAFT_COLUMNS, AIRCRAFT_DICTIONARY_COLUMNS
+from .parse import n_number_key
+from .reference import open_arrays, save_arrays
+from .sinks import Sink, row_values
+
+SNAPSHOT_VERSION = 2
+MAGIC = b'FAASNAP1\n'
+DB_NAME = 'aircraft.db'
+COLUMNS_NAME = 'aircraft.cols'
+
+# (index name suffix, columns) built after the load
+SNAPSHOT_INDEXES = [
+    ('N_NUMBER_KEY', 'N_NUMBER_KEY'),
+    ('MFR_MODEL', 'MFR, MODEL'),
+    ('STATUS_CODE', 'STATUS_CODE'),
+    ('TYPE_REGISTRANT', 'TYPE_REGISTRANT'),
+]
+
+# Build-time settings: nothing to recover if the build dies, so no journal
+BUILD_PRAGMAS = [
+    "PRAGMA page_size = 8192",
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+]
+
+READ_MMAP_BYTES = 512 * 1024 * 1024
+
+INTEGER_COLUMNS = {'ENG_COUNT'}
+# Stored for missing integers in the columnar file
+MISSING_INT = -1
+
+
+def connect_snapshot(path):
+    """Read-only connection to a snapshot database, memory-mapped."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro&immutable=1", uri=True)
+    conn.execute(f"PRAGMA mmap_size = {READ_MMAP_BYTES}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class SnapshotSink(Sink):
+    """Build DIR/aircraft.db and DIR/aircraft.cols from one full run.
+
+    A repeated N-number keeps its last record, as the Azure MERGE does.
+    """
+
+    name = 'snapshot'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.db_path = os.path.join(directory, DB_NAME)
+        self.columns_path = os.path.join(directory, COLUMNS_NAME)
+        self.build_path = self.db_path + '.build'
+        self.conn = None
+        self.stats = {'rows': 0}
+        self.timings = {}
+        self._started = None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.build_path):
+            os.remove(self.build_path)
+        self.conn = sqlite3.connect(self.build_path)
+        for pragma in BUILD_PRAGMAS:
+            self.conn.execute(pragma)
+        column_defs = ', '.join(
+            f"{column} {'INTEGER' if column in INTEGER_COLUMNS else 'TEXT'}"
+            + (' PRIMARY KEY' if column == 'N_NUMBER' else '')
+            for _, column in AIRCRAFT_COLUMNS
+        )
+        self.conn.execute(f"CREATE TABLE AircraftMaster ({column_defs}) WITHOUT ROWID")
+        self._started = time.perf_counter()
+
+    def write(self, batch):
+        columns = [column for _, column in AIRCRAFT_COLUMNS]
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO AircraftMaster ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['?'] * len(columns))})",
+            [row_values(record) for record in batch],
+        )
+        self.stats['rows'] += len(batch)
+        return len(batch)
+
+    def write_aggregates(self, release_date, rows):
+        return write_sqlite_aggregates(self.conn, release_date, rows)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+        return False
+
+    def discard(self):
+        """Drop a half-built snapshot, leaving the previous one in place."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if os.path.exists(self.build_path):
+            os.remove(self.build_path)
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.timings['load'] = round(time.perf_counter() - self._started, 2)
+        started = time.perf_counter()
+        for suffix, columns in SNAPSHOT_INDEXES:
+            self.conn.execute(f"CREATE INDEX IX_AircraftMaster_{suffix} ON AircraftMaster ({columns})")
+        self.conn.execute("ANALYZE")
+        self.conn.execute(f"PRAGMA user_version = {SNAPSHOT_VERSION}")
+        self.conn.commit()
+        self.timings['index'] = round(time.perf_counter() - started, 2)
+
+        started = time.perf_counter()
+        write_columns(self.conn, self.columns_path)
+        self.timings['columnar'] = round(time.perf_counter() - started, 2)
+
+        started = time.perf_counter()
+        # Rewrites the B-trees in key order: dense pages, sequential reads
+        self.conn.execute("VACUUM")
+        self.conn.close()
+        self.conn = None
+        os.replace(self.build_path, self.db_path)
+        self.timings['vacuum'] = round(time.perf_counter() - started, 2)
+
+
+def write_columns(conn, path):
+    """Write the columnar file from the snapshot table, in N_NUMBER order.
+
+    Text columns are stored as UTF-8 bytes plus int64 end offsets (value i is
+    data[ends[i-1]:ends[i]]); integer columns as int16 with MISSING_INT for NULL.
+    AIRCRAFT_DICTIONARY_COLUMNS (manufacturer, model, dates, codes) store their
+    distinct values once in that layout plus a uint8/uint16/int32 code per row.
+    N_NUMBER is also kept as a fixed-width array for binary search.
+    """
+    columns = [column for _, column in AIRCRAFT_COLUMNS]
+    integers = {column: [] for column in columns if column in INTEGER_COLUMNS}
+    # {value: code} per dictionary column, in first-seen order
+    pools = {column: {} for column in columns if column in AIRCRAFT_DICTIONARY_COLUMNS}
+    codes = {column: [] for column in pools}
+    data = {column: bytearray() for column in columns if column not in integers and column not in pools}
+    ends = {column: [] for column in data}
+    rows = conn.execute(f"SELECT {', '.join(columns)} FROM AircraftMaster ORDER BY N_NUMBER")
+    for row in rows:
+        for column, value in zip(columns, row):
+            if column in integers:
+                integers[column].append(MISSING_INT if value is None else value)
+            elif column in pools:
+                pool = pools[column]
+                codes[column].append(pool.setdefault(value or '', len(pool)))
+            else:
+                data[column] += (value or '').encode('utf-8')
+                ends[column].append(len(data[column]))
+
+    arrays = {}
+    for column in data:
+        arrays[f"ends:{column}"] = np.array(ends[column], dtype=np.int64)
+        arrays[f"data:{column}"] = np.frombuffer(bytes(data[column]), dtype=np.uint8)
+    for column, pool in pools.items():
+        encoded = [value.encode('utf-8') for value in pool]
+        arrays[f"dict_ends:{column}"] = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+        arrays[f"dict_data:{column}"] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        arrays[f"codes:{column}"] = np.array(codes[column], dtype=code_dtype(len(pool)))
+    for column, values in integers.items():
+        arrays[f"int:{column}"] = np.array(values, dtype=np.int16)
+    n_numbers = [bytes(data['N_NUMBER'][start:end])
+                 for start, end in zip([0] + ends['N_NUMBER'][:-1], ends['N_NUMBER'])]
+    arrays['keys'] = np.array(n_numbers, dtype=f"S{max((len(key) for key in n_numbers), default=1)}")
+    save_arrays(path, MAGIC, {'version': SNAPSHOT_VERSION, 'rows': len(n_numbers),
+                              'columns': AIRCRAFT_COLUMNS, 'integer_columns': sorted(integers),
+                              'dictionary_columns': sorted(pools)}, arrays)
+
+
+def _text_values(data, ends):
+    """Values of a data/ends pair as a list of str."""
+    text = data.tobytes().decode('utf-8')
+    ends = ends.tolist()
+    if text.isascii():
+        # One decode for the whole column; byte offsets are char offsets
+        return [text[start:end] for start, end in zip([0] + ends[:-1], ends)]
+    raw = data.tobytes()
+    return [raw[start:end].decode('utf-8') for start, end in zip([0] + ends[:-1], ends)]
+
+
+class ColumnarSnapshot:
+    """mmap'd aircraft.cols: whole columns as lists/arrays, or one record by N-number."""
+
+    def __init__(self, header, arrays, mm):
+        self.header = header
+        self.arrays = arrays
+        self.keys = arrays['keys']
+        self.column_keys = {column: key for key, column in header['columns']}
+        self._mmap = mm
+        self._dictionaries = {}
+
+    @classmethod
+    def open(cls, path):
+        header, arrays, mm = open_arrays(path, MAGIC)
+        if header['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is snapshot version {header['version']}, expected {SNAPSHOT_VERSION}")
+        return cls(header, arrays, mm)
+
+    def __len__(self):
+        return self.header['rows']
+
+    def _value(self, column, i):
+        if column in self.header['integer_columns']:
+            value = int(self.arrays[f"int:{column}"][i])
+            return None if value == MISSING_INT else value
+        prefix = ''
+        if column in self.header['dictionary_columns']:
+            i = int(self.arrays[f"codes:{column}"][i])
+            prefix = 'dict_'
+        ends = self.arrays[f"{prefix}ends:{column}"]
+        start = int(ends[i - 1]) if i else 0
+        return self.arrays[f"{prefix}data:{column}"][start:int(ends[i])].tobytes().decode('utf-8')
+
+    def dictionary(self, column):
+        """(distinct values, codes array) of a dictionary-encoded column; values[codes[i]] is row i."""
+        values = self._dictionaries.get(column)
+        if values is None:
+            values = [sys.intern(value) for value in _text_values(self.arrays[f"dict_data:{column}"],
+                                                                   self.arrays[f"dict_ends:{column}"])]
+            self._dictionaries[column] = values
+        return values, self.arrays[f"codes:{column}"]
+
+    def column(self, column):
+        """All values of one column (e.g. 'MFR'), in N_NUMBER order."""
+        if column in self.header['integer_columns']:
+            values = self.arrays[f"int:{column}"]
+            return [None if value == MISSING_INT else value for value in values.tolist()]
+        if column in self.header['dictionary_columns']:
+            values, codes = self.dictionary(column)
+            return list(map(values.__getitem__, codes.tolist()))
+        return _text_values(self.arrays[f"data:{column}"], self.arrays[f"ends:{column}"])
+
+    def get(self, n_number):
+        """Enriched record dict for an N-number, or None."""
+        key = n_number_key(n_number).encode('utf-8')
+        pos = int(np.searchsorted(self.keys, key))
+        if pos >= len(self.keys) or self.keys[pos] != key:
+            return None
+        return {self.column_keys[column]: self._value(column, pos) for column in self.column_keys}
+
+    def to_frame(self):
+        """pandas DataFrame with one column per AircraftMaster column; dictionary columns are categoricals."""
+        import pandas as pd
+        frame = {}
+        for column in self.column_keys:
+            if column in self.header['dictionary_columns']:
+                values, codes = self.dictionary(column)
+                frame[column] = pd.Categorical.from_codes(codes.astype(np.int32), values)
+            else:
+                frame[column] = self.column(column)
+        return pd.DataFrame(frame)
@@ -0,0 +1,209 @@
+"""
+Full registry reloads through a shadow table and an atomic rename swap.
+
+Deleting AircraftMaster and re-inserting it leaves readers with a partial
+(or empty) table for the whole load and logs every row twice. A swap
+reload instead:
+
+1. prepare() creates <table>_shadow as an empty heap with the live table's
+   columns (SELECT TOP 0 * INTO) plus an IDENTITY load sequence, which
+   readers never touch;
+2. the pipeline (or bcp) loads it with plain inserts - no MERGE, no index
+   maintenance, no locks shared with readers;
+3. finish() drops duplicate N-numbers (the last row loaded wins, as with
+   MERGE), drops the load sequence, builds the live table's primary key
+   and indexes on the shadow, and swap()s it in: inside one transaction the
+   live table becomes <table>_old and the shadow becomes <table>. Renames
+   are metadata-only, so readers see the old complete table until the
+   commit and the new complete, indexed table after it.
+
+SELECT INTO copies columns only, and a computed column arrives as a plain
+one, so prepare() re-adds the live table's computed columns (N_NUMBER_KEY)
+from their definitions and loads leave them to the server. The primary key
+and indexes are rebuilt from the live table's definitions, but defaults,
+check and foreign key constraints and triggers are not, so prepare()
+refuses to shadow a table that has any rather than silently swapping in a
+table without them.
+
+The swap needs a brief schema lock; it waits up to lock_timeout seconds for
+running queries and retries rather than queueing everything behind it. A
+shadow with fewer than min_ratio of the live table's rows is not swapped in
+(a truncated download should not replace a good registry).
+"""
+
+import time
+
+from .indexes import create_index_sql, index_definitions, run_statements
+
+SHADOW_SUFFIX = '_shadow'
+OLD_SUFFIX = '_old'
+DEFAULT_MIN_RATIO = 0.9
+DEFAULT_LOCK_TIMEOUT = 10
+SWAP_ATTEMPTS = 5
+# SQL Server "Lock request time out period exceeded"
+LOCK_TIMEOUT_ERROR = 1222
+# Shadow-only column numbering rows in load order. Inserts name their columns and
+# bulk_load() rewrites the bcp format file from the shadow's own sys.columns
+# ordinals, so neither writes it and IDENTITY fills it in
+LOAD_SEQUENCE_COLUMN = 'LOAD_SEQ'
+
+# Computed columns SELECT INTO turns into plain ones
+COMPUTED_COLUMNS_SQL = """
+    SELECT name, definition, is_persisted FROM sys.computed_columns
+    WHERE object_id = OBJECT_ID(%s) ORDER BY column_id
+"""
+
+# Table objects SELECT INTO does not copy: (kind, name) of each
+UNCOPIED_OBJECTS_SQL = """
+    SELECT 'default', name FROM sys.default_constraints WHERE parent_object_id = OBJECT_ID(%s)
+    UNION ALL
+    SELECT 'check constraint', name FROM sys.check_constraints WHERE parent_object_id = OBJECT_ID(%s)
+    UNION ALL
+    SELECT 'foreign key', name FROM sys.foreign_keys
+    WHERE parent_object_id = OBJECT_ID(%s) OR referenced_object_id = OBJECT_ID(%s)
+    UNION ALL
+    SELECT 'trigger', name FROM sys.triggers WHERE parent_id = OBJECT_ID(%s)
+"""
+
+
+class ShadowTable:
+    """Load-then-swap helper for one Azure SQL table."""
+
+    def __init__(self, table='AircraftMaster', connect=None, min_ratio=DEFAULT_MIN_RATIO,
+                 lock_timeout=DEFAULT_LOCK_TIMEOUT, keep_old=False):
+        self.table = table
+        self.name = table + SHADOW_SUFFIX
+        self.old = table + OLD_SUFFIX
+        self.connect = connect
+        self.min_ratio = min_ratio
+        self.lock_timeout = lock_timeout
+        self.keep_old = keep_old
+        self.timings = {}
+
+    def _connection(self):
+        if self.connect is None:
+            from .db import get_connection
+            self.connect = get_connection
+        return self.connect()
+
+    def _run(self, statements, fetch=False):
+        return run_statements(self._connection(), statements, fetch)
+
+    def _indexes(self, table):
+        conn = self._connection()
+        try:
+            return index_definitions(conn.cursor(), table)
+        finally:
+            conn.close()
+
+    def _timed(self, phase, started):
+        self.timings[phase] = round(time.perf_counter() - started, 2)
+
+    def prepare(self):
+        """(Re)create the empty shadow heap with the live table's columns and a load sequence.
+
+        Computed columns are recreated as computed columns, so the server keeps
+        filling them in.
+
+        Raises ValueError if the live table has objects the swap would lose.
+        """
+        started = time.perf_counter()
+        uncopied = self._run([(UNCOPIED_OBJECTS_SQL, (self.table,) * 5)], fetch=True)
+        if uncopied:
+            found = ', '.join(f"{kind} {name}" for kind, name in uncopied)
+            raise ValueError(f"{self.table} has {found}, which a swap reload would drop; "
+                             f"load it without --swap")
+        statements = [
+            (f"IF OBJECT_ID(%s) IS NOT NULL DROP TABLE [{self.name}]", (self.name,)),
+            (f"SELECT TOP 0 * INTO [{self.name}] FROM [{self.table}]", None),
+        ]
+        for name, definition, persisted in self._run([(COMPUTED_COLUMNS_SQL, (self.table,))], fetch=True):
+            statements += [
+                (f"ALTER TABLE [{self.name}] DROP COLUMN [{name}]", None),
+                (f"ALTER TABLE [{self.name}] ADD [{name}] AS {definition}" + (" PERSISTED" if persisted else ""),
+                 None),
+            ]
+        statements.append(
+            (f"ALTER TABLE [{self.name}] ADD [{LOAD_SEQUENCE_COLUMN}] BIGINT IDENTITY(1, 1) NOT NULL", None))
+        self._run(statements)
+        self._timed('prepare', started)
+        return self.name
+
+    def finish(self):
+        """Dedupe and index the loaded shadow, then swap it in. Returns the phase timings."""
+        started = time.perf_counter()
+        rows, live_rows, duplicates = self._counts()
+        if live_rows and rows < live_rows * self.min_ratio:
+            raise RuntimeError(f"{self.name} has {rows:,} rows, under {self.min_ratio:.0%} of the "
+                               f"{live_rows:,} in {self.table}; not swapping (the live table is unchanged)")
+        statements = []
+        if duplicates:
+            # The primary key cannot be built over repeated N-numbers; keep the last loaded
+            statements.append((f"""
+                WITH ranked AS (
+                    SELECT ROW_NUMBER() OVER (PARTITION BY N_NUMBER ORDER BY [{LOAD_SEQUENCE_COLUMN}] DESC) AS copy
+                    FROM [{self.name}]
+                )
+                DELETE FROM ranked WHERE copy > 1
+            """, None))
+        statements.append((f"ALTER TABLE [{self.name}] DROP COLUMN [{LOAD_SEQUENCE_COLUMN}]", None))
+        self._run(statements)
+        self._timed('check', started)
+
+        started = time.perf_counter()
+        indexes = self._build_indexes()
+        self._timed('index', started)
+
+        started = time.perf_counter()
+        self.swap(indexes)
+        self._timed('swap', started)
+        self.timings.update({'rows': rows, 'replaced_rows': live_rows, 'duplicates': duplicates})
+        return self.timings
+
+    def _counts(self):
+        """(distinct N-numbers in the shadow, live rows, duplicate shadow rows)."""
+        (rows, live_rows, distinct), = self._run([(f"""
+            SELECT (SELECT COUNT_BIG(*) FROM [{self.name}]),
+                   (SELECT COUNT_BIG(*) FROM [{self.table}]),
+                   (SELECT COUNT_BIG(DISTINCT N_NUMBER) FROM [{self.name}])
+        """, None)], fetch=True)
+        return distinct, live_rows, rows - distinct
+
+    def _build_indexes(self):
+        """Recreate the live table's indexes on the shadow; the primary key gets a temporary name."""
+        indexes = self._indexes(self.table)
+        # One index per transaction; the clustered index comes first so the
+        # nonclustered ones are built once, on the final row locators
+        for index in indexes:
+            name = index['name'] + SHADOW_SUFFIX if index['primary_key'] else None
+            self._run([(create_index_sql(index, self.name, name), None)])
+        return indexes
+
+    def swap(self, indexes=None):
+        """Atomically rename live -> _old and shadow -> live, retrying on lock timeouts."""
+        indexes = self._indexes(self.table) if indexes is None else indexes
+        primary_key = next((index['name'] for index in indexes if index['primary_key']), None)
+        statements = [
+            (f"SET LOCK_TIMEOUT {int(self.lock_timeout * 1000)}", None),
+            (f"IF OBJECT_ID(%s) IS NOT NULL DROP TABLE [{self.old}]", (self.old,)),
+            ("EXEC sp_rename %s, %s", (self.table, self.old)),
+        ]
+        if primary_key:
+            # Constraint names are schema-wide, so the primary keys trade names too
+            statements.append(("EXEC sp_rename %s, %s, 'OBJECT'", (primary_key, primary_key + OLD_SUFFIX)))
+        statements.append(("EXEC sp_rename %s, %s", (self.name, self.table)))
+        if primary_key:
+            statements.append(("EXEC sp_rename %s, %s, 'OBJECT'", (primary_key + SHADOW_SUFFIX, primary_key)))
+
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                self._run(statements)
+                break
+            except Exception as e:
+                code = e.args[0] if e.args else None
+                if code != LOCK_TIMEOUT_ERROR or attempt == SWAP_ATTEMPTS:
+                    raise
+                print(f"  Swap waited {self.lock_timeout}s for readers; retrying ({attempt}/{SWAP_ATTEMPTS})")
+
+        if not self.keep_old:
+            self._run([(f"DROP TABLE [{self.old}]", None)])
@@ -0,0 +1,309 @@
+"""
+Synthetic FAA Releasable Aircraft files for benchmarks and local testing.
+
+write_registry() writes MASTER, ACFTREF and ENGINE files in the same
+comma-separated fixed-width layout as the FAA release (header line, CRLF
+line endings, latin-1), placed with the field specs from layout.py so the
+parsers read them exactly like the real thing. Values follow the rough
+shape of the real registry: valid N-number forms, a few popular models
+covering most of the fleet, mostly individual/LLC owners and valid status.
+
+Output is deterministic for a given seed and row count.
+"""
+
+import bisect
+import os
+import random
+import shutil
+import zipfile
+
+from .layout import FieldSpec, MASTER_FIELDS, ACFTREF_FIELDS, ENGINE_FIELDS, DEREG_FIELDS
+
+# Real record widths, so read/parse throughput is measured on realistic bytes
+MASTER_RECORD_WIDTH = 618
+ACFTREF_RECORD_WIDTH = 133
+ENGINE_RECORD_WIDTH = 47
+DEREG_RECORD_WIDTH = 720
+
+# Roughly the size of the real reference files
+ACFTREF_MODELS = 90000
+ENGINE_MODELS = 4700
+
+# Columns the pipeline does not read, filled in so lines look like the release
+ACFTREF_EXTRA_FIELDS = [
+    FieldSpec('type_aircraft', 60, 61),
+    FieldSpec('type_engine', 62, 64),
+    FieldSpec('ac_cat', 65, 66),
+    FieldSpec('build_cert', 67, 68),
+    FieldSpec('no_seats', 72, 75),
+    FieldSpec('ac_weight', 76, 83),
+    FieldSpec('speed', 84, 88),
+]
+ENGINE_EXTRA_FIELDS = [
+    FieldSpec('type', 31, 33),
+    FieldSpec('horsepower', 34, 39),
+    FieldSpec('thrust', 40, 46),
+]
+
+# N-number letters skip I and O
+TAIL_LETTERS = 'ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+MANUFACTURERS = [
+    'CESSNA', 'PIPER', 'BEECH', 'CIRRUS DESIGN CORP', 'MOONEY AIRCRAFT CORP.', 'BELLANCA',
+    'BOEING', 'AIRBUS', 'EMBRAER', 'BOMBARDIER INC', 'TEXTRON AVIATION INC', 'DIAMOND AIRCRAFT IND INC',
+    'ROBINSON HELICOPTER CO', 'BELL HELICOPTER TEXTRON', 'AERONCA', 'TAYLORCRAFT', 'GRUMMAN AMERICAN AVN. CORP',
+    'VANS AIRCRAFT INC', 'LUSCOMBE', 'MAULE AEROSPACE TECHNOLOGY', 'AMERICAN CHAMPION AIRCRAFT', 'ERCOUPE',
+]
+ENGINE_MAKERS = [
+    'LYCOMING', 'CONT MOTOR', 'P&W CANADA', 'ROTAX', 'GE', 'HONEYWELL', 'ROLLS-ROYC', 'FRANKLIN', 'WILLIAMS',
+]
+SURNAMES = [
+    'SMITH', 'JOHNSON', 'WILLIAMS', 'BROWN', 'JONES', 'MILLER', 'DAVIS', 'GARCIA', 'RODRIGUEZ', 'WILSON',
+    'MARTINEZ', 'ANDERSON', 'TAYLOR', 'THOMAS', 'HERNANDEZ', 'MOORE', 'MARTIN', 'JACKSON', 'THOMPSON', 'WHITE',
+]
+GIVEN_NAMES = ['JAMES', 'MARY', 'JOHN', 'PATRICIA', 'ROBERT', 'JENNIFER', 'MICHAEL', 'LINDA', 'DAVID', 'SUSAN']
+COMPANY_WORDS = ['AVIATION', 'AIR', 'FLYING', 'AERO', 'SKY', 'WINGS', 'LEASING', 'HOLDINGS', 'CHARTER', 'FLIGHT']
+CITIES = [
+    ('WICHITA', 'KS', '67209'), ('DENVER', 'CO', '80202'), ('PHOENIX', 'AZ', '85001'), ('DALLAS', 'TX', '75201'),
+    ('ANCHORAGE', 'AK', '99501'), ('ORLANDO', 'FL', '32801'), ('SEATTLE', 'WA', '98101'), ('ATLANTA', 'GA', '30301'),
+    ('GRAND RAPIDS', 'MI', '49503'), ('WILMINGTON', 'DE', '19801'), ('SALT LAKE CITY', 'UT', '84101'),
+    ('SAN DIEGO', 'CA', '92101'), ('OSHKOSH', 'WI', '54901'), ('MINNEAPOLIS', 'MN', '55401'),
+]
+STREETS = ['MAIN ST', 'AIRPORT RD', 'HANGAR LN', 'RUNWAY DR', 'OAK AVE', 'PO BOX']
+
+# (code, weight) distributions close to the real registry
+REGISTRANT_WEIGHTS = [('1', 50), ('3', 18), ('7', 22), ('2', 2), ('4', 4), ('5', 2), ('8', 1), ('9', 1)]
+STATUS_WEIGHTS = [('V', 88), ('R', 3), ('E', 3), ('D', 2), ('T', 2), ('M', 2)]
+
+
+def _line_format(specs, width, newline):
+    """str.format template placing each field at its slice, comma-separated like the release.
+
+    Positional arguments follow the order of `specs`.
+    """
+    parts = []
+    pos = 0
+    for i, spec in sorted(enumerate(specs), key=lambda item: item[1].start):
+        if spec.start > pos:
+            parts.append(',' + ' ' * (spec.start - pos - 1))
+        size = spec.end - spec.start
+        parts.append(f"{{{i}:<{size}.{size}}}")
+        pos = spec.end
+    if width > pos:
+        parts.append(',' + ' ' * (width - pos - 1))
+    return ''.join(parts) + newline
+
+
+class _Weighted:
+    """Fast repeated weighted choice over a fixed population."""
+
+    def __init__(self, pairs, rng):
+        self.values = [value for value, _ in pairs]
+        self.cumulative = []
+        total = 0
+        for _, weight in pairs:
+            total += weight
+            self.cumulative.append(total)
+        self.total = total
+        self.rng = rng
+
+    def __call__(self):
+        return self.values[bisect.bisect_right(self.cumulative, self.rng.random() * self.total)]
+
+
+def _tail_segments():
+    """(digits, letters, count) for each valid N-number form: 1-5 digits, or fewer digits plus 1-2 letters."""
+    segments = []
+    for letters, max_digits in ((0, 5), (1, 4), (2, 3)):
+        for digits in range(1, max_digits + 1):
+            segments.append((digits, letters, 9 * 10 ** (digits - 1) * len(TAIL_LETTERS) ** letters))
+    return segments
+
+
+TAIL_SEGMENTS = _tail_segments()
+TAIL_SPACE = sum(count for _, _, count in TAIL_SEGMENTS)
+
+
+def tail_number(k):
+    """k-th N-number (without the N) in a fixed enumeration of the valid forms.
+
+    Past the ~915k valid tails, letter-led 5-character keys keep the rows
+    unique (they are not real N-numbers, but the registry never gets that big).
+    """
+    if k >= TAIL_SPACE:
+        k -= TAIL_SPACE
+        chars = '0123456789' + TAIL_LETTERS
+        key = ''
+        for _ in range(4):
+            k, r = divmod(k, len(chars))
+            key = chars[r] + key
+        return TAIL_LETTERS[k % len(TAIL_LETTERS)] + key
+
+    for digits, letters, count in TAIL_SEGMENTS:
+        if k < count:
+            break
+        k -= count
+    suffix = ''
+    for _ in range(letters):
+        k, r = divmod(k, len(TAIL_LETTERS))
+        suffix = TAIL_LETTERS[r] + suffix
+    return str(10 ** (digits - 1) + k) + suffix
+
+
+def _header(specs):
+    """Column-name header line, as at the top of each release file."""
+    labels = [spec.name.upper().replace('_', ' ') for spec in specs]
+    return ','.join(labels).replace('N NUMBER', 'N-NUMBER') + '\r\n'
+
+
+def _open(path):
+    return open(path, 'w', encoding='latin-1', newline='')
+
+
+def write_acftref(path, rng, models=ACFTREF_MODELS, engine_codes=()):
+    """Write ACFTREF.txt; returns [(code, engine code)] for the MASTER generator."""
+    specs = ACFTREF_FIELDS + ACFTREF_EXTRA_FIELDS
+    template = _line_format(specs, ACFTREF_RECORD_WIDTH, '\r\n')
+    models_out = []
+    with _open(path) as f:
+        f.write(_header(specs))
+        for i in range(models):
+            mfr = MANUFACTURERS[i % len(MANUFACTURERS)]
+            code = f"{i // 100:05d}{i % 100:02d}"
+            engines = rng.choice((1, 1, 1, 1, 2, 2, 0, 4))
+            f.write(template.format(
+                code, mfr, f"{rng.choice('ABCDEFGHPRS')}{100 + i % 900}-{i % 7}", f"{engines:02d}",
+                rng.choice('456'), ' 1' if engines else ' 0', '1', ' ', f"{rng.randint(1, 400):03d}",
+                f"CLASS {rng.randint(1, 4)}", f"{rng.randint(0, 500):04d}",
+            ))
+            engine_code = engine_codes[i % len(engine_codes)] if engine_codes and engines else ''
+            models_out.append((code, engine_code))
+    return models_out
+
+
+def write_engine(path, rng, models=ENGINE_MODELS):
+    """Write ENGINE.txt; returns the engine codes."""
+    specs = ENGINE_FIELDS + ENGINE_EXTRA_FIELDS
+    template = _line_format(specs, ENGINE_RECORD_WIDTH, '\r\n')
+    codes = []
+    with _open(path) as f:
+        f.write(_header(specs))
+        for i in range(models):
+            code = f"{i // 100:03d}{i % 100:02d}"
+            f.write(template.format(
+                code, ENGINE_MAKERS[i % len(ENGINE_MAKERS)], f"O-{320 + i % 400}-{chr(65 + i % 26)}",
+                rng.choice(('1 ', '2 ', '5 ')), f"{rng.randint(65, 2000):05d}", f"{0:06d}",
+            ))
+            codes.append(code)
+    return codes
+
+
+def _registrant_name(rng, type_registrant):
+    if type_registrant in ('1', '2', '4'):
+        return f"{rng.choice(SURNAMES)} {rng.choice(GIVEN_NAMES)} {rng.choice(TAIL_LETTERS)}"
+    suffix = 'LLC' if type_registrant == '7' else 'INC'
+    return f"{rng.choice(SURNAMES)} {rng.choice(COMPANY_WORDS)} {suffix}"
+
+
+def _date(rng, first_year, last_year=2025):
+    return f"{rng.randint(first_year, last_year)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+
+
+def write_master(paths, rows, rng, models):
+    """Write `rows` MASTER records spread over `paths` (one MASTER.txt or MASTER-1..9)."""
+    template = _line_format(MASTER_FIELDS, MASTER_RECORD_WIDTH, '\r\n')
+    header = _header(MASTER_FIELDS)
+
+    # A few hundred popular models cover most of the fleet, the rest form a long tail
+    popular = [(model, 400) for model in models[:300]]
+    model_of = _Weighted(popular + [(model, 1) for model in models[300:]], rng)
+    registrant_of = _Weighted(REGISTRANT_WEIGHTS, rng)
+    status_of = _Weighted(STATUS_WEIGHTS, rng)
+    stride = max(1, TAIL_SPACE // rows) if rows < TAIL_SPACE else 1
+
+    per_file = -(-rows // len(paths)) if paths else 0
+    k = 0
+    for path in paths:
+        with _open(path) as f:
+            f.write(header)
+            for _ in range(min(per_file, rows - k)):
+                model_code, engine_code = model_of()
+                type_registrant = registrant_of()
+                city, state, zip_code = rng.choice(CITIES)
+                f.write(template.format(
+                    tail_number(k * stride), f"{rng.randint(1, 99999999):08d}", model_code, engine_code,
+                    str(rng.randint(1940, 2024)), type_registrant, _registrant_name(rng, type_registrant),
+                    f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", '', city, state, zip_code + '1234',
+                    str(rng.randint(1, 8)), f"{rng.randint(1, 200):03d}", 'US',
+                    _date(rng, 2000), _date(rng, 1990), '1', _date(rng, 1950), '4', ' 1', status_of(),
+                ))
+                k += 1
+
+
+def write_dereg(path, rows, rng, models, tails):
+    """Write `rows` cancelled registrations, mostly earlier owners of the given tails."""
+    template = _line_format(DEREG_FIELDS, DEREG_RECORD_WIDTH, '\r\n')
+    with _open(path) as f:
+        f.write(_header(DEREG_FIELDS))
+        for i in range(rows):
+            model_code, engine_code = rng.choice(models)
+            tail = rng.choice(tails) if tails and rng.random() < 0.7 else tail_number(TAIL_SPACE - 1 - i)
+            city, state, zip_code = rng.choice(CITIES)
+            issued = rng.randint(1970, 2022)
+            f.write(template.format(
+                tail, f"{rng.randint(1, 99999999):08d}", model_code, rng.choice('ACDX'),
+                _registrant_name(rng, rng.choice('137')), f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", '',
+                city, state, zip_code + '1234', engine_code, str(rng.randint(1940, 2020)), '1N', str(rng.randint(1, 8)),
+                f"{rng.randint(1, 200):03d}", 'US', _date(rng, 1950, issued), _date(rng, issued + 1),
+                f"{rng.randint(0, 0o77777777):08o}", '', rng.choice(('', '', 'CANADA', 'MEXICO')),
+                _date(rng, issued + 1), _date(rng, issued, issued),
+            ))
+
+
+def write_registry(out_dir, rows, seed=1, shards=False, acftref_models=ACFTREF_MODELS,
+                   engine_models=ENGINE_MODELS, dereg_rows=0):
+    """Write ACFTREF.txt, ENGINE.txt and MASTER.txt (or MASTER-1..9.txt) into out_dir,
+    plus DEREG.txt when dereg_rows > 0.
+
+    Returns {'master': [paths], 'acftref': path, 'engine': path[, 'dereg': path]}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    engine_path = os.path.join(out_dir, 'ENGINE.txt')
+    acftref_path = os.path.join(out_dir, 'ACFTREF.txt')
+    engine_codes = write_engine(engine_path, rng, engine_models)
+    models = write_acftref(acftref_path, rng, acftref_models, engine_codes)
+
+    names = [f"MASTER-{i}.txt" for i in range(1, 10)] if shards else ['MASTER.txt']
+    master = [os.path.join(out_dir, name) for name in names]
+    write_master(master, rows, rng, models)
+    files = {'master': master, 'acftref': acftref_path, 'engine': engine_path}
+    if dereg_rows:
+        stride = max(1, TAIL_SPACE // rows) if rows < TAIL_SPACE else 1
+        tails = [tail_number(k * stride) for k in range(0, rows, max(1, rows // 1000))]
+        files['dereg'] = os.path.join(out_dir, 'DEREG.txt')
+        write_dereg(files['dereg'], dereg_rows, rng, models, tails)
+    return files
+
+
+def write_release_zip(files, path):
+    """Pack write_registry() output into a ReleasableAircraft.zip like the FAA's:
+    deflated, flat, members in the FAA's (alphabetical) order. Returns path.
+
+    The FAA zip always has a single MASTER.txt, so MASTER-1..9 shards are
+    joined into one (keeping only the first header line).
+    """
+    members = [files['acftref']] + ([files['dereg']] if 'dereg' in files else []) + [files['engine']]
+    members = [(os.path.basename(member), member) for member in members] + [('MASTER.txt', None)]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, member in sorted(members):
+            if member is not None:
+                archive.write(member, name)
+                continue
+            with archive.open(name, 'w') as out:
+                for i, shard in enumerate(files['master']):
+                    with open(shard, 'rb') as f:
+                        if i:
+                            f.readline()
+                        shutil.copyfileobj(f, out)
+    return path
@@ -0,0 +1,313 @@
+"""
+Run telemetry for the ingestion pipeline.
+
+A Telemetry object rides along with run_pipeline() and records where a
+load spends its time:
+
+- per-stage wall time and item counts. Pipeline stages are chained
+  generators, so timed() measures the time spent pulling each item from
+  its stage. That time includes the stages upstream of it; report() subtracts
+  the upstream stage to give each stage's own share. CPU time is measured
+  per batch for the read/parse/enrich chain as a whole (wall minus CPU there
+  is disk or network wait), and per call for writes and other stages.
+- a commit latency histogram (one observation per batch written)
+- counters (failed batches, and the sink's round trips and transient-error
+  retries)
+- process CPU time and peak resident memory
+
+write() saves a JSON run report and a Prometheus text-format file next to
+it. The .prom file can be picked up by node_exporter's textfile collector.
+Both are replaced atomically, so a scrape never sees a partial file.
+
+Workers of a parallel load each keep their own Telemetry; the parent
+merge()s their snapshot() dicts, so stage times add up across processes.
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+METRIC_PREFIX = 'faa_ingest'
+# Upper bounds (seconds) of the commit latency buckets
+COMMIT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+HISTOGRAM_HELP = {'commit_seconds': "Time to write and commit one batch"}
+_END = object()
+
+
+def _cpu_seconds():
+    """CPU time of this process and its finished children (parallel workers)."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process and its finished children, or None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=COMMIT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate of the q-quantile, interpolated inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum,
+                'count': self.count, 'max': self.max}
+
+    def merge(self, data):
+        if tuple(data['buckets']) != self.buckets:
+            raise ValueError("cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, data['counts'])]
+        self.sum += data['sum']
+        self.count += data['count']
+        self.max = max(self.max, data['max'])
+
+
+class Telemetry:
+    """Stage timers, histograms and counters for one ingestion run."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.cpu_started = _cpu_seconds()
+        # name -> {'wall', 'cpu', 'items', 'upstream'}, in pipeline order
+        self.stages = {}
+        self.histograms = {}
+        self.counters = Counter()
+
+    def _stage(self, name, upstream=None, cpu=True):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'wall': 0.0, 'cpu': 0.0 if cpu else None, 'items': 0, 'upstream': upstream}
+        return stage
+
+    def timed(self, name, iterable, upstream=None, cpu=False):
+        """Pass items through, timing each pull from iterable (which includes the upstream stage's time).
+
+        Per-record stages only read the wall clock: the thread CPU clock is a
+        system call, too slow to read twice per record. cpu=True also measures
+        CPU; meant for the batch stage, whose pulls cover all stages before it.
+        """
+        # Registered now rather than on the first pull, so stages stay in pipeline order
+        stage = self._stage(name, upstream, cpu)
+        return self._timed_cpu(stage, iter(iterable)) if cpu else self._timed(stage, iter(iterable))
+
+    @staticmethod
+    def _timed(stage, items):
+        clock = time.perf_counter
+        while True:
+            wall = clock()
+            item = next(items, _END)
+            stage['wall'] += clock() - wall
+            if item is _END:
+                return
+            stage['items'] += 1
+            yield item
+
+    @staticmethod
+    def _timed_cpu(stage, items):
+        clock, cpu_clock = time.perf_counter, time.thread_time
+        while True:
+            wall, cpu = clock(), cpu_clock()
+            item = next(items, _END)
+            stage['wall'] += clock() - wall
+            stage['cpu'] += cpu_clock() - cpu
+            if item is _END:
+                return
+            stage['items'] += 1
+            yield item
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a block (reference load, deletes, aggregate write...) as a stage of its own."""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def add_time(self, name, wall, cpu=None, items=0):
+        """Add time measured elsewhere (e.g. on a writer thread) to a stage."""
+        stage = self._stage(name, cpu=cpu is not None)
+        stage['wall'] += wall
+        if cpu is not None and stage['cpu'] is not None:
+            stage['cpu'] += cpu
+        stage['items'] += items
+
+    def observe(self, name, value, buckets=COMMIT_BUCKETS):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def snapshot(self):
+        """Picklable raw state, for merge() in another process."""
+        return {'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'histograms': {name: h.to_dict() for name, h in self.histograms.items()},
+                'counters': dict(self.counters)}
+
+    def merge(self, snapshot):
+        """Add a worker's snapshot() into this run."""
+        for name, data in snapshot['stages'].items():
+            stage = self._stage(name, data['upstream'], data['cpu'] is not None)
+            stage['wall'] += data['wall']
+            stage['items'] += data['items']
+            if data['cpu'] is not None:
+                stage['cpu'] += data['cpu']
+        for name, data in snapshot['histograms'].items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(data['buckets'])
+            histogram.merge(data)
+        self.counters.update(snapshot['counters'])
+
+    def report(self, stats=None):
+        """The JSON run report: stage breakdown, histograms, counters and the run's stats."""
+        stages = {}
+        for name, stage in self.stages.items():
+            upstream = self.stages.get(stage['upstream'])
+            wall = max(stage['wall'] - upstream['wall'], 0.0) if upstream else stage['wall']
+            entry = stages[name] = {
+                'wall_seconds': round(wall, 3),
+                # CPU of a stage of its own; None where only the stages up to it together were measured
+                'cpu_seconds': round(stage['cpu'], 3) if stage['cpu'] is not None and not upstream else None,
+                'items': stage['items'],
+                'items_per_sec': round(stage['items'] / wall) if wall and stage['items'] else None,
+            }
+            if upstream:
+                # This stage and everything before it; wall minus CPU is time blocked on disk or network
+                entry['through_wall_seconds'] = round(stage['wall'], 3)
+                if stage['cpu'] is not None:
+                    entry['through_cpu_seconds'] = round(stage['cpu'], 3)
+        histograms = {
+            name: dict(h.to_dict(), p50=h.quantile(0.5), p95=h.quantile(0.95), p99=h.quantile(0.99))
+            for name, h in self.histograms.items()
+        }
+        counters = Counter(self.counters)
+        if stats:
+            counters['rows'] += stats.get('rows', 0)
+            counters['written'] += stats.get('written', 0)
+            counters['failed_batches'] += stats.get('failed_batches', 0)
+            for key, value in stats.get('sink', {}).items():
+                counters[f"sink_{key}"] += value
+        peak = peak_rss_bytes()
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'seconds': round(time.perf_counter() - self.started, 3),
+            'cpu_seconds': round(_cpu_seconds() - self.cpu_started, 3),
+            'peak_rss_mb': round(peak / (1024 * 1024), 1) if peak is not None else None,
+            'stages': stages,
+            'histograms': histograms,
+            'counters': dict(counters),
+            'stats': stats or {},
+        }
+
+    def write(self, path, stats=None):
+        """Write the JSON report to path and the Prometheus text file beside it (.prom); returns the report."""
+        report = self.report(stats)
+        _write_atomic(path, json.dumps(report, indent=2, default=str) + '\n')
+        _write_atomic(prometheus_path(path), prometheus_text(report, self.started_at))
+        return report
+
+
+def prometheus_path(path):
+    return os.path.splitext(path)[0] + '.prom'
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+    for labels, value in samples:
+        label_text = '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}' if labels else ''
+        lines.append(f"{METRIC_PREFIX}_{name}{label_text} {value}")
+
+
+def prometheus_text(report, started_at):
+    """A run report in the Prometheus text exposition format."""
+    lines = []
+    _metric(lines, 'last_run_timestamp_seconds', 'gauge', "Start time of the last ingestion run",
+            [({}, round(started_at))])
+    _metric(lines, 'run_seconds', 'gauge', "Wall time of the last run", [({}, report['seconds'])])
+    _metric(lines, 'run_cpu_seconds', 'gauge', "Process CPU time of the last run", [({}, report['cpu_seconds'])])
+    if report['peak_rss_mb'] is not None:
+        _metric(lines, 'peak_rss_bytes', 'gauge', "Peak resident memory of the last run",
+                [({}, round(report['peak_rss_mb'] * 1024 * 1024))])
+
+    stages = report['stages']
+    _metric(lines, 'stage_wall_seconds', 'gauge', "Wall time per pipeline stage, excluding upstream stages",
+            [({'stage': name}, s['wall_seconds']) for name, s in stages.items()])
+    _metric(lines, 'stage_cpu_seconds', 'gauge', "CPU time per stage, where measured on its own",
+            [({'stage': name}, s['cpu_seconds']) for name, s in stages.items() if s['cpu_seconds'] is not None])
+    _metric(lines, 'stage_through_seconds', 'gauge', "Wall/CPU time of a stage together with the stages before it",
+            [({'stage': name, 'clock': clock}, s[f'through_{clock}_seconds'])
+             for name, s in stages.items() for clock in ('wall', 'cpu') if f'through_{clock}_seconds' in s])
+    _metric(lines, 'stage_items', 'gauge', "Items (records or batches) out of each stage",
+            [({'stage': name}, s['items']) for name, s in stages.items()])
+    _metric(lines, 'stage_items_per_second', 'gauge', "Stage throughput over its own wall time",
+            [({'stage': name}, s['items_per_sec']) for name, s in stages.items() if s['items_per_sec']])
+
+    for name, h in report['histograms'].items():
+        samples = []
+        cumulative = 0
+        for bound, n in zip(h['buckets'], h['counts']):
+            cumulative += n
+            samples.append(({'le': bound}, cumulative))
+        samples.append(({'le': '+Inf'}, h['count']))
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {HISTOGRAM_HELP.get(name, name.replace('_', ' '))}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} histogram")
+        for labels, value in samples:
+            lines.append(f'{METRIC_PREFIX}_{name}_bucket{{le="{labels["le"]}"}} {value}')
+        lines.append(f"{METRIC_PREFIX}_{name}_sum {round(h['sum'], 6)}")
+        lines.append(f"{METRIC_PREFIX}_{name}_count {h['count']}")
+
+    for name, value in sorted(report['counters'].items()):
+        _metric(lines, f"{name}_total", 'counter', f"{name.replace('_', ' ').capitalize()} in the last run",
+                [({}, value)])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,114 @@
+"""
+Shared fixtures: small synthetic registries (synthetic.py) and a local HTTP
+server standing in for the FAA site and the GitHub mirror.
+
+Run from the repository root: python -m pytest scripts/faa_ingest/tests
+"""
+
+import email.utils
+import hashlib
+import http.server
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+# scripts/ holds the faa_ingest package and download_faa_full.py
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from faa_ingest.synthetic import write_registry  # noqa: E402
+
+REGISTRY_ROWS = 3000
+
+
+class _FileHandler(http.server.BaseHTTPRequestHandler):
+    """Static files with a content ETag, Last-Modified (the file's mtime),
+    If-None-Match (304) and Range/If-Range (206/416).
+
+    A path in server.drop is sent with its full Content-Length but only half
+    its body, once, like a connection dropped mid-transfer.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = os.path.join(server.root, self.path.lstrip('/'))
+        server.requests.append((self.path, dict(self.headers)))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        status, start = 200, 0
+        requested = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if requested and self.headers.get('If-Range', etag) == etag:
+            start = int(requested.group(1))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(data)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+        body = data[start:]
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(os.path.getmtime(path), usegmt=True))
+        self.send_header('Content-Length', str(len(body)))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        self.end_headers()
+        if self.path in server.drop:
+            server.drop.discard(self.path)
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    """A server over tmp_path/www; .url is its base URL, .root the directory it serves."""
+    root = tmp_path / 'www'
+    root.mkdir()
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FileHandler)
+    server.root = str(root)
+    server.requests = []
+    server.drop = set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """A small synthetic release: {'master': [MASTER.txt], 'acftref': ..., 'engine': ...}."""
+    return write_registry(str(tmp_path / 'release'), REGISTRY_ROWS, seed=7)
+
+
+@pytest.fixture(autouse=True)
+def cli_data_dir(tmp_path, monkeypatch):
+    """Keep the CLI's checkpoints, caches and reports out of the repository's data/."""
+    from faa_ingest import cli
+    data_dir = tmp_path / 'data'
+    monkeypatch.setattr(cli, 'CHECKPOINT_DIR', str(data_dir / 'checkpoints'))
+    monkeypatch.setattr(cli, 'INDEX_DIR', str(data_dir / 'index'))
+    monkeypatch.setattr(cli, 'DATA_DIR', str(data_dir))
+    return data_dir
@@ -0,0 +1,63 @@
+"""FleetAggregate release dates (aggregates.py, ingest_faa.py)."""
+
+import calendar
+import os
+import sqlite3
+
+import download_faa_full
+from faa_ingest.cli import main
+from faa_ingest.synthetic import write_release_zip
+
+# 2024-03-05 12:00:00 UTC
+RELEASED = calendar.timegm((2024, 3, 5, 12, 0, 0))
+
+
+def _release_dates(db):
+    with sqlite3.connect(db) as conn:
+        return {row[0] for row in conn.execute("SELECT DISTINCT RELEASE_DATE FROM FleetAggregate")}
+
+
+def _file_argv(registry, db):
+    return ['--master', registry['master'][0], '--acftref', registry['acftref'], '--engine', registry['engine'],
+            '--sink', f"sqlite:{db}", '--no-metrics']
+
+
+def test_aggregates_use_master_file_date(registry, tmp_path):
+    for path in registry['master']:
+        os.utime(path, (RELEASED, RELEASED))
+    db = tmp_path / 'aircraft.db'
+
+    assert main(_file_argv(registry, db)) == 0
+    assert _release_dates(db) == {'20240305'}
+
+
+def test_release_date_flag_wins(registry, tmp_path):
+    db = tmp_path / 'aircraft.db'
+
+    assert main(_file_argv(registry, db) + ['--release-date', '20240101']) == 0
+    assert _release_dates(db) == {'20240101'}
+    assert main(_file_argv(registry, db) + ['--release-date', '2024-01-01']) == 1
+
+
+def test_aggregates_use_download_last_modified(http_server, registry, tmp_path):
+    path = write_release_zip(registry, os.path.join(http_server.root, 'ReleasableAircraft.zip'))
+    os.utime(path, (RELEASED, RELEASED))
+    db = tmp_path / 'aircraft.db'
+
+    assert main(['--download', f"{http_server.url}/ReleasableAircraft.zip", '--sink', f"sqlite:{db}",
+                 '--release-state', str(tmp_path / 'release.json'), '--no-metrics']) == 0
+    assert _release_dates(db) == {'20240305'}
+
+
+def test_download_faa_full_stamps_release_date(http_server, registry, tmp_path, monkeypatch):
+    path = write_release_zip(registry, os.path.join(http_server.root, 'ReleasableAircraft.zip'))
+    os.utime(path, (RELEASED, RELEASED))
+    data_dir = tmp_path / 'data'
+    monkeypatch.setattr(download_faa_full, 'DATA_DIR', str(data_dir))
+    monkeypatch.setattr(download_faa_full, 'MASTER_FILES_DIR', str(data_dir / 'master_files'))
+    monkeypatch.setattr(download_faa_full, 'RELEASE_STATE', str(data_dir / 'faa_release_download.json'))
+    download_faa_full.ensure_dirs()
+
+    assert download_faa_full.download_release(url=f"{http_server.url}/ReleasableAircraft.zip")
+    assert os.path.getmtime(data_dir / 'master_files' / 'MASTER.txt') == RELEASED
+    assert os.path.getmtime(data_dir / 'ACFTREF.txt') == RELEASED
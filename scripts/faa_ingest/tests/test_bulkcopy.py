@@ -0,0 +1,119 @@
+"""bcp data and format files (bulkcopy.py)."""
+
+import pytest
+
+from faa_ingest import bulkcopy
+from faa_ingest.bulkcopy import DATA_ENCODING, FIELD_TERMINATOR, ROW_TERMINATOR, BcpFileSink, bulk_load
+from faa_ingest.layout import AIRCRAFT_COLUMNS, AIRCRAFT_KEYS, AIRCRAFT_LOAD_COLUMNS
+
+# AircraftMaster as the migrations leave it on the server: N_NUMBER_KEY (computed) was added last
+SERVER_COLUMNS = [column for _, column in AIRCRAFT_COLUMNS if column != 'N_NUMBER_KEY'] + ['N_NUMBER_KEY']
+# A table whose physical order differs from AIRCRAFT_COLUMNS everywhere, with a
+# column the load does not write (like the swap shadow's LOAD_SEQ)
+SHUFFLED_COLUMNS = ['LOAD_SEQ'] + SERVER_COLUMNS[::-1]
+
+
+class FakeConnection:
+    """Answers the sys.columns query for a table with the given column order."""
+
+    def __init__(self, columns):
+        self.rows = [(column, column_id) for column_id, column in enumerate(columns, 1)]
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchall(self):
+        return self.rows
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _record(n_number, name):
+    record = {key: f"{key}:{n_number}" for key in AIRCRAFT_KEYS}
+    record.update({'n_number': n_number, 'n_number_key': n_number, 'name': name, 'eng_count': 2})
+    return record
+
+
+def _bcp_in(data_path, format_path, table_columns):
+    """What `bcp in -f format_path` stores: each field goes to the column at its server ordinal."""
+    with open(format_path, encoding='ascii') as f:
+        lines = f.read().splitlines()
+    ordinals = [int(line.split()[5]) for line in lines[2:2 + int(lines[1])]]
+    with open(data_path, encoding=DATA_ENCODING, newline='') as f:
+        data = f.read()
+    rows = []
+    for line in data.split(ROW_TERMINATOR)[:-1]:
+        row = dict.fromkeys(table_columns)
+        for ordinal, value in zip(ordinals, line.split(FIELD_TERMINATOR)):
+            row[table_columns[ordinal - 1]] = value
+        rows.append(row)
+    return rows
+
+
+def _expected(record):
+    # The server computes N_NUMBER_KEY; bcp leaves it alone
+    return {column: None if column == 'N_NUMBER_KEY' else str(record[key]) for key, column in AIRCRAFT_COLUMNS}
+
+
+@pytest.fixture
+def written(tmp_path):
+    """A bcp data file of three records, and the records."""
+    records = [_record('N1', 'ONE'), _record('N22', 'TWO'), _record('N333', 'THREE')]
+    with BcpFileSink(str(tmp_path / 'aircraft.bcp')) as sink:
+        sink.write(records)
+    return sink, records
+
+
+@pytest.mark.parametrize('table_columns', [SERVER_COLUMNS, SHUFFLED_COLUMNS])
+def test_format_file_round_trips_by_column_id(written, monkeypatch, table_columns):
+    sink, records = written
+    monkeypatch.setattr(bulkcopy, '_run_bcp', lambda data_path, format_path, table, batch_size: len(records))
+
+    bulk_load(sink.path, 'AircraftMaster', connect=lambda: FakeConnection(table_columns))
+
+    for row, record in zip(_bcp_in(sink.path, sink.format_path, table_columns), records):
+        assert {column: row[column] for column in row if column != 'LOAD_SEQ'} == _expected(record)
+
+
+def test_format_file_skips_computed_columns(written):
+    sink, _ = written
+    with open(sink.format_path, encoding='ascii') as f:
+        lines = f.read().splitlines()
+    assert [line.split()[6] for line in lines[2:]] == [column for _, column in AIRCRAFT_LOAD_COLUMNS]
+
+
+def test_format_file_rejects_missing_column(written):
+    sink, _ = written
+    with pytest.raises(ValueError, match='NAME'):
+        bulk_load(sink.path, 'AircraftMaster',
+                  connect=lambda: FakeConnection([column for column in SERVER_COLUMNS if column != 'NAME']))
+
+
+def test_uploaded_format_file_must_match(written, monkeypatch):
+    sink, records = written
+    monkeypatch.setattr(bulkcopy, '_run_bulk_insert', lambda *args: len(records))
+
+    # Written for a table in AIRCRAFT_COLUMNS order: fine as uploaded
+    stats = bulk_load(sink.path, 'AircraftMaster', data_source='blob',
+                      connect=lambda: FakeConnection([column for _, column in AIRCRAFT_COLUMNS]))
+    assert stats['rows'] == len(records)
+    with pytest.raises(RuntimeError, match='upload it'):
+        bulk_load(sink.path, 'AircraftMaster', data_source='blob', connect=lambda: FakeConnection(SHUFFLED_COLUMNS))
+
+
+def test_bcp_keeps_last_record(tmp_path):
+    path = str(tmp_path / 'aircraft.bcp')
+    with BcpFileSink(path) as sink:
+        sink.write([_record('N1', 'FIRST'), _record('N2', 'OTHER')])
+        sink.write([_record('N1', 'SECOND'), _record('N3', 'THIRD\tTAB')])
+    assert sink.stats == {'rows': 3, 'duplicates': 1}
+
+    names = [row['NAME'] for row in _bcp_in(path, sink.format_path, SERVER_COLUMNS)]
+    assert names == ['OTHER', 'SECOND', 'THIRD TAB']
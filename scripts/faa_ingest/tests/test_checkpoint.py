@@ -0,0 +1,111 @@
+"""Crash and resume through a byte-offset checkpoint (checkpoint.py, pipeline.py)."""
+
+import os
+import sqlite3
+
+import pytest
+
+from faa_ingest.checkpoint import Checkpoint
+from faa_ingest.parse import load_reference_data
+from faa_ingest.pipeline import iter_parsed, run_pipeline
+from faa_ingest.sinks import SQLiteSink, Sink
+from faa_ingest.synthetic import write_registry
+
+BATCH_SIZE = 128
+
+
+class Crash(Exception):
+    """Stands in for the process dying mid-load."""
+
+
+class RecordingSink(Sink):
+    """Remembers every N-number it stores; raises Crash on batch number crash_at."""
+
+    name = 'recording'
+
+    def __init__(self, stored, crash_at=None):
+        self.stored = stored
+        self.crash_at = crash_at
+        self.batches = 0
+        self.stats = {}
+
+    def write(self, batch):
+        self.batches += 1
+        if self.batches == self.crash_at:
+            raise Crash()
+        self.stored.extend(record['n_number'] for record in batch)
+        return len(batch)
+
+
+class CrashingSQLiteSink(SQLiteSink):
+    def __init__(self, path, crash_at):
+        super().__init__(path)
+        self.crash_at = crash_at
+        self.batches = 0
+
+    def write(self, batch):
+        self.batches += 1
+        if self.batches == self.crash_at:
+            raise Crash()
+        return super().write(batch)
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    return write_registry(str(tmp_path / 'shards'), 2000, seed=5, shards=True)
+
+
+def _checkpoint(files, tmp_path):
+    return Checkpoint(str(tmp_path / 'checkpoint.json'), files['master'])
+
+
+def _load(files, sink, checkpoint, parser):
+    acftref, engines = load_reference_data(files['acftref'], files['engine'])
+    return run_pipeline(files['master'], sink, acftref, engines, batch_size=BATCH_SIZE, progress_every=0,
+                        parser=parser, checkpoint=checkpoint)
+
+
+@pytest.mark.parametrize('parser', ['line', 'columnar'])
+@pytest.mark.parametrize('crash_at', [2, 7, 12])
+def test_resume_loses_and_repeats_nothing(sharded, tmp_path, parser, crash_at):
+    expected = [parsed['n_number'] for parsed in iter_parsed(sharded['master'], 'line')]
+    checkpoint = _checkpoint(sharded, tmp_path)
+    stored = []
+
+    with pytest.raises(Crash):
+        _load(sharded, RecordingSink(stored, crash_at), checkpoint, parser)
+    assert len(stored) == (crash_at - 1) * BATCH_SIZE
+    assert checkpoint.load()['last_n_number'] == stored[-1]
+
+    # A new process: nothing carried over but the checkpoint file
+    stats = _load(sharded, RecordingSink(stored), _checkpoint(sharded, tmp_path), parser)
+    assert stored == expected
+    assert stats['rows'] == len(expected) - (crash_at - 1) * BATCH_SIZE
+    assert not os.path.exists(checkpoint.path)
+
+
+def test_resume_into_sqlite(sharded, tmp_path):
+    db = str(tmp_path / 'aircraft.db')
+    checkpoint = _checkpoint(sharded, tmp_path)
+
+    with pytest.raises(Crash):
+        _load(sharded, CrashingSQLiteSink(db, crash_at=9), checkpoint, 'columnar')
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM AircraftMaster").fetchone()[0] == 8 * BATCH_SIZE
+
+    stats = _load(sharded, SQLiteSink(db), _checkpoint(sharded, tmp_path), 'columnar')
+    assert stats['written'] == 2000 - 8 * BATCH_SIZE
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM AircraftMaster").fetchone()[0] == 2000
+
+
+def test_changed_file_starts_over(sharded, tmp_path):
+    checkpoint = _checkpoint(sharded, tmp_path)
+    with pytest.raises(Crash):
+        _load(sharded, RecordingSink([], crash_at=4), checkpoint, 'line')
+
+    # A new release under the same names: the saved offsets mean nothing in it
+    write_registry(os.path.dirname(sharded['master'][0]), 1800, seed=6, shards=True)
+    stored = []
+    _load(sharded, RecordingSink(stored), _checkpoint(sharded, tmp_path), 'line')
+    assert stored == [parsed['n_number'] for parsed in iter_parsed(sharded['master'], 'line')]
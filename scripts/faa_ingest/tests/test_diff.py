@@ -0,0 +1,75 @@
+"""Release diff and change-set loads (diff.py, ingest_faa.py --diff / --changes)."""
+
+import os
+import sqlite3
+
+import pytest
+
+from faa_ingest.cli import main
+from faa_ingest.diff import OWNER_CHANGE, REGISTERED, REMOVED, diff_releases
+
+NAME = slice(58, 108)
+
+
+def _write_master(path, header, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.writelines(records)
+    return path
+
+
+def _rename(record, name):
+    return record[:NAME.start] + name.encode('latin-1').ljust(NAME.stop - NAME.start) + record[NAME.stop:]
+
+
+@pytest.fixture
+def releases(registry, tmp_path):
+    """(old MASTER.txt, new MASTER.txt) cut from the same registry.
+
+    Every 11th record is new in the new release, every 13th is gone from it
+    and every 7th changed owner.
+    """
+    with open(registry['master'][0], 'rb') as f:
+        header, *records = f.readlines()
+    old = [record for i, record in enumerate(records) if i % 11]
+    new = [_rename(record, f"NEW OWNER {i}") if i % 7 == 0 else record
+           for i, record in enumerate(records) if i % 13]
+    return (_write_master(str(tmp_path / 'old' / 'MASTER.txt'), header, old),
+            _write_master(str(tmp_path / 'new' / 'MASTER.txt'), header, new))
+
+
+def _table(db):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT * FROM AircraftMaster ORDER BY N_NUMBER").fetchall()
+
+
+def _load(master, registry, db, *extra):
+    return main(['--master', master, '--acftref', registry['acftref'], '--engine', registry['engine'],
+                 '--sink', f"sqlite:{db}", '--no-metrics', '--no-aggregates', '--no-checkpoint', *extra])
+
+
+def test_diff_categories(releases, tmp_path):
+    old, new = releases
+    changes = {change['n_number']: change['change'] for change in
+               diff_releases([old], [new], str(tmp_path / 'index'))}
+
+    assert REGISTERED in changes.values() and REMOVED in changes.values()
+    assert all(OWNER_CHANGE in change.split('|') for change in changes.values()
+               if change not in (REGISTERED, REMOVED))
+
+
+@pytest.mark.parametrize('extension', ['csv', 'ndjson'])
+def test_changes_equal_full_reload(releases, registry, tmp_path, extension):
+    old, new = releases
+    incremental = str(tmp_path / 'incremental.db')
+    full = str(tmp_path / 'full.db')
+    change_set = str(tmp_path / f"changes.{extension}")
+
+    assert _load(old, registry, incremental) == 0
+    assert main(['--master', new, '--diff', old, '--diff-out', change_set, '--no-metrics']) == 0
+    assert _load(old, registry, incremental, '--changes', change_set) == 0
+    assert _load(new, registry, full) == 0
+
+    assert _table(incremental) == _table(full)
+    assert len(_table(full)) == sum(1 for _ in open(new, 'rb')) - 1
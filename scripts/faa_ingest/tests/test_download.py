@@ -0,0 +1,145 @@
+"""Conditional release download (download.py, download_faa_full.py, ingest_faa.py --download)."""
+
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+import download_faa_full
+from faa_ingest import cli
+from faa_ingest.cli import main
+from faa_ingest.download import ReleaseState, StreamedRelease, open_release
+from faa_ingest.synthetic import write_registry, write_release_zip
+
+
+def _publish(server, files):
+    return write_release_zip(files, os.path.join(server.root, 'ReleasableAircraft.zip'))
+
+
+def _load(url, state):
+    """One conditional download, drained; the number of MASTER records, or None if unchanged."""
+    response = open_release(url, state)
+    if response is None:
+        return None
+    with response:
+        release = StreamedRelease(response)
+        release.references()
+        count = sum(1 for _ in release.master_records())
+    state.save(url, response.headers)
+    return count
+
+
+def test_release_download_is_conditional(http_server, registry, tmp_path):
+    _publish(http_server, registry)
+    url = f"{http_server.url}/ReleasableAircraft.zip"
+    state = ReleaseState(str(tmp_path / 'state.json'))
+
+    assert _load(url, state) > 0
+    assert _load(url, state) is None
+    assert http_server.requests[-1][1].get('If-None-Match') == state.get(url)['etag']
+
+    # A new release has a new ETag: downloaded again
+    _publish(http_server, write_registry(str(tmp_path / 'next'), 500, seed=8))
+    assert _load(url, state) == 500
+    assert _load(url, state) is None
+
+
+@pytest.fixture
+def download_dirs(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    monkeypatch.setattr(download_faa_full, 'DATA_DIR', str(data_dir))
+    monkeypatch.setattr(download_faa_full, 'MASTER_FILES_DIR', str(data_dir / 'master_files'))
+    monkeypatch.setattr(download_faa_full, 'RELEASE_STATE', str(data_dir / 'faa_release_download.json'))
+    download_faa_full.ensure_dirs()
+    return data_dir
+
+
+def test_download_faa_full_saves_release_once(http_server, registry, download_dirs):
+    _publish(http_server, registry)
+    url = f"{http_server.url}/ReleasableAircraft.zip"
+
+    assert download_faa_full.download_release(url=url)
+    assert os.path.exists(download_dirs / 'master_files' / 'MASTER.txt')
+    assert os.path.exists(download_dirs / 'ACFTREF.txt')
+    assert not download_faa_full.download_release(url=url)
+    assert download_faa_full.download_release(force=True, url=url)
+
+
+def test_download_faa_full_rejects_release_without_master(http_server, registry, download_dirs, capsys):
+    path = os.path.join(http_server.root, 'ReleasableAircraft.zip')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in ('acftref', 'engine'):
+            archive.write(registry[name], os.path.basename(registry[name]))
+
+    assert not download_faa_full.download_release(url=f"{http_server.url}/ReleasableAircraft.zip")
+    assert 'ERROR' in capsys.readouterr().out
+    # Nothing recorded, so the next run tries again
+    assert not os.path.exists(download_dirs / 'faa_release_download.json')
+
+
+def test_ingest_download_skips_unchanged_release(http_server, registry, tmp_path):
+    _publish(http_server, registry)
+    db = tmp_path / 'aircraft.db'
+    argv = ['--download', f"{http_server.url}/ReleasableAircraft.zip", '--sink', f"sqlite:{db}",
+            '--release-state', str(tmp_path / 'release.json'), '--no-metrics', '--no-aggregates']
+
+    assert main(argv) == 0
+    with sqlite3.connect(db) as conn:
+        loaded = conn.execute("SELECT COUNT(*) FROM AircraftMaster").fetchone()[0]
+    assert loaded > 0
+    requests = len(http_server.requests)
+    assert main(argv) == 0
+    assert len(http_server.requests) == requests + 1
+
+
+class RefusedSwap:
+    """ShadowTable whose finish() refuses the swap (a short shadow)."""
+
+    def __init__(self, table, **options):
+        self.table = table
+        self.name = table + '_shadow'
+
+    def prepare(self):
+        return self.name
+
+    def finish(self):
+        raise RuntimeError(f"{self.name} is short; not swapping")
+
+
+def _bulk_loaded(data_path, table, format_path, **options):
+    return {'method': 'bcp', 'rows': 1, 'mb': 0.1, 'seconds': 0.1, 'rows_per_sec': 10}
+
+
+def _bulk_load_failed(data_path, table, format_path, **options):
+    raise RuntimeError("bcp failed")
+
+
+@pytest.mark.parametrize('bulk_load, extra, saved', [
+    (_bulk_loaded, [], True),
+    (_bulk_load_failed, [], False),
+    (_bulk_loaded, ['--swap'], False),
+])
+def test_release_state_waits_for_the_live_table(http_server, registry, tmp_path, monkeypatch, bulk_load, extra,
+                                                saved):
+    _publish(http_server, registry)
+    monkeypatch.setattr(cli, 'bulk_load', bulk_load)
+    monkeypatch.setattr(cli, 'ShadowTable', RefusedSwap)
+    state = tmp_path / 'release.json'
+    argv = ['--download', f"{http_server.url}/ReleasableAircraft.zip", '--sink', f"bcp:{tmp_path / 'aircraft.bcp'}",
+            '--bulk-load', '--release-state', str(state), '--no-metrics', '--no-aggregates', *extra]
+
+    assert main(argv) == (0 if saved else 1)
+    # Unsaved, the next run downloads the release again instead of getting a 304
+    assert state.exists() == saved
+
+
+def test_sharded_release_zip_has_one_master(http_server, tmp_path):
+    files = write_registry(str(tmp_path / 'shards'), 900, seed=9, shards=True)
+    path = _publish(http_server, files)
+    with zipfile.ZipFile(path) as archive:
+        assert 'MASTER.txt' in archive.namelist()
+        assert not any(name.startswith('MASTER-') for name in archive.namelist())
+
+    state = ReleaseState(str(tmp_path / 'state.json'))
+    assert _load(f"{http_server.url}/ReleasableAircraft.zip", state) == 900
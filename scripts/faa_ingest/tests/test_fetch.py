@@ -0,0 +1,129 @@
+"""Mirror downloads: range resume, If-Range and checksums (fetch.py)."""
+
+import hashlib
+import json
+import os
+import shutil
+
+import pytest
+
+from faa_ingest.fetch import FetchJob, fetch_all, validators_path
+
+
+def _sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def mirror(http_server, registry):
+    """The registry's files served by http_server; {name: served path}."""
+    served = {}
+    for path in [registry['acftref'], registry['engine']] + registry['master']:
+        served[os.path.basename(path)] = shutil.copy(path, http_server.root)
+    return served
+
+
+@pytest.fixture
+def out(tmp_path):
+    path = tmp_path / 'out'
+    path.mkdir()
+    return path
+
+
+def _job(http_server, out, name, sha256=None):
+    return FetchJob(f"{http_server.url}/{name}", str(out / name), sha256)
+
+
+def _fetched_headers(http_server, name):
+    return [headers for path, headers in http_server.requests if path == f"/{name}"]
+
+
+def test_fetch_all_verifies_checksums(http_server, mirror, out):
+    jobs = [_job(http_server, out, name, _sha256(path)) for name, path in mirror.items()]
+    results, failures = fetch_all(jobs, workers=3)
+
+    assert not failures
+    assert sorted(result['path'] for result in results) == sorted(job.path for job in jobs)
+    for name, path in mirror.items():
+        assert _sha256(out / name) == _sha256(path)
+    assert not [name for name in os.listdir(out) if name.endswith('.part') or name.endswith('.json')]
+
+
+def test_checksum_mismatch_keeps_nothing(http_server, mirror, out):
+    results, failures = fetch_all([_job(http_server, out, 'MASTER.txt', '0' * 64)], retries=0)
+
+    assert not results and len(failures) == 1
+    assert 'SHA-256' in str(failures[0][1])
+    assert os.listdir(out) == []
+
+
+def test_dropped_transfer_resumes_with_if_range(http_server, mirror, out):
+    http_server.drop.add('/MASTER.txt')
+    results, failures = fetch_all([_job(http_server, out, 'MASTER.txt', _sha256(mirror['MASTER.txt']))])
+
+    assert not failures and results[0]['resumed']
+    first, second = _fetched_headers(http_server, 'MASTER.txt')
+    assert 'Range' not in first
+    assert second['Range'] == f"bytes={os.path.getsize(mirror['MASTER.txt']) // 2}-"
+    assert second['If-Range'].startswith('"')
+    assert _sha256(out / 'MASTER.txt') == _sha256(mirror['MASTER.txt'])
+
+
+def _partial(out, name, data, validators=None):
+    part = str(out / name) + '.part'
+    with open(part, 'wb') as f:
+        f.write(data)
+    if validators is not None:
+        with open(validators_path(part), 'w', encoding='utf-8') as f:
+            json.dump(validators, f)
+    return part
+
+
+def test_part_of_a_changed_file_is_not_spliced(http_server, mirror, out):
+    with open(mirror['MASTER.txt'], 'rb') as f:
+        old = f.read()
+    # Last month's half download, then the file changes on the server
+    _partial(out, 'MASTER.txt', old[:len(old) // 2], {'etag': '"last-month"', 'last_modified': None})
+    with open(mirror['MASTER.txt'], 'ab') as f:
+        f.write(old[-700:])
+
+    results, failures = fetch_all([_job(http_server, out, 'MASTER.txt', _sha256(mirror['MASTER.txt']))],
+                                  retries=0)
+    assert not failures and not results[0]['resumed']
+    assert _fetched_headers(http_server, 'MASTER.txt')[0]['If-Range'] == '"last-month"'
+    assert _sha256(out / 'MASTER.txt') == _sha256(mirror['MASTER.txt'])
+
+
+def test_part_without_validators_starts_over(http_server, mirror, out):
+    _partial(out, 'ACFTREF.txt', b'not from this server')
+
+    results, failures = fetch_all([_job(http_server, out, 'ACFTREF.txt', _sha256(mirror['ACFTREF.txt']))],
+                                  retries=0)
+    assert not failures and not results[0]['resumed']
+    assert 'Range' not in _fetched_headers(http_server, 'ACFTREF.txt')[0]
+    assert _sha256(out / 'ACFTREF.txt') == _sha256(mirror['ACFTREF.txt'])
+
+
+def test_complete_part_is_satisfied_by_416(http_server, mirror, out):
+    with open(mirror['ENGINE.txt'], 'rb') as f:
+        data = f.read()
+    etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+    _partial(out, 'ENGINE.txt', data, {'etag': etag, 'last_modified': None})
+
+    results, failures = fetch_all([_job(http_server, out, 'ENGINE.txt', _sha256(mirror['ENGINE.txt']))],
+                                  retries=0)
+    assert not failures and results[0]['resumed'] and results[0]['bytes'] == 0
+    assert _sha256(out / 'ENGINE.txt') == _sha256(mirror['ENGINE.txt'])
+
+
+def test_part_longer_than_the_file_starts_over(http_server, mirror, out):
+    with open(mirror['ENGINE.txt'], 'rb') as f:
+        data = f.read()
+    etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+    _partial(out, 'ENGINE.txt', data + b'trailing bytes', {'etag': etag, 'last_modified': None})
+
+    results, failures = fetch_all([_job(http_server, out, 'ENGINE.txt', _sha256(mirror['ENGINE.txt']))],
+                                  retries=0)
+    assert not failures and not results[0]['resumed']
+    assert _sha256(out / 'ENGINE.txt') == _sha256(mirror['ENGINE.txt'])
@@ -0,0 +1,56 @@
+"""Deferred index maintenance (indexes.py)."""
+
+from faa_ingest.indexes import DeferredIndexes
+
+# sys.indexes rows of AircraftMaster (see indexes._INDEX_COLUMNS_SQL)
+INDEX_ROWS = [
+    ('PK_AircraftMaster', 'CLUSTERED', True, True, None, 'N_NUMBER', False, False, False),
+    ('IX_AircraftMaster_N_NUMBER_KEY', 'NONCLUSTERED', False, False, None, 'N_NUMBER_KEY', False, False, False),
+    ('IX_AircraftMaster_MFR_MODEL', 'NONCLUSTERED', False, False, None, 'MFR', False, False, False),
+    ('IX_AircraftMaster_MFR_MODEL', 'NONCLUSTERED', False, False, None, 'MODEL', False, False, False),
+    ('IX_AircraftMaster_STATUS', 'NONCLUSTERED', False, False, None, 'STATUS_CODE', False, False, True),
+]
+
+
+class FakeConnection:
+    """Answers the index query with INDEX_ROWS and records every statement."""
+
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchall(self):
+        return INDEX_ROWS
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_lookup_index_stays_enabled():
+    conn = FakeConnection()
+    with DeferredIndexes(connect=lambda: conn) as deferred:
+        # An index an interrupted run left disabled is rebuilt without being disabled again
+        assert [index['name'] for index in deferred.indexes] == ['IX_AircraftMaster_MFR_MODEL',
+                                                                 'IX_AircraftMaster_STATUS']
+    altered = [sql for sql in conn.executed if sql.startswith('ALTER INDEX')]
+    assert altered == [
+        'ALTER INDEX [IX_AircraftMaster_MFR_MODEL] ON [AircraftMaster] DISABLE',
+        'ALTER INDEX [IX_AircraftMaster_MFR_MODEL] ON [AircraftMaster] REBUILD',
+        'ALTER INDEX [IX_AircraftMaster_STATUS] ON [AircraftMaster] REBUILD',
+    ]
+
+
+def test_keep_can_be_emptied():
+    with DeferredIndexes(connect=FakeConnection, keep=frozenset()) as deferred:
+        assert 'IX_AircraftMaster_N_NUMBER_KEY' in [index['name'] for index in deferred.indexes]
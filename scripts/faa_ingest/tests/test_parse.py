@@ -0,0 +1,54 @@
+"""Line parser vs columnar parser (parse.py, columnar.py, cache.py)."""
+
+import os
+
+import pytest
+
+from faa_ingest.columnar import iter_parsed_records
+from faa_ingest.master_index import MasterIndex
+from faa_ingest.pipeline import iter_parsed
+from faa_ingest.synthetic import write_registry
+
+from conftest import REGISTRY_ROWS
+
+SHARDED_ROWS = 2000
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    return write_registry(str(tmp_path / 'shards'), SHARDED_ROWS, seed=11, shards=True)
+
+
+def test_columnar_matches_line_parser(registry, sharded):
+    for files, rows in ((registry, REGISTRY_ROWS), (sharded, SHARDED_ROWS)):
+        expected = list(iter_parsed(files['master'], 'line'))
+        assert len(expected) == rows
+        assert list(iter_parsed(files['master'], 'columnar')) == expected
+
+
+def test_columnar_chunk_boundaries(registry):
+    expected = list(iter_parsed(registry['master'], 'line'))
+    # Chunks that end mid-record, many times over
+    assert list(iter_parsed_records(registry['master'], chunk_bytes=4099)) == expected
+
+
+def test_parse_cache_matches_line_parser(registry, tmp_path):
+    cache_dir = str(tmp_path / 'index')
+    expected = list(iter_parsed(registry['master'], 'line'))
+
+    # First pass parses and saves the cache, the second reads it back
+    assert list(iter_parsed(registry['master'], 'columnar', cache_dir=cache_dir)) == expected
+    assert any(name.endswith('.parsed') for name in os.listdir(cache_dir))
+    assert list(iter_parsed(registry['master'], 'columnar', cache_dir=cache_dir)) == expected
+
+
+def test_byte_ranges_match_line_parser(registry, tmp_path):
+    path = registry['master'][0]
+    index = MasterIndex.load_or_build(path, str(tmp_path / 'index'))
+    expected = list(iter_parsed([path], 'line'))
+
+    for parser in ('line', 'columnar'):
+        parts = []
+        for start, end in index.ranges(4):
+            parts.extend(iter_parsed([path], parser, start_offset=start, end_offset=end))
+        assert parts == expected
@@ -0,0 +1,76 @@
+"""SQLite sink (sinks.py)."""
+
+import sqlite3
+
+import pytest
+
+from faa_ingest.layout import AIRCRAFT_KEYS
+from faa_ingest.parse import load_reference_data
+from faa_ingest.pipeline import iter_aircraft, run_pipeline
+from faa_ingest.sinks import SQLiteSink
+
+from conftest import REGISTRY_ROWS
+
+
+def _record(n_number, name, status_code='V'):
+    record = dict.fromkeys(AIRCRAFT_KEYS, '')
+    record.update({'n_number': n_number, 'n_number_key': n_number, 'name': name, 'status_code': status_code,
+                   'eng_count': 1})
+    return record
+
+
+def _rows(db, sql="SELECT N_NUMBER, NAME FROM AircraftMaster ORDER BY N_NUMBER"):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(sql).fetchall()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / 'aircraft.db')
+
+
+def test_sqlite_loads_registry(registry, db):
+    acftref, engines = load_reference_data(registry['acftref'], registry['engine'])
+    expected = list(iter_aircraft(registry['master'], acftref, engines))
+
+    for _ in range(2):
+        # A rerun replaces rows rather than adding them
+        stats = run_pipeline(registry['master'], SQLiteSink(db), acftref, engines, batch_size=500,
+                             progress_every=0)
+        assert stats['written'] == REGISTRY_ROWS
+    stored = _rows(db, "SELECT * FROM AircraftMaster ORDER BY N_NUMBER")
+    assert stored == sorted(tuple(record[key] for key in AIRCRAFT_KEYS) for record in expected)
+
+
+def test_sqlite_keeps_last_record(db):
+    with SQLiteSink(db) as sink:
+        sink.write([_record('N1', 'FIRST'), _record('N2', 'OTHER'), _record('N1', 'SECOND')])
+        sink.write([_record('N2', 'LAST')])
+    assert _rows(db) == [('N1', 'SECOND'), ('N2', 'LAST')]
+
+
+def test_sqlite_delete(db):
+    with SQLiteSink(db) as sink:
+        sink.write([_record('N1', 'A'), _record('N2', 'B'), _record('N3', 'C')])
+        assert sink.delete(['N1', 'N3', 'N9']) == 2
+    assert _rows(db) == [('N2', 'B')]
+
+
+def test_sqlite_history(db):
+    with SQLiteSink(db, history=True) as sink:
+        sink.write([_record('N1', 'A'), _record('N2', 'B')])
+        sink.write([_record('N1', 'A'), _record('N2', 'NEW OWNER', status_code='D')])
+        sink.delete(['N1'])
+    events = _rows(db, "SELECT N_NUMBER, EVENT FROM AircraftHistory ORDER BY N_NUMBER, EVENT")
+    assert events == [('N1', 'REGISTERED'), ('N1', 'REMOVED'),
+                      ('N2', 'OWNER_CHANGE'), ('N2', 'REGISTERED'), ('N2', 'STATUS_CHANGE')]
+
+
+def test_sqlite_aggregates_replace_their_release(db):
+    with SQLiteSink(db) as sink:
+        sink.write_aggregates('20240101', [('20240101', 'STATE', 'KS', '', 3), ('20240101', 'STATE', 'CO', '', 2)])
+        sink.write_aggregates('20240201', [('20240201', 'STATE', 'KS', '', 4)])
+        sink.write_aggregates('20240101', [('20240101', 'STATE', 'KS', '', 5)])
+    assert _rows(db, "SELECT RELEASE_DATE, GROUP_VALUE, AIRCRAFT_COUNT FROM FleetAggregate "
+                     "ORDER BY RELEASE_DATE") == [('20240101', 'KS', 5), ('20240201', 'KS', 4)]
+
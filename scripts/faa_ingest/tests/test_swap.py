@@ -0,0 +1,89 @@
+"""Shadow-table swap reloads (swap.py)."""
+
+import pytest
+
+from faa_ingest.swap import LOAD_SEQUENCE_COLUMN, ShadowTable
+
+N_NUMBER_KEY_DEFINITION = "(CONVERT([nvarchar](12),case when upper(ltrim(rtrim([N_NUMBER]))) like N'N%' " \
+                          "then upper(ltrim(rtrim([N_NUMBER]))) else N'N'+upper(ltrim(rtrim([N_NUMBER]))) end))"
+
+# sys.indexes rows of the live table (see indexes._INDEX_COLUMNS_SQL)
+LIVE_INDEXES = [
+    ('PK_AircraftMaster', 'CLUSTERED', True, True, None, 'N_NUMBER', False, False, False),
+    ('IX_AircraftMaster_N_NUMBER_KEY', 'NONCLUSTERED', False, False, None, 'N_NUMBER_KEY', False, False, False),
+]
+
+
+class FakeServer:
+    """Records every statement; queries are answered from `answers` by a fragment of their SQL."""
+
+    def __init__(self, **answers):
+        self.answers = {'sys.default_constraints': [], 'sys.computed_columns': [],
+                        'sys.index_columns': LIVE_INDEXES, 'COUNT_BIG': [(1000, 1000, 1000)]}
+        self.answers.update(answers)
+        self.executed = []
+        self.last = None
+
+    def connect(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.executed.append(' '.join(sql.split()))
+        self.last = sql
+
+    def fetchall(self):
+        return next((rows for fragment, rows in self.answers.items() if fragment in self.last), [])
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def ran(self, fragment):
+        return [i for i, sql in enumerate(self.executed) if fragment in sql]
+
+
+def test_prepare_refuses_objects_the_swap_would_lose():
+    server = FakeServer(**{'sys.default_constraints': [('default', 'DF_AircraftMaster_NAME')]})
+    with pytest.raises(ValueError, match='DF_AircraftMaster_NAME'):
+        ShadowTable(connect=server.connect).prepare()
+    assert not server.ran('SELECT TOP 0 *')
+
+
+def test_prepare_recreates_computed_columns():
+    server = FakeServer(**{'sys.computed_columns': [('N_NUMBER_KEY', N_NUMBER_KEY_DEFINITION, True)]})
+    assert ShadowTable(connect=server.connect).prepare() == 'AircraftMaster_shadow'
+
+    copy, = server.ran('SELECT TOP 0 * INTO [AircraftMaster_shadow] FROM [AircraftMaster]')
+    drop, = server.ran('DROP COLUMN [N_NUMBER_KEY]')
+    add, = server.ran(f"ADD [N_NUMBER_KEY] AS {N_NUMBER_KEY_DEFINITION} PERSISTED")
+    sequence, = server.ran(f"ADD [{LOAD_SEQUENCE_COLUMN}] BIGINT IDENTITY")
+    assert copy < drop < add < sequence
+
+
+def test_finish_keeps_last_loaded_and_swaps():
+    server = FakeServer(COUNT_BIG=[(1003, 1000, 1000)])
+    timings = ShadowTable(connect=server.connect).finish()
+
+    assert (timings['rows'], timings['replaced_rows'], timings['duplicates']) == (1000, 1000, 3)
+    dedupe, = server.ran(f"ORDER BY [{LOAD_SEQUENCE_COLUMN}] DESC")
+    drop_sequence, = server.ran(f"DROP COLUMN [{LOAD_SEQUENCE_COLUMN}]")
+    primary_key, = server.ran('ADD CONSTRAINT [PK_AircraftMaster_shadow] PRIMARY KEY CLUSTERED')
+    lookup, = server.ran('[IX_AircraftMaster_N_NUMBER_KEY] ON [AircraftMaster_shadow]')
+    rename = server.ran("EXEC sp_rename %s, %s")[-1]
+    assert dedupe < drop_sequence < primary_key < lookup < rename
+    assert server.ran('DROP TABLE [AircraftMaster_old]')
+
+
+def test_finish_refuses_a_short_shadow():
+    server = FakeServer(COUNT_BIG=[(500, 1000, 500)])
+    with pytest.raises(RuntimeError, match='not swapping'):
+        ShadowTable(connect=server.connect).finish()
+    assert not server.ran('sp_rename')
@@ -0,0 +1,134 @@
+"""
+Concurrent batch writers: overlap parsing with database writes.
+
+The pipeline thread reads, parses and batches records and hands each batch
+to a bounded queue. WriterPool runs N writer threads, each with its own sink
+(and so its own database connection) that commits independently. When the
+writers fall behind the queue fills up and the parser blocks, so memory
+stays at roughly (queue size + writers) batches however large the file is,
+and a run takes about max(parse time, write time) instead of their sum.
+
+pymssql and sqlite3 release the GIL while they wait on the server or the
+disk, which is what lets the parse thread keep going in the meantime.
+
+Batches can finish out of order. Each result carries the batch's sequence
+number and source position so run_pipeline() only advances the checkpoint
+past batches that are committed along with every batch before them.
+"""
+
+import queue
+import threading
+import time
+
+# Producer/writer poll interval while waiting on the queues, so a failed
+# writer or an aborted run is noticed promptly
+POLL_SECONDS = 0.2
+
+
+class WriterPool:
+    """N writer threads draining a bounded queue of (seq, batch, position) items."""
+
+    def __init__(self, sink_factory, writers=2, queue_size=None):
+        self.sink_factory = sink_factory
+        self.writers = writers
+        self.batches = queue.Queue(maxsize=queue_size or writers * 2)
+        self.results = queue.Queue()
+        self.sinks = []
+        self.threads = []
+        self.error = None
+        self.wait_seconds = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        return False
+
+    def start(self):
+        for i in range(self.writers):
+            thread = threading.Thread(target=self._run, name=f"faa-writer-{i + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self):
+        sink = None
+        try:
+            sink = self.sink_factory()
+            sink.open()
+            self.sinks.append(sink)
+            while True:
+                try:
+                    item = self.batches.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                if item is None or self._stop.is_set():
+                    break
+                seq, batch, position = item
+                started = time.perf_counter()
+                stored = sink.write(batch)
+                self.results.put((seq, batch, position, stored, time.perf_counter() - started))
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self._stop.set()
+        finally:
+            if sink is not None:
+                sink.close()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def _put(self, item):
+        started = time.perf_counter()
+        while True:
+            self._check()
+            try:
+                self.batches.put(item, timeout=POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self.wait_seconds += time.perf_counter() - started
+
+    def submit(self, seq, batch, position):
+        """Queue a batch, blocking while the queue is full (backpressure)."""
+        self._put((seq, batch, position))
+
+    def completed(self):
+        """(seq, batch, position, stored, write seconds) for batches finished since the last call."""
+        done = []
+        while True:
+            try:
+                done.append(self.results.get_nowait())
+            except queue.Empty:
+                return done
+
+    def close(self):
+        """Let the writers drain the queue, stop them and return the remaining results."""
+        for _ in self.threads:
+            self._put(None)
+        for thread in self.threads:
+            thread.join()
+        self._check()
+        return self.completed()
+
+    def abort(self):
+        """Stop the writers without draining the queue."""
+        self._stop.set()
+        for thread in self.threads:
+            thread.join()
+
+    @property
+    def stats(self):
+        """Sum of the writer sinks' counters."""
+        merged = {}
+        for sink in self.sinks:
+            for key, value in sink.stats.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
@@ -0,0 +1,14 @@
+"""
+Load the FAA aircraft registry with the faa_ingest pipeline.
+
+Run: python scripts/ingest_faa.py                       # Azure SQL
+     python scripts/ingest_faa.py --sink sqlite:data/aircraft.db
+     python scripts/ingest_faa.py --sink file:data/aircraft.ndjson
+"""
+
+import sys
+
+from faa_ingest.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())